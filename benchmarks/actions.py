@@ -0,0 +1,244 @@
+'''
+Benchmark and regression harness for the action categorizers.
+
+Corpora are plain text files of action strings, one per line, in
+benchmarks/corpora/<state>.txt, and the ones kept in the repository are
+small samples of each state's actions. Record a larger one from a pupa
+scrape with:
+
+    python -m benchmarks.actions record ca _data/ca
+
+and store its current classification as the golden file with:
+
+    python -m benchmarks.actions golden ca
+
+`python -m benchmarks.actions run [state ...]` then reports throughput,
+per-string latency and per-rule hit counts for each categorizer mode, and
+exits non-zero if any mode's output differs from the golden file, or if a
+state has no corpus or golden file.
+'''
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import importlib
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPORA_DIR = os.path.join(HERE, 'corpora')
+GOLDEN_DIR = os.path.join(HERE, 'golden')
+
+# wa imports its categorizer as a top-level `utils` package, the way
+# pupa-scrape.sh puts openstates/ on the path
+sys.path.append(os.path.join(os.path.dirname(HERE), 'openstates'))
+
+CATEGORIZERS = {
+    'ca': ('openstates.ca.actions', 'CACategorizer'),
+    'co': ('openstates.co.actions', 'Categorizer'),
+    'de': ('openstates.de.actions', 'Categorizer'),
+    'ma': ('openstates.ma.actions', 'Categorizer'),
+    'me': ('openstates.me.actions', 'Categorizer'),
+    'nd': ('openstates.nd.actions', 'NDCategorizer'),
+    'ny': ('openstates.ny.actions', 'Categorizer'),
+    'ok': ('openstates.ok.actions', 'Categorizer'),
+    'wa': ('openstates.wa.actions', 'Categorizer'),
+    'wv': ('openstates.wv.actions', 'Categorizer'),
+}
+
+# name -> categorizer constructor kwargs; ny has its own base class that
+# only supports caching
+MODES = (
+    ('plain', {}),
+    ('compiled', {'compiled': True}),
+    ('cached', {'compiled': True, 'cache_size': 100000}),
+)
+NY_MODES = (
+    ('plain', {}),
+    ('cached', {'cache_size': 100000}),
+)
+
+
+def corpus_path(state):
+    return os.path.join(CORPORA_DIR, '%s.txt' % state)
+
+
+def golden_path(state):
+    return os.path.join(GOLDEN_DIR, '%s.json' % state)
+
+
+def load_corpus(state):
+    with open(corpus_path(state)) as f:
+        return [line.rstrip('\n') for line in f]
+
+
+def get_categorizer_class(state):
+    module, name = CATEGORIZERS[state]
+    return getattr(importlib.import_module(module), name)
+
+
+def normalize(result):
+    '''Sets come out of the categorizers as lists in hash order, which
+    changes between runs; sort them so results can be compared.
+    '''
+    if isinstance(result, dict):
+        return dict((k, normalize(v)) for k, v in result.items())
+    if isinstance(result, (list, tuple)):
+        items = [normalize(v) for v in result]
+        try:
+            return sorted(items)
+        except TypeError:
+            return items
+    return result
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = int(round(pct / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def record(state, data_dir):
+    '''Write the action descriptions from a directory of pupa bill JSON
+    to the state's corpus.
+    '''
+    actions = []
+    for filename in sorted(glob.glob(os.path.join(data_dir, 'bill_*.json'))):
+        with open(filename) as f:
+            bill = json.load(f)
+        for action in bill.get('actions', []):
+            actions.append(' '.join(action['description'].split()))
+
+    if not os.path.isdir(CORPORA_DIR):
+        os.makedirs(CORPORA_DIR)
+    with open(corpus_path(state), 'w') as f:
+        for action in actions:
+            f.write(action + '\n')
+    print('%s: recorded %d actions' % (state, len(actions)))
+
+
+def golden(state):
+    categorizer = get_categorizer_class(state)()
+    results = [normalize(categorizer.categorize(text))
+               for text in load_corpus(state)]
+
+    if not os.path.isdir(GOLDEN_DIR):
+        os.makedirs(GOLDEN_DIR)
+    with open(golden_path(state), 'w') as f:
+        json.dump(results, f, indent=0, sort_keys=True)
+    print('%s: wrote %d golden results' % (state, len(results)))
+
+
+def rule_hits(categorizer, texts):
+    hits = Counter()
+    if not hasattr(categorizer, 'matching_rules'):
+        return hits
+    indexes = dict((id(rule), i) for i, rule in enumerate(categorizer.rules))
+    for text in texts:
+        text = categorizer.pre_categorize(text)
+        for rule, _ in categorizer.matching_rules(text):
+            hits[indexes[id(rule)]] += 1
+    return hits
+
+
+def benchmark(state, top=10):
+    '''Benchmark every mode for the state, returning the number of modes
+    whose output drifted from the golden file.
+    '''
+    cls = get_categorizer_class(state)
+    texts = load_corpus(state)
+    with open(golden_path(state)) as f:
+        expected = json.load(f)
+
+    drifted = 0
+    for mode, kwargs in (NY_MODES if state == 'ny' else MODES):
+        categorizer = cls(**kwargs)
+        latencies = []
+        results = []
+        start = time.perf_counter()
+        for text in texts:
+            t0 = time.perf_counter()
+            results.append(categorizer.categorize(text))
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+
+        print('%s %-8s %8d actions %10.0f/s  p50 %7.1fus  p99 %7.1fus' % (
+            state, mode, len(texts), len(texts) / elapsed if elapsed else 0,
+            percentile(latencies, 50) * 1e6, percentile(latencies, 99) * 1e6))
+
+        if len(expected) != len(results):
+            drifted += 1
+            print('%s %-8s DRIFT: corpus has %d actions, %s has %d' % (
+                state, mode, len(results), golden_path(state), len(expected)))
+            continue
+        mismatches = [i for i, result in enumerate(results)
+                      if normalize(result) != expected[i]]
+        if mismatches:
+            drifted += 1
+            print('%s %-8s DRIFT: %d of %d results differ from %s' % (
+                state, mode, len(mismatches), len(results),
+                golden_path(state)))
+            for i in mismatches[:5]:
+                print('    %r\n      expected %r\n      got      %r' % (
+                    texts[i], expected[i], normalize(results[i])))
+
+    categorizer = cls()
+    for index, count in rule_hits(categorizer, texts).most_common(top):
+        patterns = [regex.pattern
+                    for regex in categorizer.rules[index].regexes]
+        print('    rule %3d %8d hits  %s' % (index, count, ' | '.join(patterns)))
+
+    return drifted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    subparsers = parser.add_subparsers(dest='command')
+
+    record_parser = subparsers.add_parser(
+        'record', help='record a corpus from pupa bill JSON')
+    record_parser.add_argument('state', choices=sorted(CATEGORIZERS))
+    record_parser.add_argument('data_dir')
+
+    golden_parser = subparsers.add_parser(
+        'golden', help="store a corpus's current classification")
+    golden_parser.add_argument('states', nargs='+', choices=sorted(CATEGORIZERS))
+
+    run_parser = subparsers.add_parser(
+        'run', help='benchmark and check against the golden files')
+    run_parser.add_argument('states', nargs='*')
+    run_parser.add_argument('--top', type=int, default=10,
+                            help='number of most frequently hit rules to list')
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.state, args.data_dir)
+    elif args.command == 'golden':
+        for state in args.states:
+            golden(state)
+    elif args.command == 'run':
+        states = args.states or sorted(CATEGORIZERS)
+        unknown = [state for state in states if state not in CATEGORIZERS]
+        if unknown:
+            parser.error('no categorizer for %s' % ', '.join(unknown))
+        missing = [path for state in states
+                   for path in (corpus_path(state), golden_path(state))
+                   if not os.path.exists(path)]
+        if missing:
+            parser.error('missing %s; record a corpus and its golden file '
+                         'first' % ', '.join(missing))
+        drifted = 0
+        for state in states:
+            drifted += benchmark(state, args.top)
+        if drifted:
+            sys.exit(1)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+'''
+Benchmark and regression harness for the IL, NM and TX vote parsers.
+
+Replays the roll calls kept with the states' tests, and larger synthetic
+journals built from them, through the parsers:
+
+    il          openstates/il/tests/test_vote_parsing.py roll calls
+    il-journal  full-chamber IL roll calls made from their names
+    nm          openstates/nm/tests/testData PDFs (needs pdftohtml)
+    tx          openstates/tx/tests/fixtures journal page
+    tx-journal  a TX journal of many votes made from that page
+
+`python -m benchmarks.votes run [case ...]` reports documents per second
+and peak memory for each case. With --save the results are appended to
+benchmarks/results/votes.jsonl, and each run is compared with the last
+saved one, starting with the baseline kept in the repository: it exits
+non-zero if a case's parsed output changed. Speed is compared with the
+last run saved on the same host, failing if a case got more than
+--tolerance slower; against a run from other hardware it's only reported.
+'''
+import os
+import ast
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import datetime
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from collections import OrderedDict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_PATH = os.path.join(HERE, 'results', 'votes.jsonl')
+
+IL_TESTS = os.path.join(ROOT, 'openstates', 'il', 'tests',
+                        'test_vote_parsing.py')
+NM_TEST_DATA = os.path.join(ROOT, 'openstates', 'nm', 'tests', 'testData')
+TX_FIXTURE = os.path.join(ROOT, 'openstates', 'tx', 'tests', 'fixtures',
+                          'roll_call_vote.html')
+
+IL_CODES = ['Y', 'Y', 'Y', 'Y', 'N', 'N', 'P', 'NV', 'E', 'A']
+IL_CHAMBER_SIZE = 118
+IL_JOURNAL_VOTES = 200
+TX_JOURNAL_VOTES = 200
+
+
+def il_fixtures():
+    '''The TEST_LINES roll calls of the IL tests, which are read rather than
+    imported as the module is still written for nose.'''
+    with open(IL_TESTS) as f:
+        tree = ast.parse(f.read())
+    return [ast.literal_eval(node.value) for node in tree.body
+            if isinstance(node, ast.Assign) and
+            isinstance(node.value, ast.List) and
+            node.targets[0].id.startswith('TEST_LINES')]
+
+
+def il_roll_call(names, codes, columns=4):
+    '''pdftotext -layout lines of a roll call, laid out like the IL ones.'''
+    width = max(len(name) for name in names) + 3
+    entries = list(zip(codes, names))
+    lines = []
+    # filled across, so only the last row can be short
+    for start in range(0, len(entries), columns):
+        lines.append(''.join('%-5s%-*s' % (code, width, name) for code, name
+                             in entries[start:start + columns]).rstrip())
+    return lines
+
+
+def il_cases():
+    from openstates.il.bills import find_columns_and_parse
+
+    def parse(lines):
+        return sorted(find_columns_and_parse(lines).items())
+
+    fixtures = il_fixtures()
+    names = sorted(set(name for lines in fixtures
+                       for name in find_columns_and_parse(lines)))
+    random.seed(0)
+    journal = []
+    for _ in range(IL_JOURNAL_VOTES):
+        members = ['%s %d' % (names[i % len(names)], i // len(names))
+                   for i in range(IL_CHAMBER_SIZE)]
+        codes = [random.choice(IL_CODES) for _ in members]
+        journal.append(il_roll_call(members, codes))
+    return [('il', fixtures, parse), ('il-journal', journal, parse)]
+
+
+class Unavailable(Exception):
+    '''Raised by a case builder that can't build its cases here.'''
+
+
+def vote_event_summary(vote):
+    return (vote.motion_text, vote.result, vote.counts, vote.votes)
+
+
+def nm_cases():
+    from openstates.nm import NewMexico
+    from openstates.nm.votes import NMVoteScraper
+    from openstates.utils import convert_pdf
+
+    documents = []
+    for filename in sorted(os.listdir(NM_TEST_DATA)):
+        if not filename.endswith('.pdf'):
+            continue
+        try:
+            xml = convert_pdf(os.path.join(NM_TEST_DATA, filename), 'xml')
+        except EnvironmentError:
+            xml = None
+        if not xml:
+            raise Unavailable('could not convert %s, is pdftohtml installed?'
+                              % filename)
+        documents.append((filename, xml))
+
+    scraper = NMVoteScraper(NewMexico(), tempfile.mkdtemp())
+
+    def parse(document):
+        filename, xml = document
+        if 'senate' in filename:
+            vote = scraper.parse_senate_vote(xml, filename, '2017', 'SB 1')
+        else:
+            vote = scraper.parse_house_vote(xml, filename, '2017', 'HB 1')
+        return vote_event_summary(vote)
+
+    return [('nm', documents, parse)]
+
+
+def tx_cases():
+    import lxml.html
+    from openstates.tx.votes import clean_journal, votes
+
+    def parse(html):
+        root = lxml.html.fromstring(html)
+        clean_journal(root)
+        return [vote_event_summary(vote)
+                for vote in votes(root, '85R', 'upper')]
+
+    with open(TX_FIXTURE, encoding='utf-8') as f:
+        fixture = f.read()
+
+    # the fixture's paragraphs, with the indentation a real journal page
+    # doesn't have, as the votes are read from the start of the text
+    paragraphs = [' '.join(div.text_content().split()) for div in
+                  lxml.html.fromstring(fixture).xpath('//div')]
+    journal = ['<html><body>']
+    for number in range(1, TX_JOURNAL_VOTES + 1):
+        for paragraph in paragraphs:
+            journal.append('<div class="textpara">%s</div><br>' %
+                           paragraph.replace('SR 3', 'SR %d' % number))
+    # a journal goes on after its last vote
+    journal.append('<div class="textpara">ADJOURNMENT</div></body></html>')
+    return [('tx', [fixture], parse), ('tx-journal', ['\n'.join(journal)],
+                                       parse)]
+
+
+# case name -> the function that builds it, along with its state's others
+CASE_BUILDERS = OrderedDict([
+    ('il', il_cases),
+    ('il-journal', il_cases),
+    ('nm', nm_cases),
+    ('tx', tx_cases),
+    ('tx-journal', tx_cases),
+])
+
+
+def cases(names):
+    '''The (documents, parse) of each of `names` that could be built, and
+    why the others couldn't, building only the states they're in.'''
+    found = OrderedDict()
+    unavailable = {}
+    for make_cases in OrderedDict.fromkeys(CASE_BUILDERS[name]
+                                           for name in names):
+        try:
+            built = make_cases()
+        except Unavailable as e:
+            for name in names:
+                if CASE_BUILDERS[name] is make_cases:
+                    unavailable[name] = str(e)
+            continue
+        for name, documents, parse in built:
+            if name in names:
+                found[name] = (documents, parse)
+    return found, unavailable
+
+
+def digest(results):
+    return hashlib.sha1(repr(results).encode('utf-8')).hexdigest()
+
+
+def benchmark(documents, parse, min_time):
+    '''Parse `documents` over and over for at least `min_time` seconds;
+    returns documents per second, peak memory of one pass and a digest of
+    its output.'''
+    tracemalloc.start()
+    results = [parse(document) for document in documents]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    parsed = 0
+    start = time.perf_counter()
+    while True:
+        for document in documents:
+            parse(document)
+        parsed += len(documents)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+    return parsed / elapsed, peak, digest(results)
+
+
+def saved_runs():
+    try:
+        with open(RESULTS_PATH) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except IOError:
+        return []
+
+
+def host_fingerprint():
+    '''Identifies the hardware and python a run was timed on, as speeds
+    are only comparable between runs on the same one.'''
+    host = ' '.join(str(part) for part in (
+        platform.node(), platform.machine(), platform.processor(),
+        os.cpu_count(), platform.python_implementation(),
+        platform.python_version()))
+    return hashlib.sha1(host.encode('utf-8')).hexdigest()[:12]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names, min_time, tolerance, save):
+    names = names or list(CASE_BUILDERS)
+    available, unavailable = cases(names)
+    host = host_fingerprint()
+    saved = saved_runs()
+    # the last run of each case, and the last one timed on this host
+    last = {}
+    last_here = {}
+    for entry in saved:
+        for name, result in entry['cases'].items():
+            last[name] = (entry, result)
+            if entry.get('host') == host:
+                last_here[name] = (entry, result)
+    results = OrderedDict()
+    regressed = 0
+
+    for name in names:
+        if name not in available:
+            print('%s: skipping, %s' % (name, unavailable[name]))
+            continue
+        documents, parse = available[name]
+        rate, peak, output = benchmark(documents, parse, min_time)
+        results[name] = {'docs_per_sec': rate, 'peak_bytes': peak,
+                         'documents': len(documents), 'digest': output}
+
+        line = '%-11s %5d docs %10.1f docs/s  peak %8.1f KiB' % (
+            name, len(documents), rate, peak / 1024.0)
+        if name in last_here:
+            entry, old = last_here[name]
+            change = rate / old['docs_per_sec'] - 1
+            line += '  %+6.1f%% vs %s' % (change * 100,
+                                          entry.get('revision') or 'last')
+            if change < -tolerance:
+                regressed += 1
+                line += '  SLOWER'
+        elif name in last:
+            entry, old = last[name]
+            line += '  (%+.1f%% vs %s on another host)' % (
+                (rate / old['docs_per_sec'] - 1) * 100,
+                entry.get('revision') or 'last')
+        if name in last and last[name][1]['digest'] != output:
+            regressed += 1
+            line += '  OUTPUT CHANGED'
+        print(line)
+
+    if save:
+        if not os.path.isdir(os.path.dirname(RESULTS_PATH)):
+            os.makedirs(os.path.dirname(RESULTS_PATH))
+        with open(RESULTS_PATH, 'a') as f:
+            f.write(json.dumps({
+                'time': datetime.datetime.utcnow().isoformat(),
+                'revision': git_revision(),
+                'host': host,
+                'cases': results,
+            }, sort_keys=True) + '\n')
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser(
+        'run', help='benchmark and compare with the last saved run')
+    run_parser.add_argument('cases', nargs='*')
+    run_parser.add_argument('--min-time', type=float, default=1.0,
+                            help='seconds to spend parsing each case')
+    run_parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='slowdown allowed before failing, as a '
+                            'fraction of the last docs/s saved on this host')
+    run_parser.add_argument('--save', action='store_true',
+                            help='append the results to %s' % RESULTS_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        unknown = [name for name in args.cases if name not in CASE_BUILDERS]
+        if unknown:
+            parser.error('no such case: %s' % ', '.join(unknown))
+        if run(args.cases, args.min_time, args.tolerance, args.save):
+            sys.exit(1)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,20 @@
 import os
 import re
 import pytz
-import operator
-import itertools
+import multiprocessing
+from collections import OrderedDict, defaultdict
 
-from lxml import etree, html
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, selectinload
 from sqlalchemy import create_engine
+from pupa import settings
 from pupa.scrape import Scraper, Bill, VoteEvent
 from pupa.scrape.base import ScrapeError
 
-from .models import CABill
+from openstates.utils.abbreviations import AbbreviationMatcher
+
+from .models import CABill, CABillVersion, CAVoteSummary, CAVoteDetail
 from .actions import CACategorizer
+from .cache import SQLiteCache
 
 SPONSOR_TYPES = {'LEAD_AUTHOR': 'author',
                  'COAUTHOR': 'coauthor',
@@ -21,6 +24,15 @@ MYSQL_HOST = os.environ.get('MYSQL_HOST', 'localhost')
 MYSQL_USER = os.environ.get('MYSQL_USER', 'root')
 MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD', '')
 
+# bills loaded, with everything the scraper reads from them, at a time
+BILL_CHUNK_SIZE = 100
+# scrape bills in this many processes, unless processes= is passed to scrape
+BILL_PROCESSES = int(os.environ.get('CA_BILL_PROCESSES', 1))
+# bills scraped by one task of a parallel scrape
+BILL_PART_SIZE = 500
+# seconds to wait for another process to finish writing to a cache
+CACHE_TIMEOUT = 60
+
 
 def clean_title(s):
     # replace smart quote characters
@@ -240,23 +252,15 @@ def get_committee_abbr_data():
     return committee_data
 
 
-def get_committee_name_regex():
-    # Builds a list of all committee abbreviations.
-    _committee_abbrs = map(operator.itemgetter(2), committee_data_both)
-    _committee_abbrs = itertools.chain.from_iterable(_committee_abbrs)
-    _committee_abbrs = sorted(_committee_abbrs, reverse=True, key=len)
-
-    _committee_abbr_regex = [
-        '%s' % '[\s,]*'.join(abbr.replace(',', '').split(' '))
-        for abbr in _committee_abbrs
-    ]
-    _committee_abbr_regex = re.compile('(%s)' % '|'.join(_committee_abbr_regex))
-
-    return _committee_abbr_regex
+def get_committee_abbr_matcher():
+    return AbbreviationMatcher(OrderedDict([
+        ('upper', [(name, abbrs) for name, code, abbrs in committee_data_upper]),
+        ('lower', [(name, abbrs) for name, code, abbrs in committee_data_lower]),
+    ]))
 
 
 class CABillScraper(Scraper):
-    categorizer = CACategorizer()
+    categorizer = CACategorizer(compiled=True, cache_size=50000)
 
     _tz = pytz.timezone('US/Pacific')
 
@@ -271,12 +275,27 @@ class CABillScraper(Scraper):
             conn_str = 'mysql://%s:%s@' % (user, pw)
         else:
             conn_str = 'mysql://'
-        conn_str = '%s%s/%s?charset=utf8' % (
+        self.conn_str = '%s%s/%s?charset=utf8' % (
             conn_str, host, kwargs.pop('db', 'capublic'))
-        self.engine = create_engine(conn_str)
+        self.connect()
+
+    def connect(self):
+        self.engine = create_engine(self.conn_str)
         self.Session = sessionmaker(bind=self.engine)
         self.session = self.Session()
 
+    def open_caches(self):
+        self.version_cache = SQLiteCache(
+            os.path.join(settings.CACHE_DIR, 'ca', 'bill_versions.sqlite'),
+            'bill_version_fields', timeout=CACHE_TIMEOUT)
+        self.vote_cache = SQLiteCache(
+            os.path.join(settings.CACHE_DIR, 'ca', 'votes.sqlite'),
+            'vote_rollups', timeout=CACHE_TIMEOUT)
+
+    def commit_caches(self):
+        self.version_cache.commit()
+        self.vote_cache.commit()
+
     def committee_code_to_name(self, code,
                                committee_code_to_name=get_committee_code_data()):
         '''Need to map committee codes to names.
@@ -296,7 +315,7 @@ class CABillScraper(Scraper):
                 raise KeyError
             return committee_abbr_to_name[other_chamber][slugify(abbr)]
 
-    def scrape(self, chamber=None, session=None):
+    def scrape(self, chamber=None, session=None, processes=None):
         if session is None:
             session = self.jurisdiction.legislative_sessions[-1]['identifier']
             self.info('no session specified, using %s', session)
@@ -318,22 +337,197 @@ class CABillScraper(Scraper):
             }
         }
 
-        for chamber in chambers:
-            for abbr, type_ in bill_types[chamber].items():
-                yield from self.scrape_bill_type(chamber, session, type_, abbr)
+        parts = [(chamber, session, type_, abbr, None)
+                 for chamber in chambers
+                 for abbr, type_ in bill_types[chamber].items()]
+        if processes is None:
+            processes = BILL_PROCESSES
+
+        cache_path = os.path.join(settings.CACHE_DIR, 'categorizer', 'ca.json')
+        self.categorizer.load_cache(cache_path)
+
+        if int(processes) > 1:
+            yield from self.scrape_parallel(parts, int(processes))
+        else:
+            self.open_caches()
+            for part in parts:
+                yield from self.scrape_bill_type(*part)
+                self.commit_caches()
+
+        self.categorizer.save_cache(cache_path)
+        self.info('action categorizer cache: %d hits, %d misses',
+                  self.categorizer.cache.hits, self.categorizer.cache.misses)
+        self.version_cache.close()
+        self.info('bill version cache: %d hits, %d misses',
+                  self.version_cache.hits, self.version_cache.misses)
+        self.vote_cache.close()
+        self.info('vote cache: %d hits, %d misses',
+                  self.vote_cache.hits, self.vote_cache.misses)
+
+    def version_fields(self, version):
+        '''The title, short_title and digest of a bill version, parsed from
+        its xml only if it changed since the last scrape.'''
+        fields = self.version_cache.get(version.bill_version_id,
+                                        version.trans_update)
+        if fields is None:
+            fields = version.fields
+            self.version_cache.put(version.bill_version_id,
+                                   version.trans_update, fields)
+        return fields
+
+    def scrape_parallel(self, parts, processes):
+        '''
+        Scrape each of `parts` in slices of BILL_PART_SIZE bills, in a pool
+        of `processes` worker processes, yielding the bills and votes in
+        the same order as scraping the parts one after the other.
+
+        The workers are forked from this scraper and open their own
+        database and cache connections. The actions they categorize are
+        merged into this scraper's categorization cache, which scrape
+        saves.
+        '''
+        tasks = []
+        for chamber, session, bill_type, type_abbr, _ in parts:
+            bill_ids = [bill_id for bill_id, in self.bill_query(
+                session, type_abbr).with_entities(
+                CABill.bill_id).order_by(CABill.bill_id)]
+            for start in range(0, len(bill_ids), BILL_PART_SIZE):
+                tasks.append((chamber, session, bill_type, type_abbr,
+                              bill_ids[start:start + BILL_PART_SIZE]))
+        # forked workers mustn't share (or close) this process's connections
+        self.session.close()
+        self.engine.dispose()
+        self.info('scraping %d bill types in %d parts with %d processes',
+                  len(parts), len(tasks), processes)
+
+        _worker['scraper'] = self
+        pool = multiprocessing.get_context('fork').Pool(
+            processes, initializer=_init_worker)
+        categorization_cache = self.categorizer.cache
+        stats = [0] * 6
+        try:
+            for objects, part_stats, categorized in pool.imap(_scrape_part,
+                                                              tasks):
+                yield from objects
+                stats = [a + b for a, b in zip(stats, part_stats)]
+                # merged here so scrape saves what the workers categorized
+                for text, result in categorized:
+                    categorization_cache.put(text, result)
+        finally:
+            pool.terminate()
+            _worker.clear()
+
+        # counted by the workers, and logged by scrape like a serial scrape's
+        self.open_caches()
+        (self.version_cache.hits, self.version_cache.misses,
+         self.vote_cache.hits, self.vote_cache.misses,
+         categorization_cache.hits, categorization_cache.misses) = stats
+
+    def bill_query(self, session, type_abbr, bill_ids=None):
+        bills = self.session.query(CABill).filter_by(
+            session_year=session).filter_by(
+            measure_type=type_abbr)
+        if bill_ids is not None:
+            bills = bills.filter(CABill.bill_id.in_(bill_ids))
+        return bills
+
+    def load_chunk(self, bills):
+        # commit what the last chunk cached, keeping the cache transactions
+        # short when parallel workers share the files
+        self.commit_caches()
+        self.load_vote_rollups(bills)
+
+    def load_vote_rollups(self, bills):
+        '''Get the yes, no and other voters of every roll call of a chunk of
+        bills, reading the detail rows only of the votes that changed
+        since the last scrape.'''
+        self.vote_rollups = {}
+        changed = []
+        for bill in bills:
+            for vote in bill.votes:
+                key = vote_key(vote)
+                rollup = self.vote_cache.get(key, vote.trans_update)
+                if rollup is None:
+                    changed.append(vote)
+                else:
+                    self.vote_rollups[key] = rollup
+
+        if changed:
+            details = load_vote_details(self.session, changed)
+            for vote in changed:
+                key = vote_key(vote)
+                rollup = vote_rollup(details[key])
+                self.vote_cache.put(key, vote.trans_update, rollup)
+                self.vote_rollups[key] = rollup
+
+    def prepare_action(self, action, chamber, committee_abbr_matcher):
+        '''The actor, description and extra fields of a bill action, before
+        its text is categorized.'''
+        actor = action.actor or chamber
+        actor = actor.strip()
+        match = re.match(r'(Assembly|Senate)($| \(Floor)', actor)
+        if match:
+            actor = {'Assembly': 'lower',
+                     'Senate': 'upper'}[match.group(1)]
+        elif actor.startswith('Governor'):
+            actor = 'executive'
+        else:
+            def replacer(matchobj):
+                if matchobj:
+                    return {'Assembly': 'lower',
+                            'Senate': 'upper'}[matchobj.group()]
+                else:
+                    return matchobj.group()
+
+            actor = re.sub(r'^(Assembly|Senate)', replacer, actor)
+
+        act_str = action.action
+        act_str = re.sub(r'\s+', ' ', act_str)
+
+        # Check for the abbreviations of the related committees, if any.
+        # The related committees themselves come from the categorizer.
+        kwargs = {}
+        mentions = committee_abbr_matcher.find(act_str, chamber)
+
+        if re.search(r'Com[s]?. on', action.action) and not mentions:
+            msg = 'Failed to extract committee abbr from %r.'
+            self.logger.warning(msg % action.action)
+
+        if mentions:
+            code = re.search(r'C[SXZ]\d+', actor)
+            if code is not None:
+                code = code.group()
+                kwargs['actor_info'] = {'committee_code': code}
+
+        # Determine which chamber the action originated from.
+        changed = False
+        for committee_chamber in ['upper', 'lower', 'legislature']:
+            if actor.startswith(committee_chamber):
+                actor = committee_chamber
+                changed = True
+                break
+        if not changed:
+            actor = 'legislature'
+
+        if actor != action.actor:
+            actor_info = kwargs.get('actor_info', {})
+            actor_info['details'] = action.actor
+            kwargs['actor_info'] = actor_info
+
+        return actor, act_str, kwargs
 
     def scrape_bill_type(self, chamber, session, bill_type, type_abbr,
-                         committee_abbr_regex=get_committee_name_regex()):
+                         bill_ids=None,
+                         committee_abbr_matcher=get_committee_abbr_matcher()):
         if chamber == 'upper':
             chamber_name = 'SENATE'
         else:
             chamber_name = 'ASSEMBLY'
 
-        bills = self.session.query(CABill).filter_by(
-            session_year=session).filter_by(
-            measure_type=type_abbr)
+        bills = self.bill_query(session, type_abbr, bill_ids)
 
-        for bill in bills:
+        for bill in iter_bills(self.session, bills, vote_details=False,
+                               chunk_loaded=self.load_chunk):
             bill_session = session
             if bill.session_num != '0':
                 bill_session += ' Special Session %s' % bill.session_num
@@ -363,34 +557,25 @@ class CABillScraper(Scraper):
 
             # Get digest test (aka "summary") from latest version.
             if bill.versions:
-                version = bill.versions[-1]
-                nsmap = version.xml.nsmap
-                xpath = '//caml:DigestText/xhtml:p'
-                els = version.xml.xpath(xpath, namespaces=nsmap)
-                chunks = []
-                for el in els:
-                    t = etree_text_content(el)
-                    t = re.sub(r'\s+', ' ', t)
-                    t = re.sub(r'\)(\S)', lambda m: ') %s' % m.group(1), t)
-                    chunks.append(t)
-                summary = '\n\n'.join(chunks)
+                summary = self.version_fields(bill.versions[-1])['digest']
 
             for version in bill.versions:
                 if not version.bill_xml:
                     continue
+                fields = self.version_fields(version)
 
                 # CA is inconsistent in that some bills have a short title
                 # that is longer, more descriptive than title.
                 if bill.measure_type in ('AB', 'SB'):
-                    impact_clause = clean_title(version.title)
-                    title = clean_title(version.short_title)
+                    impact_clause = clean_title(fields['title'])
+                    title = clean_title(fields['short_title'])
                 else:
                     impact_clause = None
-                    if len(version.title) < len(version.short_title) and \
-                            not version.title.lower().startswith('an act'):
-                        title = clean_title(version.short_title)
+                    if len(fields['title']) < len(fields['short_title']) and \
+                            not fields['title'].lower().startswith('an act'):
+                        title = clean_title(fields['short_title'])
                     else:
-                        title = clean_title(version.title)
+                        title = clean_title(fields['title'])
 
                 if title:
                     all_titles.add(title)
@@ -441,101 +626,30 @@ class CABillScraper(Scraper):
                     )
                     # fsbill.sponsorships[-1]['extras'] = {'official_type': author.contribution}
 
-            seen_actions = set()
-            for action in bill.actions:
-                if not action.action:
-                    # NULL action text seems to be an error on CA's part,
-                    # unless it has some meaning I'm missing
-                    continue
-                actor = action.actor or chamber
-                actor = actor.strip()
-                match = re.match(r'(Assembly|Senate)($| \(Floor)', actor)
-                if match:
-                    actor = {'Assembly': 'lower',
-                             'Senate': 'upper'}[match.group(1)]
-                elif actor.startswith('Governor'):
-                    actor = 'executive'
-                else:
-                    def replacer(matchobj):
-                        if matchobj:
-                            return {'Assembly': 'lower',
-                                    'Senate': 'upper'}[matchobj.group()]
-                        else:
-                            return matchobj.group()
-
-                    actor = re.sub(r'^(Assembly|Senate)', replacer, actor)
-
-                type_ = []
-
-                act_str = action.action
-                act_str = re.sub(r'\s+', ' ', act_str)
-
-                attrs = self.categorizer.categorize(act_str)
-
-                # Add in the committee strings of the related committees, if any.
-                kwargs = attrs
-                matched_abbrs = committee_abbr_regex.findall(action.action)
-
-                if re.search(r'Com[s]?. on', action.action) and not matched_abbrs:
-                    msg = 'Failed to extract committee abbr from %r.'
-                    self.logger.warning(msg % action.action)
-
-                if matched_abbrs:
-                    committees = []
-                    for abbr in matched_abbrs:
-                        try:
-                            name = self.committee_abbr_to_name(chamber, abbr)
-                            committees.append(name)
-                        except KeyError:
-                            msg = ('Mapping contains no committee name for '
-                                   'abbreviation %r. Action text was %r.')
-                            args = (abbr, action.action)
-                            raise KeyError(msg % args)
-
-                    committees = filter(None, committees)
-                    kwargs['committees'] = committees
-
-                    code = re.search(r'C[SXZ]\d+', actor)
-                    if code is not None:
-                        code = code.group()
-                        kwargs['actor_info'] = {'committee_code': code}
-
-                    assert len(list(committees)) == len(matched_abbrs)
-                    for committee, abbr in zip(committees, matched_abbrs):
-                        act_str = act_str.replace('Coms. on ', '')
-                        act_str = act_str.replace('Com. on ' + abbr, committee)
-                        act_str = act_str.replace(abbr, committee)
-                        if not act_str.endswith('.'):
-                            act_str = act_str + '.'
-
-                # Determine which chamber the action originated from.
-                changed = False
-                for committee_chamber in ['upper', 'lower', 'legislature']:
-                    if actor.startswith(committee_chamber):
-                        actor = committee_chamber
-                        changed = True
-                        break
-                if not changed:
-                    actor = 'legislature'
-
-                if actor != action.actor:
-                    actor_info = kwargs.get('actor_info', {})
-                    actor_info['details'] = action.actor
-                    kwargs['actor_info'] = actor_info
-
-                # Add strings for related legislators, if any.
-                rgx = '(?:senator|assembly[mwp][^ .,:;]+)\s+[^ .,:;]+'
-                legislators = re.findall(rgx, action.action, re.I)
-                if legislators:
-                    kwargs['legislators'] = legislators
+            # NULL action text seems to be an error on CA's part,
+            # unless it has some meaning I'm missing
+            actions = [action for action in bill.actions if action.action]
+
+            # the actions' texts, which are then categorized together
+            prepared = []
+            for action in actions:
+                actor, act_str, kwargs = self.prepare_action(
+                    action, chamber, committee_abbr_matcher)
+                prepared.append((action, actor, act_str, kwargs))
 
+            categorized = self.categorizer.categorize_many(
+                act_str for _, _, act_str, _ in prepared)
+
+            seen_actions = set()
+            for (action, actor, act_str, kwargs), attrs in zip(prepared,
+                                                               categorized):
                 date = action.action_date
                 date = self._tz.localize(date)
                 date = date.date()
                 if (actor, act_str, date) in seen_actions:
                     continue
 
-                kwargs.update(self.categorizer.categorize(act_str))
+                kwargs.update(attrs)
 
                 action = fsbill.add_action(act_str, date.strftime('%Y-%m-%d'), chamber=actor,
                                            classification=kwargs['classification'])
@@ -555,10 +669,10 @@ class CABillScraper(Scraper):
                 full_loc = vote.location.description
                 first_part = full_loc.split(' ')[0].lower()
                 if first_part in ['asm', 'assembly']:
-                    chamber = 'lower'
+                    vote_chamber = 'lower'
                     # vote_location = ' '.join(full_loc.split(' ')[1:])
                 elif first_part.startswith('sen'):
-                    chamber = 'upper'
+                    vote_chamber = 'upper'
                     # vote_location = ' '.join(full_loc.split(' ')[1:])
                 else:
                     raise ScrapeError("Bad location: %s" % full_loc)
@@ -610,7 +724,7 @@ class CABillScraper(Scraper):
                     result='pass' if result else 'fail',
                     classification=vtype,
                     # organization=org,
-                    chamber=chamber,
+                    chamber=vote_chamber,
                     bill=fsbill,
                 )
                 fsvote.extras = {'threshold': vote.threshold}
@@ -622,19 +736,7 @@ class CABillScraper(Scraper):
                 fsvote.add_source(source_url)
                 fsvote.pupa_id = source_url + '#' + str(vote_num)
 
-                rc = {'yes': [], 'no': [], 'other': []}
-                for record in vote.votes:
-                    if record.vote_code == 'AYE':
-                        rc['yes'].append(record.legislator_name)
-                    elif record.vote_code.startswith('NO'):
-                        rc['no'].append(record.legislator_name)
-                    else:
-                        rc['other'].append(record.legislator_name)
-
-                # Handle duplicate votes
-                for key in rc.keys():
-                    rc[key] = list(set(rc[key]))
-
+                rc = self.vote_rollups[vote_key(vote)]
                 for key, voters in rc.items():
                     for voter in voters:
                         fsvote.vote(key, voter)
@@ -644,8 +746,117 @@ class CABillScraper(Scraper):
                 yield fsvote
 
             yield fsbill
-            self.session.expire_all()
 
 
-def etree_text_content(el):
-    return html.fromstring(etree.tostring(el)).text_content()
+# the scraper the workers of a parallel scrape are forked from
+_worker = {}
+
+
+def _init_worker():
+    scraper = _worker['scraper']
+    # the parent's connections can't be shared with it
+    scraper.connect()
+    scraper.open_caches()
+    # the results categorized from here on are sent back with each part
+    scraper.categorizer.cache.added()
+
+
+def _scrape_part(part):
+    '''pool worker: the bills and votes of one part of a parallel scrape,
+    the hits and misses of the caches while scraping them and the actions
+    categorized for it'''
+    scraper = _worker['scraper']
+    caches = (scraper.version_cache, scraper.vote_cache,
+              scraper.categorizer.cache)
+    before = [count for cache in caches
+              for count in (cache.hits, cache.misses)]
+    objects = list(scraper.scrape_bill_type(*part))
+    scraper.commit_caches()
+    after = [count for cache in caches
+             for count in (cache.hits, cache.misses)]
+    return (objects, [b - a for a, b in zip(before, after)],
+            scraper.categorizer.cache.added())
+
+
+def bill_load_options(vote_details=True):
+    '''Loader options that fetch everything the scraper reads from a bill
+    with one query per relation for a whole chunk of bills, leaving out the
+    detail rows of the votes if `vote_details` is false.'''
+    options = (
+        selectinload(CABill.versions).selectinload(CABillVersion.authors),
+        selectinload(CABill.actions),
+        selectinload(CABill.votes).selectinload(CAVoteSummary.location),
+        selectinload(CABill.votes).selectinload(CAVoteSummary.motion),
+    )
+    if vote_details:
+        options += (
+            selectinload(CABill.votes).selectinload(CAVoteSummary.votes),)
+    return options
+
+
+def iter_bills(session, query, chunk_size=BILL_CHUNK_SIZE, vote_details=True,
+               chunk_loaded=None):
+    '''
+    Yield the bills matched by `query`, ordered by bill_id, with their
+    versions, authors, actions and votes loaded in a fixed number of
+    queries per chunk of bills instead of several lazy loads per bill.
+    `chunk_loaded` is called with each chunk of bills before they're
+    yielded.
+
+    Only the current chunk is kept in the session, so the caller must not
+    hold on to bills (or their relations) past the next chunk.
+    '''
+    bill_ids = [bill_id for bill_id, in
+                query.with_entities(CABill.bill_id).order_by(CABill.bill_id)]
+    for start in range(0, len(bill_ids), chunk_size):
+        chunk = bill_ids[start:start + chunk_size]
+        bills = session.query(CABill).filter(
+            CABill.bill_id.in_(chunk)).order_by(CABill.bill_id).options(
+            *bill_load_options(vote_details)).all()
+        if chunk_loaded is not None:
+            chunk_loaded(bills)
+        yield from bills
+        session.expunge_all()
+
+
+# what identifies a roll call, in both bill_summary_vote_tbl and
+# bill_detail_vote_tbl
+VOTE_KEY_COLUMNS = ('bill_id', 'location_code', 'vote_date_time',
+                    'vote_date_seq', 'motion_id')
+
+
+def vote_key(row):
+    return '|'.join(str(getattr(row, column)) for column in VOTE_KEY_COLUMNS)
+
+
+def load_vote_details(session, votes):
+    '''The (legislator_name, vote_code) rows of each of `votes`, by
+    vote_key, read in one query.'''
+    keys = set(vote_key(vote) for vote in votes)
+    bill_ids = sorted(set(vote.bill_id for vote in votes))
+    columns = [getattr(CAVoteDetail, column) for column in VOTE_KEY_COLUMNS]
+    details = defaultdict(list)
+    for row in session.query(CAVoteDetail.legislator_name,
+                             CAVoteDetail.vote_code, *columns).filter(
+            CAVoteDetail.bill_id.in_(bill_ids)):
+        key = vote_key(row)
+        if key in keys:
+            details[key].append(row)
+    return details
+
+
+def vote_rollup(records):
+    '''The names of the legislators voting yes, no and otherwise.'''
+    rc = {'yes': [], 'no': [], 'other': []}
+    for record in records:
+        if record.vote_code == 'AYE':
+            rc['yes'].append(record.legislator_name)
+        elif record.vote_code.startswith('NO'):
+            rc['no'].append(record.legislator_name)
+        else:
+            rc['other'].append(record.legislator_name)
+
+    # Handle duplicate votes
+    for key in rc.keys():
+        rc[key] = list(set(rc[key]))
+    return rc
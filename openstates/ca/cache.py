@@ -0,0 +1,47 @@
+import os
+import json
+import sqlite3
+
+
+class SQLiteCache(object):
+    '''
+    A persistent cache of JSON values in a table of an SQLite database.
+
+    Each value is stored with the version of its source it was computed
+    from, like a row's trans_update, and is only returned for that same
+    version, so a changed row's entry is recomputed and replaced.
+    '''
+
+    def __init__(self, path, table, timeout=5.0):
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        self.table = table
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS %s '
+            '(key TEXT PRIMARY KEY, version TEXT, value TEXT)' % table)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        row = self.connection.execute(
+            'SELECT value FROM %s WHERE key = ? AND version = ?' % self.table,
+            (key, str(version))).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, version, value):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO %s (key, version, value) VALUES (?, ?, ?)'
+            % self.table, (key, str(version), json.dumps(value)))
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
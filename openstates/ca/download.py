@@ -5,13 +5,18 @@ The workflow is:
  - Drop & recreate the local capublic database.
  - Inspect the FTP site with regex and determine which files have been updated, if any.
  - For each such file, unzip it & call import.
+
+With --incremental, an existing capublic database is kept and only the
+files that haven't been applied to it yet are imported; see sync().
 '''
 import os
 import re
+import argparse
 import glob
 import os.path
-import subprocess
 import logging
+import itertools
+import multiprocessing
 import lxml.html
 from datetime import datetime
 from os.path import join, split
@@ -22,12 +27,27 @@ import requests
 import MySQLdb
 import _mysql_exceptions
 
+from .fetch import fetch, fetch_all
+
 
 MYSQL_HOST = os.environ.get('MYSQL_HOST', 'localhost')
 MYSQL_USER = os.environ.get('MYSQL_USER', 'root')
 MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD', '')
 
-BASE_URL = 'http://downloads.leginfo.legislature.ca.gov/'
+BASE_URL = os.environ.get('CA_BASE_URL',
+                          'http://downloads.leginfo.legislature.ca.gov/')
+
+# Bill versions are inserted this many rows per multi-row REPLACE; 1 runs
+# one statement per row like the old loader did.
+BILL_VERSION_BATCH_SIZE = int(os.environ.get('CA_BILL_VERSION_BATCH_SIZE', 100))
+# Processes reading and cleaning the bill version xml files.
+BILL_VERSION_WORKERS = int(os.environ.get('CA_BILL_VERSION_WORKERS', 4))
+# Set to load bill versions from a generated staging file with
+# LOAD DATA LOCAL INFILE instead of REPLACE statements.
+BILL_VERSION_INFILE = bool(os.environ.get('CA_BILL_VERSION_INFILE'))
+# Largest multi-row statement sent to mysql, well under the
+# max_allowed_packet of the mysql container.
+MAX_STATEMENT_LENGTH = 16 * 1024 * 1024
 
 
 # ----------------------------------------------------------------------------
@@ -74,6 +94,106 @@ def db_drop():
     logger.info('...done.')
 
 
+def connect(**kwargs):
+    connection = MySQLdb.connect(host=MYSQL_HOST, user=MYSQL_USER,
+                                 passwd=MYSQL_PASSWORD, db='capublic', **kwargs)
+    connection.autocommit(True)
+    return connection
+
+
+# ---------------------------------------------------------------------------
+# Bookkeeping for incremental syncs.
+SYNC_TABLES = (
+    # the pubinfo zips that have been imported, by modification date
+    '''CREATE TABLE IF NOT EXISTS capublic.sync_applied_files (
+        FILENAME VARCHAR(64) NOT NULL,
+        MODIFIED DATETIME NOT NULL,
+        APPLIED DATETIME NOT NULL,
+        PRIMARY KEY (FILENAME, MODIFIED))''',
+)
+
+
+def create_sync_tables():
+    connection = connect()
+    cursor = connection.cursor()
+    for sql in SYNC_TABLES:
+        cursor.execute(sql)
+    cursor.close()
+    connection.close()
+
+
+def get_applied():
+    '''Return the set of (filename, modified) of the imported zips.'''
+    connection = connect()
+    cursor = connection.cursor()
+    cursor.execute('SELECT FILENAME, MODIFIED FROM capublic.sync_applied_files')
+    applied = set(cursor.fetchall())
+    cursor.close()
+    connection.close()
+    return applied
+
+
+def record_applied(filename, modified):
+    connection = connect()
+    cursor = connection.cursor()
+    cursor.execute('REPLACE INTO capublic.sync_applied_files '
+                   '(FILENAME, MODIFIED, APPLIED) VALUES (%s, %s, %s)',
+                   [filename, modified, datetime.now()])
+    cursor.close()
+    connection.close()
+
+
+class MergeError(Exception):
+    pass
+
+
+def primary_key(cursor, table):
+    '''Return the primary key columns of a capublic table.'''
+    cursor.execute("SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                   "WHERE TABLE_SCHEMA = 'capublic' AND TABLE_NAME = %s "
+                   "AND CONSTRAINT_NAME = 'PRIMARY'", [table])
+    return [row[0] for row in cursor.fetchall()]
+
+
+def check_mergeable(cursor, tables, fresh_tables=()):
+    '''
+    Raise MergeError if any of `tables` can't be merged into: REPLACE
+    matches rows on the primary key, so merging into a table without one
+    would add a second copy of every row that changed. Tables in
+    `fresh_tables` have had their session deleted, so nothing is left to
+    duplicate.
+    '''
+    keyless = [table for table in tables
+               if table not in fresh_tables and not primary_key(cursor, table)]
+    if keyless:
+        raise MergeError("can't merge into %s, which have no primary key"
+                         % ', '.join(sorted(keyless)))
+
+
+def merge_staging(cursor, table, staging):
+    '''
+    Copy the rows of the staging table into `table`, replacing rows with
+    the same primary key.
+    '''
+    cursor.execute('REPLACE INTO capublic.%s SELECT * FROM %s' % (table, staging))
+    logger.info('merged %d rows into %s' % (cursor.rowcount, table))
+    cursor.execute('DROP TEMPORARY TABLE %s' % staging)
+
+
+def plan_sync(dumps, applied):
+    '''
+    Return the dumps, from get_dumps, that haven't been applied yet given
+    the set of (filename, modified) that have. A new year zip starts its
+    session over, so the day zips are all applied again after it.
+    '''
+    if dumps[0] not in applied:
+        return list(dumps)
+    for file, date in dumps:
+        if (file, date) in applied:
+            logger.info('%s is already applied' % file)
+    return [dump for dump in dumps if dump not in applied]
+
+
 # ---------------------------------------------------------------------------
 # Functions for updating the data.
 DatRow = namedtuple(
@@ -109,56 +229,125 @@ def encode_or_none(value):
     return value.encode() if value else None
 
 
-def load_bill_versions(connection):
+BILL_VERSION_COLUMNS = ', '.join(field.upper() for field in DatRow._fields)
+
+
+def read_bill_version(row):
+    '''Convert a row in the bill_version_tbl.dat file into the list of
+    column values to insert, with its BILL_XML file read in.
     '''
-    Given a data folder, read its BILL_VERSION_TBL.dat file in python,
-    construct individual REPLACE statements and execute them one at
-    a time. This method is slower that letting mysql do the import,
-    but doesn't fail mysteriously.
+    # The files are supposedly already in utf-8, but with
+    # copious bogus characters.
+    row = clean_text(row)
+    row = dat_row_2_tuple(row)
+    with open(row.bill_xml) as f:
+        text = f.read()
+        text = clean_text(text)
+        row = row._replace(bill_xml=text)
+    return [encode_or_none(column) for column in row]
+
+
+def read_bill_versions(batch_size, workers):
+    '''
+    Yield the rows of the BILL_VERSION_TBL.dat file in the current folder
+    as lists of at most `batch_size` rows of column values. The xml files
+    of a batch are read in a pool of `workers` processes, so only one
+    batch of them is held in memory at a time.
+
+    The workers are spawned rather than forked, as fetch_all's download
+    threads may be running, and forking a process with threads can leave
+    the child holding a lock that's never released.
     '''
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.get_context('spawn').Pool(workers)
+    try:
+        with open('BILL_VERSION_TBL.dat') as f:
+            while True:
+                rows = list(itertools.islice(f, batch_size))
+                if not rows:
+                    break
+                if pool:
+                    yield pool.map(read_bill_version, rows)
+                else:
+                    yield [read_bill_version(row) for row in rows]
+    finally:
+        if pool:
+            pool.terminate()
+
+
+def infile_field(value):
+    '''Escape a column value for LOAD DATA's default field format.'''
+    if value is None:
+        return b'\\N'
+    return (value.replace(b'\\', b'\\\\').replace(b'\0', b'\\0')
+            .replace(b'\t', b'\\t').replace(b'\n', b'\\n')
+            .replace(b'\r', b'\\r'))
+
+
+def load_bill_versions(connection, batch_size=None, workers=None, infile=None,
+                       table='capublic.bill_version_tbl'):
+    '''
+    Given a data folder, read its BILL_VERSION_TBL.dat file in python,
+    read and clean each row's bill xml file, and insert the rows with
+    multi-row REPLACE statements of `batch_size` rows. This is slower
+    than letting mysql do the import, but doesn't fail mysteriously.
 
-    sql = '''
-        REPLACE INTO capublic.bill_version_tbl (
-            BILL_VERSION_ID,
-            BILL_ID,
-            VERSION_NUM,
-            BILL_VERSION_ACTION_DATE,
-            BILL_VERSION_ACTION,
-            REQUEST_NUM,
-            SUBJECT,
-            VOTE_REQUIRED,
-            APPROPRIATION,
-            FISCAL_COMMITTEE,
-            LOCAL_PROGRAM,
-            SUBSTANTIVE_CHANGES,
-            URGENCY,
-            TAXLEVY,
-            BILL_XML,
-            ACTIVE_FLG,
-            TRANS_UID,
-            TRANS_UPDATE)
-
-        VALUES (%s)
-        '''
-    sql = sql % ', '.join(['%s'] * 18)
+    With `infile`, the rows are written to a staging file in mysql's
+    LOAD DATA format instead and loaded with a single statement.
 
+    The rows go into `table`, which is the staging table in merges.
+    '''
+    if batch_size is None:
+        batch_size = BILL_VERSION_BATCH_SIZE
+    if workers is None:
+        workers = BILL_VERSION_WORKERS
+    if infile is None:
+        infile = BILL_VERSION_INFILE
+
+    start = datetime.now()
+    count = 0
+    batches = read_bill_versions(batch_size, workers)
     cursor = connection.cursor()
-    with open('BILL_VERSION_TBL.dat') as f:
-        for row in f:
-            # The files are supposedly already in utf-8, but with
-            # copious bogus characters.
-            row = clean_text(row)
-            row = dat_row_2_tuple(row)
-            with open(row.bill_xml) as f:
-                text = f.read()
-                text = clean_text(text)
-                row = row._replace(bill_xml=text)
-                cursor.execute(sql, [encode_or_none(column) for column in row])
+
+    if infile:
+        staging = os.path.abspath('bill_version_tbl.staging')
+        with open(staging, 'wb') as f:
+            for rows in batches:
+                for row in rows:
+                    f.write(b'\t'.join(infile_field(column) for column in row))
+                    f.write(b'\n')
+                count += len(rows)
+        sql = '''
+            LOAD DATA LOCAL INFILE %%s
+            REPLACE INTO TABLE %s
+            CHARACTER SET utf8
+            (%s)
+            ''' % (table, BILL_VERSION_COLUMNS)
+        cursor.execute(sql, [staging])
+        os.remove(staging)
+    else:
+        sql = '''
+            REPLACE INTO %s (%s)
+            VALUES (%s)
+            ''' % (table, BILL_VERSION_COLUMNS,
+                   ', '.join(['%s'] * len(DatRow._fields)))
+        # MySQLdb rewrites executemany into multi-row statements of up to
+        # this many bytes
+        cursor.max_stmt_length = MAX_STATEMENT_LENGTH
+        for rows in batches:
+            cursor.executemany(sql, rows)
+            count += len(rows)
 
     cursor.close()
+    logger.info('loaded %d bill versions in %s' % (count, datetime.now() - start))
 
 
-def load(folder, sql_name=partial(re.compile(r'\.dat$').sub, '.sql')):
+INTO_TABLE_RE = re.compile(r'(into\s+table\s+)[`\w.]+', re.IGNORECASE)
+
+
+def load(folder, sql_name=partial(re.compile(r'\.dat$').sub, '.sql'),
+         merge=False, fresh_tables=()):
     '''
     Import into mysql any .dat files located in `folder`.
 
@@ -166,19 +355,32 @@ def load(folder, sql_name=partial(re.compile(r'\.dat$').sub, '.sql')):
     the corresponding .sql file after swapping out windows paths for
     `folder`.
 
+    With `merge`, each file is loaded into a temporary staging table
+    instead and merged into its table with merge_staging. MergeError is
+    raised, before anything is loaded, if one of the tables can't be
+    merged into; see check_mergeable.
+
     This function doesn't bother to delete the imported data files
     afterwards; they'll be overwritten within a week, and leaving them
     around makes testing easier (they're huge).
     '''
 
     logger.info('Loading data from %s...' % folder)
-    os.chdir(folder)
-
-    connection = MySQLdb.connect(host=MYSQL_HOST, user=MYSQL_USER, passwd=MYSQL_PASSWORD,
-                                 db='capublic', local_infile=1)
-    connection.autocommit(True)
+    connection = connect(local_infile=1)
+
+    filenames = glob.glob(join(folder, '*.dat'))
+    if merge:
+        tables = [sql_name(split(filename)[1]).lower()[:-len('.sql')]
+                  for filename in filenames]
+        cursor = connection.cursor()
+        try:
+            check_mergeable(cursor, tables, fresh_tables)
+        except MergeError:
+            connection.close()
+            raise
+        cursor.close()
 
-    filenames = glob.glob('*.dat')
+    os.chdir(folder)
 
     for filename in filenames:
 
@@ -192,19 +394,58 @@ def load(folder, sql_name=partial(re.compile(r'\.dat$').sub, '.sql')):
 
         _, sql_filename = split(sql_filename)
         logger.info('loading ' + sql_filename)
+        table = sql_filename[:-len('.sql')]
+        cursor = connection.cursor()
+        if merge:
+            target = 'staging_' + table
+            cursor.execute('CREATE TEMPORARY TABLE %s LIKE capublic.%s'
+                           % (target, table))
+            script, count = INTO_TABLE_RE.subn(r'\g<1>' + target, script, 1)
+            if not count:
+                raise ValueError("can't find the table %s loads" % sql_filename)
+        else:
+            target = 'capublic.' + table
+
         if sql_filename == 'bill_version_tbl.sql':
-            logger.info('inserting xml files (slow)')
-            load_bill_versions(connection)
+            logger.info('inserting xml files')
+            load_bill_versions(connection, table=target)
         else:
-            cursor = connection.cursor()
             cursor.execute(script)
-            cursor.close()
+
+        if merge:
+            merge_staging(cursor, table, target)
+        cursor.close()
 
     connection.close()
     os.chdir('..')
     logging.info('...Done loading from %s' % folder)
 
 
+# The tables delete_session deletes from, by the column it matches the
+# session year against.
+SESSION_TABLES = {
+    'bill_id': [
+        'bill_detail_vote_tbl',
+        'bill_history_tbl',
+        'bill_summary_vote_tbl',
+        'bill_analysis_tbl',
+        'bill_tbl',
+        'committee_hearing_tbl',
+        'daily_file_tbl'
+    ],
+
+    'bill_version_id': [
+        'bill_version_authors_tbl',
+        'bill_version_tbl'
+    ],
+
+    'session_year': [
+        'legislator_tbl',
+        'location_code_tbl'
+    ]
+}
+
+
 def delete_session(session_year):
     '''
     This is the python equivalent (or at least, is supposed to be)
@@ -213,36 +454,12 @@ def delete_session(session_year):
     It deletes all the entries for the specified session.
     Used before the weekly import of the new database dump on Sunday.
     '''
-    tables = {
-        'bill_id': [
-            'bill_detail_vote_tbl',
-            'bill_history_tbl',
-            'bill_summary_vote_tbl',
-            'bill_analysis_tbl',
-            'bill_tbl',
-            'committee_hearing_tbl',
-            'daily_file_tbl'
-        ],
-
-        'bill_version_id': [
-            'bill_version_authors_tbl',
-            'bill_version_tbl'
-        ],
-
-        'session_year': [
-            'legislator_tbl',
-            'location_code_tbl'
-        ]
-    }
-
     logger.info('Deleting all data for session year %s...' % session_year)
 
-    connection = MySQLdb.connect(host=MYSQL_HOST, user=MYSQL_USER, passwd=MYSQL_PASSWORD,
-                                 db='capublic')
-    connection.autocommit(True)
+    connection = connect()
     cursor = connection.cursor()
 
-    for token, names in tables.items():
+    for token, names in SESSION_TABLES.items():
         for table_name in names:
             sql = ("DELETE FROM capublic.{table_name} "
                    "where {token} like '{session_year}%';")
@@ -284,6 +501,8 @@ def db_create():
     connection.close()
     os.chdir('..')
 
+    create_sync_tables()
+
 
 def get_contents():
     resp = {}
@@ -315,21 +534,15 @@ def get_contents():
     return resp
 
 
-def _check_call(*args):
-    logging.info('calling ' + ' '.join(args))
-    subprocess.check_call(args)
-
-
 def get_zip(filename):
-    dirname = filename.replace('.zip', '')
-    _check_call('wget', '--no-check-certificate', BASE_URL + filename)
-    _check_call('rm', '-rf', dirname)
-    _check_call('unzip', filename, '-d', dirname)
-    _check_call('rm', '-rf', filename)
-    return dirname
+    return fetch(filename, BASE_URL).dirname
 
 
-def get_current_year(contents):
+def get_dumps(contents):
+    '''
+    Return the (filename, modified date) of the newest year zip and of
+    the day zips published since, in the order they need to be loaded.
+    '''
     newest_file = '2000'
     newest_file_date = datetime(2000, 1, 1)
     files_to_get = []
@@ -340,22 +553,81 @@ def get_current_year(contents):
         if date_part.startswith('20') and filename > newest_file:
             newest_file = filename
             newest_file_date = date
-    files_to_get.append(newest_file)
+    files_to_get.append((newest_file, newest_file_date))
 
     # get files for days since last update
     days = ('pubinfo_Mon.zip', 'pubinfo_Tue.zip', 'pubinfo_Wed.zip', 'pubinfo_Thu.zip',
             'pubinfo_Fri.zip', 'pubinfo_Sat.zip')
     for dayfile in days:
         if contents[dayfile] > newest_file_date:
-            files_to_get.append(dayfile)
+            files_to_get.append((dayfile, contents[dayfile]))
+
+    return files_to_get
+
+
+def get_current_year(contents):
+    dumps = get_dumps(contents)
+    fetched = fetch_all([file for file, _ in dumps], BASE_URL)
+    for (file, date), zipped in zip(dumps, fetched):
+        load(zipped.dirname)
+        record_applied(file, date)
 
-    for file in files_to_get:
-        dirname = get_zip(file)
-        load(dirname)
+
+def sync(contents):
+    '''
+    Bring an existing capublic up to date by loading only the zips that
+    haven't been applied to it yet.
+
+    A new year zip replaces its whole session: the session is deleted
+    with delete_session and reloaded, and the day zips published since are
+    applied again. Day zips are merged into the existing tables, replacing
+    rows by primary key. Which zips have been applied is tracked by file,
+    so each one is merged once.
+
+    Returns False if sync can't be used and capublic has to be rebuilt:
+    if there's no database with sync bookkeeping to start from, or if a
+    zip loads a table without a primary key that can't be merged into.
+    '''
+    try:
+        applied = get_applied()
+    except (_mysql_exceptions.OperationalError,
+            _mysql_exceptions.ProgrammingError):
+        logger.info('no capublic to sync, rebuilding it')
+        return False
+
+    dumps = get_dumps(contents)
+    year_file, _ = dumps[0]
+    dumps = plan_sync(dumps, applied)
+
+    fetched = fetch_all([file for file, _ in dumps], BASE_URL)
+    for (file, date), zipped in zip(dumps, fetched):
+        try:
+            if file == year_file:
+                session_year = year_file.replace('pubinfo_', '').replace('.zip', '')
+                delete_session(session_year)
+                load(zipped.dirname, merge=True,
+                     fresh_tables=[name for names in SESSION_TABLES.values()
+                                   for name in names])
+            else:
+                load(zipped.dirname, merge=True)
+        except MergeError as e:
+            logger.info('%s: %s, rebuilding capublic' % (file, e))
+            return False
+        record_applied(file, date)
+
+    return True
 
 
 if __name__ == '__main__':
-    db_drop()
-    db_create()
+    parser = argparse.ArgumentParser(
+        description='download the CA capublic database dumps into mysql')
+    parser.add_argument('--incremental', action='store_true',
+                        help="only load the dumps that haven't been loaded "
+                        "into the existing database yet")
+    args = parser.parse_args()
+
     contents = get_contents()
-    get_current_year(contents)
+    if not (args.incremental and sync(contents)):
+        db_drop()
+        db_create()
+        get_current_year(contents)
@@ -4,4 +4,4 @@ until mysql -h "${MYSQL_HOST:-"localhost"}" -u "${MYSQL_USER:-"root"}" -e "SHOW
   sleep 1
 done
 
-$PUPA_ENV/bin/python -m openstates.ca.download
+$PUPA_ENV/bin/python -m openstates.ca.download "$@"
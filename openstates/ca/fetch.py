@@ -0,0 +1,142 @@
+'''
+Concurrent, resumable download and extraction of the pubinfo zips.
+
+Each zip is downloaded in its own thread, in chunks straight to disk,
+resuming an interrupted download with a Range request. It's extracted as
+soon as it's complete, so while one zip is being loaded into mysql the
+following ones are already downloading and extracting.
+
+A zip's directory of members is at its end, so a zip can't be unpacked
+while it's still downloading: downloads overlap with the extraction and
+loading of other zips, not their own.
+'''
+import os
+import time
+import shutil
+import zipfile
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+logger = logging.getLogger('pupa.ca-update')
+
+CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_WORKERS = int(os.environ.get('CA_DOWNLOAD_WORKERS', 3))
+
+Fetched = namedtuple('Fetched', ['filename', 'dirname', 'size',
+                                 'download_seconds', 'extract_seconds'])
+
+
+def download(url, path, attempts=3, timeout=60):
+    '''
+    Download `url` to `path`, returning the number of bytes transferred.
+
+    The data goes to `path`.part until it's complete, next to the
+    validator (ETag or Last-Modified) it was served with. A download that
+    fails is resumed from where it stopped, by this call's next attempt or
+    a later run, if the server says the file hasn't changed since.
+    '''
+    partial = path + '.part'
+    validator_path = partial + '.validator'
+    transferred = 0
+
+    for attempt in range(1, attempts + 1):
+        headers = {}
+        if os.path.exists(partial) and os.path.exists(validator_path):
+            with open(validator_path) as f:
+                headers['If-Range'] = f.read()
+            headers['Range'] = 'bytes=%d-' % os.path.getsize(partial)
+
+        try:
+            resp = requests.get(url, headers=headers, stream=True,
+                                verify=False, timeout=timeout)
+            with resp:
+                if resp.status_code == 416:
+                    # the partial file is already complete
+                    break
+                resp.raise_for_status()
+
+                if resp.status_code == 206:
+                    mode = 'ab'
+                else:
+                    mode = 'wb'
+                    validator = (resp.headers.get('ETag') or
+                                 resp.headers.get('Last-Modified'))
+                    if validator:
+                        with open(validator_path, 'w') as f:
+                            f.write(validator)
+                    elif os.path.exists(validator_path):
+                        os.remove(validator_path)
+
+                with open(partial, mode) as f:
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        transferred += len(chunk)
+            break
+        except (requests.RequestException, IOError) as e:
+            if attempt == attempts:
+                raise
+            logger.warning('download of %s failed (%s), resuming' % (url, e))
+
+    os.rename(partial, path)
+    if os.path.exists(validator_path):
+        os.remove(validator_path)
+    return transferred
+
+
+def extract(path, dirname):
+    '''Replace `dirname` with the contents of the zip at `path`, and
+    delete the zip. Members are copied to disk in chunks.
+    '''
+    shutil.rmtree(dirname, ignore_errors=True)
+    with zipfile.ZipFile(path) as z:
+        z.extractall(dirname)
+    os.remove(path)
+
+
+def fetch(filename, base_url, directory='.'):
+    '''
+    Download and extract `filename` from `base_url` into a folder of
+    `directory` named after it, logging the throughput.
+    '''
+    dirname = filename.replace('.zip', '')
+    path = os.path.join(directory, filename)
+
+    start = time.time()
+    size = download(base_url + filename, path)
+    download_seconds = time.time() - start
+
+    start = time.time()
+    extract(path, os.path.join(directory, dirname))
+    extract_seconds = time.time() - start
+
+    logger.info('%s: %.1f MB in %.1fs (%.1f MB/s), extracted in %.1fs' % (
+        filename, size / 1e6, download_seconds,
+        size / 1e6 / download_seconds if download_seconds else 0,
+        extract_seconds))
+    return Fetched(filename, dirname, size, download_seconds, extract_seconds)
+
+
+def fetch_all(filenames, base_url, directory='.', workers=None):
+    '''
+    Fetch `filenames` concurrently, yielding each one's Fetched in order
+    as soon as it and the ones before it are ready. `dirname` is relative
+    to `directory`.
+    '''
+    if workers is None:
+        workers = DOWNLOAD_WORKERS
+    # the caller may chdir while the downloads run
+    directory = os.path.abspath(directory)
+
+    with ThreadPoolExecutor(max(workers, 1)) as executor:
+        futures = [executor.submit(fetch, filename, base_url, directory)
+                   for filename in filenames]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
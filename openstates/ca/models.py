@@ -1,14 +1,64 @@
+import io
+import re
+
 from sqlalchemy import (Column, Integer, String, ForeignKey,
                         DateTime, Numeric, UnicodeText)
 from sqlalchemy.sql import and_
 from sqlalchemy.orm import backref, relation
 from sqlalchemy.ext.declarative import declarative_base
 
-from lxml import etree
+from lxml import etree, html
 
 Base = declarative_base()
 
 
+def etree_text_content(el):
+    return html.fromstring(etree.tostring(el)).text_content()
+
+
+def extract_version_fields(bill_xml):
+    '''
+    Pull the title, subject and digest out of a bill version's xml.
+
+    The document is parsed incrementally and parsing stops at the end of
+    the Description at the top of the document, which holds all three, so
+    the bill's text is never parsed. The digest joins the paragraphs of
+    every DigestText in it.
+    '''
+    fields = {'title': None, 'short_title': None}
+    chunks = []
+    nsmap = {}
+    events = etree.iterparse(io.BytesIO(bill_xml.encode('utf-8')),
+                             events=('start-ns', 'end'), recover=True)
+    for event, item in events:
+        if event == 'start-ns':
+            prefix, uri = item
+            nsmap.setdefault(prefix, uri)
+            continue
+        if not isinstance(item.tag, str):
+            continue
+
+        localname = etree.QName(item).localname
+        if localname == 'Title' and fields['title'] is None:
+            fields['title'] = ''.join(item.itertext()).strip()
+        elif localname == 'Subject' and fields['short_title'] is None:
+            fields['short_title'] = ''.join(item.itertext()).strip()
+        elif item.tag == '{%s}DigestText' % nsmap.get('caml'):
+            for el in item.iterchildren('{%s}p' % nsmap.get('xhtml')):
+                t = etree_text_content(el)
+                t = re.sub(r'\s+', ' ', t)
+                t = re.sub(r'\)(\S)', lambda m: ') %s' % m.group(1), t)
+                chunks.append(t)
+        elif localname == 'Description' and None not in fields.values():
+            break
+
+    for name, value in fields.items():
+        if value is None:
+            fields[name] = ''
+    fields['digest'] = '\n\n'.join(chunks)
+    return fields
+
+
 class CABill(Base):
     __tablename__ = "bill_tbl"
 
@@ -74,15 +124,24 @@ class CABillVersion(Base):
                                          etree.XMLParser(recover=True))
         return self._xml
 
+    @property
+    def fields(self):
+        '''The title, short_title and digest (summary) of the version.'''
+        if '_fields' not in self.__dict__:
+            self._fields = extract_version_fields(self.bill_xml)
+        return self._fields
+
     @property
     def title(self):
-        text = self.xml.xpath("string(//*[local-name() = 'Title'])") or ''
-        return text.strip()
+        return self.fields['title']
 
     @property
     def short_title(self):
-        text = self.xml.xpath("string(//*[local-name() = 'Subject'])") or ''
-        return text.strip()
+        return self.fields['short_title']
+
+    @property
+    def digest(self):
+        return self.fields['digest']
 
 
 class CABillVersionAuthor(Base):
@@ -0,0 +1,141 @@
+import re
+import logging
+import operator
+import itertools
+import unittest
+from collections import namedtuple
+
+from openstates.ca.bills import (CABillScraper, committee_data_both,
+                                 get_committee_abbr_matcher)
+
+Action = namedtuple('Action', 'action actor')
+
+ACTORS = [None, 'Senate', 'Assembly (Floor)', 'Governor', 'CX25',
+          'Senate CS44', 'Assembly Appropriations']
+
+
+def get_committee_name_regex():
+    # the regex the action loop used before AbbreviationMatcher
+    _committee_abbrs = map(operator.itemgetter(2), committee_data_both)
+    _committee_abbrs = itertools.chain.from_iterable(_committee_abbrs)
+    _committee_abbrs = sorted(_committee_abbrs, reverse=True, key=len)
+
+    _committee_abbr_regex = [
+        '%s' % '[\s,]*'.join(abbr.replace(',', '').split(' '))
+        for abbr in _committee_abbrs
+    ]
+    _committee_abbr_regex = re.compile('(%s)' % '|'.join(_committee_abbr_regex))
+
+    return _committee_abbr_regex
+
+
+def old_action(self, action, chamber, committee_abbr_regex):
+    '''The action loop's handling of one action before AbbreviationMatcher,
+    returning the actor, description, committees and actor_info it added
+    the action with.'''
+    actor = action.actor or chamber
+    actor = actor.strip()
+    match = re.match(r'(Assembly|Senate)($| \(Floor)', actor)
+    if match:
+        actor = {'Assembly': 'lower',
+                 'Senate': 'upper'}[match.group(1)]
+    elif actor.startswith('Governor'):
+        actor = 'executive'
+    else:
+        def replacer(matchobj):
+            if matchobj:
+                return {'Assembly': 'lower',
+                        'Senate': 'upper'}[matchobj.group()]
+            else:
+                return matchobj.group()
+
+        actor = re.sub(r'^(Assembly|Senate)', replacer, actor)
+
+    act_str = action.action
+    act_str = re.sub(r'\s+', ' ', act_str)
+
+    attrs = self.categorizer.categorize(act_str)
+
+    kwargs = attrs
+    matched_abbrs = committee_abbr_regex.findall(action.action)
+
+    if matched_abbrs:
+        committees = []
+        for abbr in matched_abbrs:
+            name = self.committee_abbr_to_name(chamber, abbr)
+            committees.append(name)
+
+        committees = filter(None, committees)
+        kwargs['committees'] = committees
+
+        code = re.search(r'C[SXZ]\d+', actor)
+        if code is not None:
+            code = code.group()
+            kwargs['actor_info'] = {'committee_code': code}
+
+        assert len(list(committees)) == len(matched_abbrs)
+        for committee, abbr in zip(committees, matched_abbrs):
+            act_str = act_str.replace('Coms. on ', '')
+            act_str = act_str.replace('Com. on ' + abbr, committee)
+            act_str = act_str.replace(abbr, committee)
+            if not act_str.endswith('.'):
+                act_str = act_str + '.'
+
+    changed = False
+    for committee_chamber in ['upper', 'lower', 'legislature']:
+        if actor.startswith(committee_chamber):
+            actor = committee_chamber
+            changed = True
+            break
+    if not changed:
+        actor = 'legislature'
+
+    if actor != action.actor:
+        actor_info = kwargs.get('actor_info', {})
+        actor_info['details'] = action.actor
+        kwargs['actor_info'] = actor_info
+
+    kwargs.update(self.categorizer.categorize(act_str))
+    return (actor, act_str, list(kwargs.get('committees', [])),
+            kwargs.get('actor_info'))
+
+
+def action_texts():
+    for name, code, abbrs in committee_data_both:
+        for abbr in abbrs:
+            yield 'Referred to Com. on %s.' % abbr
+            yield ('From committee: Do pass and re-refer to Com. on %s. '
+                   '(Ayes 12. Noes 2.) (April 4).' % abbr)
+            yield 'Referred to Coms. on %s and APPR.' % abbr
+            yield 'In committee: Set, first hearing. Referred to %s ' \
+                  'suspense file.' % abbr
+    yield 'Introduced. Read first time. To Com. on RLS. for assignment.'
+    yield 'Read third time.  Passed.\nOrdered to the Senate.'
+    yield 'Referred to Com. on B. & F.R. and HIGHER ED.'
+    yield 'Approved by the Governor.'
+    yield 'Senator Hill added as coauthor.'
+
+
+class TestPrepareAction(unittest.TestCase):
+
+    def test_same_as_before_abbreviation_matcher(self):
+        scraper = CABillScraper.__new__(CABillScraper)
+        scraper.logger = logging.getLogger(__name__)
+        scraper.logger.disabled = True
+        matcher = get_committee_abbr_matcher()
+        regex = get_committee_name_regex()
+        texts = list(action_texts())
+        actions = [Action(text, ACTORS[i % len(ACTORS)])
+                   for i, text in enumerate(texts)]
+        # the last few, some without a committee, with every actor
+        actions.extend(Action(text, actor) for text in texts[-6:]
+                       for actor in ACTORS)
+        for chamber in ('upper', 'lower'):
+            for action in actions:
+                actor, act_str, kwargs = scraper.prepare_action(
+                    action, chamber, matcher)
+                kwargs.update(scraper.categorizer.categorize(act_str))
+                self.assertEqual(
+                    (actor, act_str, kwargs.get('committees', []),
+                     kwargs.get('actor_info')),
+                    old_action(scraper, action, chamber, regex))
@@ -0,0 +1,136 @@
+import datetime
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from openstates.ca.models import (Base, CABill, CABillVersion,
+                                  CABillVersionAuthor, CABillAction,
+                                  CAVoteSummary, CAVoteDetail, CALocation,
+                                  CAMotion)
+from openstates.ca.bills import (iter_bills, vote_key, load_vote_details,
+                                 vote_rollup)
+
+DATE = datetime.datetime(2017, 1, 1)
+
+
+def add_bill(session, num):
+    bill_id = '20172018AB%d' % num
+    session.add(CABill(bill_id=bill_id, session_year='20172018',
+                       session_num='0', measure_type='AB', measure_num=num))
+    for version_num in range(2):
+        version_id = '%s%d' % (bill_id, version_num)
+        session.add(CABillVersion(bill_version_id=version_id, bill_id=bill_id,
+                                  version_num=version_num, bill_xml='<x/>',
+                                  bill_version_action_date=DATE,
+                                  vote_required='Majority'))
+        session.add(CABillVersionAuthor(bill_version_id=version_id,
+                                        name='Author %s' % version_id,
+                                        trans_update=DATE))
+    session.add(CABillAction(bill_id=bill_id, bill_history_id=num,
+                             action='Read first time.'))
+    session.add(CAVoteSummary(bill_id=bill_id, location_code='AFLOOR',
+                              vote_date_time=DATE, vote_date_seq=1,
+                              motion_id=1, trans_update=DATE))
+    session.add(CAVoteDetail(bill_id=bill_id, location_code='AFLOOR',
+                             legislator_name='Smith', vote_date_time=DATE,
+                             vote_date_seq=1, vote_code='AYE', motion_id=1,
+                             trans_uid='1', trans_update=DATE))
+
+
+def read_bill(bill):
+    ''' everything CABillScraper reads from a bill '''
+    return (
+        bill.short_bill_id,
+        [(version.version_num, [author.name for author in version.authors])
+         for version in bill.versions],
+        [action.action for action in bill.actions],
+        [(vote.location.description, vote.motion.motion_text,
+          [record.legislator_name for record in vote.votes], vote.threshold)
+         for vote in bill.votes],
+    )
+
+
+class TestIterBills(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        session = self.Session()
+        for num in range(20):
+            add_bill(session, num)
+        session.add(CALocation(session_year='20172018', location_code='AFLOOR',
+                               location_type='F', consent_calendar_code='0',
+                               description='Assembly Floor'))
+        session.add(CAMotion(motion_id=1, motion_text='Third Reading'))
+        session.commit()
+        session.close()
+
+        self.queries = 0
+        event.listen(self.engine, 'before_cursor_execute', self.count_query)
+
+    def count_query(self, *args):
+        self.queries += 1
+
+    def read_bills(self, bills, session, chunk_size=None):
+        self.queries = 0
+        if chunk_size is None:
+            return [read_bill(bill) for bill in bills]
+        return [read_bill(bill)
+                for bill in iter_bills(session, bills, chunk_size)]
+
+    def test_same_bills_in_few_queries(self):
+        session = self.Session()
+        bills = session.query(CABill).filter_by(measure_type='AB')
+
+        lazy = self.read_bills(bills, session)
+        lazy_queries = self.queries
+        session.expunge_all()
+        batched = self.read_bills(bills, session, chunk_size=100)
+
+        self.assertEqual(sorted(lazy), batched)
+        self.assertGreater(lazy_queries, 100)
+        self.assertLess(self.queries, 10)
+
+    def test_queries_grow_with_chunks_not_bills(self):
+        session = self.Session()
+        few = session.query(CABill).filter(CABill.measure_num < 5)
+        self.read_bills(few, session, chunk_size=10)
+        one_chunk = self.queries
+
+        everything = session.query(CABill)
+        self.assertEqual(len(self.read_bills(everything, session,
+                                             chunk_size=10)), 20)
+        self.assertEqual(self.queries, 2 * one_chunk - 1)
+
+    def test_vote_details_of_chunk(self):
+        session = self.Session()
+        session.add(CAVoteDetail(bill_id='20172018AB3', location_code='AFLOOR',
+                                 legislator_name='Jones', vote_date_time=DATE,
+                                 vote_date_seq=1, vote_code='NOE', motion_id=1,
+                                 trans_uid='1', trans_update=DATE))
+        session.commit()
+        bills = session.query(CABill).filter(CABill.measure_num < 5)
+        self.read_bills(bills, session, chunk_size=10)
+        with_details = self.queries
+
+        chunks = []
+        self.queries = 0
+        read = [(bill.bill_id, [vote_key(vote) for vote in bill.votes])
+                for bill in iter_bills(session, bills, 10, vote_details=False,
+                                       chunk_loaded=chunks.append)]
+        self.assertEqual(self.queries, with_details - 1)
+        self.assertEqual(len(chunks), 1)
+
+        votes = [vote for bill in chunks[0] for vote in bill.votes]
+        details = load_vote_details(session, votes[:4])
+        self.assertEqual(self.queries, with_details)
+        self.assertEqual(sorted(details),
+                         sorted(keys[0] for _, keys in read[:4]))
+        self.assertEqual(vote_rollup(details[vote_key(votes[3])]),
+                         {'yes': ['Smith'], 'no': ['Jones'], 'other': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
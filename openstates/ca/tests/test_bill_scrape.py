@@ -0,0 +1,135 @@
+import os
+import json
+import shutil
+import datetime
+import itertools
+import tempfile
+import unittest
+from unittest import mock
+
+from pupa.scrape import Scraper
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from openstates.ca import bills
+from openstates.ca.actions import CACategorizer
+from openstates.ca.models import (Base, CABill, CABillVersion,
+                                  CABillVersionAuthor, CABillAction,
+                                  CAVoteSummary, CAVoteDetail, CALocation,
+                                  CAMotion)
+
+DATE = datetime.datetime(2017, 1, 1)
+SESSION = '20172018'
+HISTORY_IDS = itertools.count()
+
+BILL_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<caml:MeasureDoc xmlns:caml="http://lc.ca.gov/legalservices/schemas/caml.1#"
+                 xmlns:xhtml="http://www.w3.org/1999/xhtml">
+  <caml:Description>
+    <caml:Title>An act relating to %(subject)s.</caml:Title>
+    <caml:DigestText><xhtml:p>Existing law, %(subject)s.</xhtml:p></caml:DigestText>
+    <caml:Subject>%(subject)s</caml:Subject>
+  </caml:Description>
+</caml:MeasureDoc>
+'''
+
+ACTIONS = [
+    ('Introduced. Read first time. To Com. on RLS. for assignment.', None),
+    ('Referred to Com. on APPR.', 'Assembly'),
+    ('From committee: Do pass and re-refer to Com. on APPR. (Ayes 12. '
+     'Noes 2.) (April 4).', 'CX25'),
+    ('Read third time.  Passed.\nOrdered to the Senate.', 'Assembly (Floor)'),
+    ('Approved by the Governor.', 'Governor'),
+]
+
+
+def add_bill(session, measure_type, num):
+    bill_id = '%s%s%d' % (SESSION, measure_type, num)
+    session.add(CABill(bill_id=bill_id, session_year=SESSION,
+                       session_num='0', measure_type=measure_type,
+                       measure_num=num))
+    for version_num in range(2):
+        version_id = '%s%d' % (bill_id, version_num)
+        subject = 'subject %d of %s %d' % (version_num, measure_type, num)
+        session.add(CABillVersion(bill_version_id=version_id, bill_id=bill_id,
+                                  version_num=version_num,
+                                  bill_xml=BILL_XML % {'subject': subject},
+                                  bill_version_action_date=DATE,
+                                  vote_required='Majority', trans_update=DATE))
+        session.add(CABillVersionAuthor(
+            bill_version_id=version_id, name='Author %s' % version_id,
+            house='ASSEMBLY' if measure_type == 'AB' else 'SENATE',
+            contribution='LEAD_AUTHOR', primary_author_flg='Y',
+            trans_update=DATE))
+    for i, (action, location) in enumerate(ACTIONS[:num % len(ACTIONS) + 1]):
+        session.add(CABillAction(
+            bill_id=bill_id, bill_history_id=next(HISTORY_IDS),
+            action_date=DATE + datetime.timedelta(days=i),
+            action='%s %s' % (action, num) if i == 1 else action,
+            primary_location=location))
+    session.add(CAVoteSummary(bill_id=bill_id, location_code='AFLOOR',
+                              vote_date_time=DATE, vote_date_seq=1,
+                              motion_id=1, vote_result='(PASS)',
+                              trans_update=DATE))
+    for name, code in (('Smith', 'AYE'), ('Jones', 'NOE')):
+        session.add(CAVoteDetail(bill_id=bill_id, location_code='AFLOOR',
+                                 legislator_name=name, vote_date_time=DATE,
+                                 vote_date_seq=1, vote_code=code, motion_id=1,
+                                 trans_uid='1', trans_update=DATE))
+
+
+def summary(obj):
+    ''' the scraped object without the ids it's given at random '''
+    data = obj.as_dict()
+    data.pop('_id')
+    data.pop('bill', None)
+    return type(obj).__name__, data
+
+
+class TestParallelScrape(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.directory, 'capublic.sqlite')
+        engine = create_engine('sqlite:///' + self.db_path)
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        for measure_type, count in (('AB', 11), ('SB', 4)):
+            for num in range(1, count + 1):
+                add_bill(session, measure_type, num)
+        session.add(CALocation(session_year=SESSION, location_code='AFLOOR',
+                               location_type='F', consent_calendar_code='0',
+                               description='Assembly Floor'))
+        session.add(CAMotion(motion_id=1, motion_text='Third Reading'))
+        session.commit()
+        session.close()
+        engine.dispose()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def scrape(self, processes):
+        '''the objects a scrape with `processes` emits, and the categorizer
+        cache it saves, starting from empty caches'''
+        cache_dir = os.path.join(self.directory, 'cache%d' % processes)
+        with mock.patch.object(bills.settings, 'CACHE_DIR', cache_dir), \
+                mock.patch.object(bills, 'BILL_PART_SIZE', 3):
+            scraper = bills.CABillScraper.__new__(bills.CABillScraper)
+            Scraper.__init__(scraper, None, self.directory)
+            scraper.categorizer = CACategorizer(compiled=True, cache_size=1000)
+            scraper.conn_str = 'sqlite:///' + self.db_path
+            scraper.connect()
+            objects = [summary(obj) for obj in
+                       scraper.scrape(session=SESSION, processes=processes)]
+            scraper.session.close()
+        with open(os.path.join(cache_dir, 'categorizer', 'ca.json')) as f:
+            cache = json.load(f)
+        return objects, dict(cache['results'])
+
+    def test_same_as_serial(self):
+        serial_objects, serial_cache = self.scrape(1)
+        parallel_objects, parallel_cache = self.scrape(2)
+        self.assertEqual(len(serial_objects), 30)
+        self.assertEqual(parallel_objects, serial_objects)
+        self.assertGreater(len(serial_cache), len(ACTIONS))
+        self.assertEqual(parallel_cache, serial_cache)
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from openstates.ca.cache import SQLiteCache
+from openstates.ca.models import CABillVersion, extract_version_fields
+
+BILL_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<caml:MeasureDoc xmlns:caml="http://lc.ca.gov/legalservices/schemas/caml.1#"
+                 xmlns:xhtml="http://www.w3.org/1999/xhtml">
+  <caml:Description>
+    <caml:Title> An act to amend Section <xhtml:span>17052</xhtml:span> of
+      the Revenue and Taxation Code, relating to taxation. </caml:Title>
+    <caml:DigestText>
+      <xhtml:p>Existing law (1)allows a credit.</xhtml:p>
+      <xhtml:p>This bill would   extend the credit.</xhtml:p>
+    </caml:DigestText>
+    <caml:Subject>Income taxes: credits</caml:Subject>
+  </caml:Description>
+  <caml:Bill>
+    <caml:BillSection><xhtml:p>%s</xhtml:p></caml:BillSection>
+    <caml:Title>Not the bill's title</caml:Title>
+  </caml:Bill>
+</caml:MeasureDoc>
+'''
+
+
+class TestVersionFields(unittest.TestCase):
+
+    def test_fields(self):
+        version = CABillVersion(bill_xml=BILL_XML % 'text')
+        self.assertEqual(version.title,
+                         'An act to amend Section 17052 of\n      the Revenue '
+                         'and Taxation Code, relating to taxation.')
+        self.assertEqual(version.short_title, 'Income taxes: credits')
+        self.assertEqual(version.digest,
+                         'Existing law (1) allows a credit.\n\n'
+                         'This bill would extend the credit.')
+
+    def test_every_digest_paragraph(self):
+        xml = BILL_XML.replace('</caml:DigestText>', '''</caml:DigestText>
+    <caml:DigestText>
+      <xhtml:p>This bill would also (2)repeal
+        the credit.</xhtml:p>
+      <xhtml:p>Appropriation: no.</xhtml:p>
+    </caml:DigestText>''', 1) % 'text'
+        self.assertEqual(extract_version_fields(xml)['digest'],
+                         'Existing law (1) allows a credit.\n\n'
+                         'This bill would extend the credit.\n\n'
+                         'This bill would also (2) repeal the credit.\n\n'
+                         'Appropriation: no.')
+
+    def test_missing_fields(self):
+        fields = extract_version_fields('<caml:MeasureDoc xmlns:caml="x"/>')
+        self.assertEqual(fields, {'title': '', 'short_title': '',
+                                  'digest': ''})
+
+
+class TestSQLiteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'ca', 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_persists_by_version(self):
+        cache = SQLiteCache(self.path, 'versions')
+        self.assertIsNone(cache.get('AB1', '2017-01-01'))
+        cache.put('AB1', '2017-01-01', {'title': 'A'})
+        cache.close()
+
+        cache = SQLiteCache(self.path, 'versions')
+        self.assertEqual(cache.get('AB1', '2017-01-01'), {'title': 'A'})
+        self.assertIsNone(cache.get('AB1', '2017-02-01'))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
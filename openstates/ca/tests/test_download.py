@@ -0,0 +1,287 @@
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+try:
+    import MySQLdb.cursors
+except ImportError:
+    raise unittest.SkipTest('download.py needs mysqlclient')
+
+from openstates.ca import download
+from openstates.ca.fetch import Fetched
+
+CONTENTS = {
+    'pubinfo_2017.zip': datetime(2017, 1, 1),
+    'pubinfo_2015.zip': datetime(2015, 1, 1),
+    'pubinfo_Mon.zip': datetime(2017, 3, 6),
+    'pubinfo_Tue.zip': datetime(2017, 3, 7),
+    'pubinfo_Wed.zip': datetime(2016, 12, 28),
+    'pubinfo_Thu.zip': datetime(2016, 12, 29),
+    'pubinfo_Fri.zip': datetime(2016, 12, 30),
+    'pubinfo_Sat.zip': datetime(2016, 12, 31),
+}
+YEAR = ('pubinfo_2017.zip', datetime(2017, 1, 1))
+MON = ('pubinfo_Mon.zip', datetime(2017, 3, 6))
+TUE = ('pubinfo_Tue.zip', datetime(2017, 3, 7))
+
+
+class KeyCursor(object):
+    ''' answers primary_key's queries from a dict of table -> key columns '''
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def execute(self, sql, params):
+        self.rows = [(column,) for column in self.keys[params[0]]]
+
+    def fetchall(self):
+        return self.rows
+
+
+class SqliteCursor(object):
+    ''' runs merge_staging's statements against sqlite '''
+
+    def __init__(self, connection):
+        self.cursor = connection.cursor()
+
+    def execute(self, sql, params=()):
+        sql = sql.replace('%s', '?').replace('DROP TEMPORARY', 'DROP')
+        self.cursor.execute(sql, params)
+        self.rowcount = self.cursor.rowcount
+
+
+BILL_XML = 'Sec. 1.\tThe\\law\nis amended.\0 ' * 10
+INFILE_ESCAPES = {b'0': b'\0', b't': b'\t', b'n': b'\n', b'r': b'\r'}
+
+
+def write_bill_versions(directory, count):
+    ''' a BILL_VERSION_TBL.dat of `count` versions and their xml files '''
+    with open(os.path.join(directory, 'BILL_VERSION_TBL.dat'), 'w') as dat:
+        for i in range(count):
+            xml = 'AB%d_0.xml' % i
+            with open(os.path.join(directory, xml), 'w') as f:
+                f.write('<caml:Title>%d</caml:Title>%s' % (i, BILL_XML))
+            cells = ['AB%d_0' % i, 'AB%d' % i, '0', '2017-01-01',
+                     'Introduced', 'NULL', 'An act', 'MAJORITY', 'N', 'N',
+                     'N', 'N', 'N', 'N', xml, 'Y', 'NULL',
+                     '2017-01-01 00:00:00']
+            dat.write('\t'.join(cell if cell == 'NULL' else '`%s`' % cell
+                                 for cell in cells) + '\n')
+
+
+def read_infile(data):
+    ''' the rows of a file in LOAD DATA's default field format '''
+    def unescape(field):
+        if field == b'\\N':
+            return None
+        return re.sub(br'\\(.)',
+                      lambda m: INFILE_ESCAPES.get(m.group(1), m.group(1)),
+                      field, flags=re.DOTALL)
+    return [[unescape(field) for field in line.split(b'\t')]
+            for line in data.splitlines()]
+
+
+class FakeConnection(object):
+    ''' what MySQLdb's cursors need of a connection to build statements '''
+    encoding = 'utf8'
+
+    def __init__(self):
+        self.statements = []
+
+    def literal(self, value):
+        if value is None:
+            return b'NULL'
+        value = value.replace(b'\\', b'\\\\').replace(b"'", b"\\'")
+        return b"'" + value + b"'"
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+
+class RecordingCursor(MySQLdb.cursors.Cursor):
+    ''' records the statements MySQLdb would send to the server '''
+
+    def execute(self, query, args=None):
+        if args:
+            # the staging file of LOAD DATA is removed once it's loaded
+            with open(args[0], 'rb') as f:
+                args = f.read()
+        if isinstance(query, bytearray):
+            query = bytes(query)
+        self.connection.statements.append((query, args))
+        return 1
+
+    def close(self):
+        pass
+
+
+class TestBillVersionLoading(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        write_bill_versions(self.directory, 10)
+        os.chdir(self.directory)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def expected(self):
+        with open('BILL_VERSION_TBL.dat') as f:
+            return [download.read_bill_version(row) for row in f]
+
+    def test_infile_field(self):
+        self.assertEqual(download.infile_field(None), b'\\N')
+        self.assertEqual(download.infile_field(b'NULL'), b'NULL')
+        self.assertEqual(download.infile_field(b''), b'')
+        self.assertEqual(download.infile_field(b'a\tb\nc\r\nd'),
+                         b'a\\tb\\nc\\r\\nd')
+        self.assertEqual(download.infile_field(b'C:\\N\\t'),
+                         b'C:\\\\N\\\\t')
+        self.assertEqual(download.infile_field(b'a\0b'), b'a\\0b')
+
+    def test_infile(self):
+        connection = FakeConnection()
+        download.load_bill_versions(connection, batch_size=4, workers=1,
+                                    infile=True)
+        [(sql, data)] = connection.statements
+        self.assertIn('LOAD DATA LOCAL INFILE', sql)
+        self.assertEqual(data.count(b'\n'), 10)
+        rows = read_infile(data)
+        self.assertEqual(rows, self.expected())
+        self.assertIn(BILL_XML.encode(), rows[0][14])
+        self.assertIsNone(rows[0][5])
+        self.assertFalse(os.path.exists('bill_version_tbl.staging'))
+
+    def test_statements_split_at_limit(self):
+        connection = FakeConnection()
+        with mock.patch.object(download, 'MAX_STATEMENT_LENGTH', 2000):
+            download.load_bill_versions(connection, batch_size=4, workers=1,
+                                        infile=False)
+        statements = [sql for sql, args in connection.statements]
+        self.assertTrue(all(args is None for _, args in connection.statements))
+        self.assertTrue(all(sql.strip().startswith(
+            b'REPLACE INTO capublic.bill_version_tbl') for sql in statements))
+        self.assertTrue(all(len(sql) <= 2000 for sql in statements))
+        # one multi-row statement per batch, split further at the limit
+        rows = [sql.count(b"'),('") + 1 for sql in statements]
+        self.assertEqual(sum(rows), 10)
+        self.assertGreater(len(statements), 3)
+        self.assertGreater(max(rows), 1)
+        ids = re.findall(br"\('(AB\d+_0)'", b''.join(statements))
+        self.assertEqual(ids, [row[0] for row in self.expected()])
+
+
+class TestPlanSync(unittest.TestCase):
+
+    def test_dumps(self):
+        self.assertEqual(download.get_dumps(CONTENTS), [YEAR, MON, TUE])
+
+    def test_new_year_applies_everything(self):
+        self.assertEqual(download.plan_sync([YEAR, MON, TUE], set([MON])),
+                         [YEAR, MON, TUE])
+
+    def test_skips_applied(self):
+        self.assertEqual(download.plan_sync([YEAR, MON, TUE],
+                                            set([YEAR, MON])), [TUE])
+        self.assertEqual(download.plan_sync([YEAR, MON, TUE],
+                                            set([YEAR, MON, TUE])), [])
+
+    def test_republished_day_is_applied_again(self):
+        old_mon = ('pubinfo_Mon.zip', datetime(2017, 2, 27))
+        self.assertEqual(download.plan_sync([YEAR, MON, TUE],
+                                            set([YEAR, old_mon, TUE])), [MON])
+
+
+class TestMerge(unittest.TestCase):
+
+    def test_check_mergeable(self):
+        cursor = KeyCursor({'bill_tbl': ['BILL_ID'], 'daily_file_tbl': [],
+                            'bill_motion_tbl': []})
+        download.check_mergeable(cursor, ['bill_tbl'])
+        download.check_mergeable(cursor, ['bill_tbl', 'daily_file_tbl'],
+                                 fresh_tables=['daily_file_tbl'])
+        with self.assertRaises(download.MergeError) as cm:
+            download.check_mergeable(cursor, ['bill_motion_tbl', 'bill_tbl',
+                                              'daily_file_tbl'])
+        self.assertIn('bill_motion_tbl, daily_file_tbl', str(cm.exception))
+
+    def test_merge_staging_replaces_by_key(self):
+        connection = sqlite3.connect(':memory:')
+        connection.execute("ATTACH DATABASE ':memory:' AS capublic")
+        connection.execute('CREATE TABLE capublic.bill_tbl '
+                           '(bill_id PRIMARY KEY, status, trans_update)')
+        connection.executemany('INSERT INTO capublic.bill_tbl VALUES (?, ?, ?)',
+                               [('AB1', 'Introduced', '2017-03-06'),
+                                ('AB2', 'Introduced', '2017-03-06')])
+        for _ in range(2):
+            # a late row older than what's loaded is still merged
+            connection.execute('CREATE TEMPORARY TABLE staging_bill_tbl '
+                               '(bill_id, status, trans_update)')
+            connection.executemany(
+                'INSERT INTO staging_bill_tbl VALUES (?, ?, ?)',
+                [('AB1', 'Chaptered', '2017-03-05'),
+                 ('AB3', 'Introduced', '2017-03-07')])
+            download.merge_staging(SqliteCursor(connection), 'bill_tbl',
+                                   'staging_bill_tbl')
+        self.assertEqual(
+            connection.execute('SELECT bill_id, status FROM capublic.bill_tbl '
+                               'ORDER BY bill_id').fetchall(),
+            [('AB1', 'Chaptered'), ('AB2', 'Introduced'),
+             ('AB3', 'Introduced')])
+
+
+@mock.patch.object(download, 'record_applied')
+@mock.patch.object(download, 'delete_session')
+@mock.patch.object(download, 'load')
+@mock.patch.object(download, 'fetch_all')
+@mock.patch.object(download, 'get_applied')
+class TestSync(unittest.TestCase):
+
+    def setUp(self):
+        def fetch_all(filenames, base_url):
+            for filename in filenames:
+                yield Fetched(filename, filename.replace('.zip', ''), 0, 0, 0)
+        self.fetch_all = fetch_all
+
+    def test_applies_new_day_zips(self, get_applied, fetch_all, load,
+                                  delete_session, record_applied):
+        get_applied.return_value = set([YEAR, MON])
+        fetch_all.side_effect = self.fetch_all
+        self.assertTrue(download.sync(CONTENTS))
+        load.assert_called_once_with('pubinfo_Tue', merge=True)
+        record_applied.assert_called_once_with(*TUE)
+        self.assertFalse(delete_session.called)
+
+    def test_new_year_reloads_session(self, get_applied, fetch_all, load,
+                                      delete_session, record_applied):
+        get_applied.return_value = set()
+        fetch_all.side_effect = self.fetch_all
+        self.assertTrue(download.sync(CONTENTS))
+        delete_session.assert_called_once_with('2017')
+        self.assertEqual([call[0][0] for call in load.call_args_list],
+                         ['pubinfo_2017', 'pubinfo_Mon', 'pubinfo_Tue'])
+        self.assertIn('bill_tbl', load.call_args_list[0][1]['fresh_tables'])
+        self.assertEqual([call[0] for call in record_applied.call_args_list],
+                         [YEAR, MON, TUE])
+
+    def test_unmergeable_table_rebuilds(self, get_applied, fetch_all, load,
+                                        delete_session, record_applied):
+        get_applied.return_value = set([YEAR])
+        fetch_all.side_effect = self.fetch_all
+        load.side_effect = [None, download.MergeError('no key')]
+        self.assertFalse(download.sync(CONTENTS))
+        self.assertEqual([call[0] for call in record_applied.call_args_list],
+                         [MON])
+
+    def test_no_database(self, get_applied, fetch_all, load, delete_session,
+                         record_applied):
+        get_applied.side_effect = download._mysql_exceptions.OperationalError
+        self.assertFalse(download.sync(CONTENTS))
+        self.assertFalse(fetch_all.called)
@@ -0,0 +1,129 @@
+import io
+import os
+import shutil
+import zipfile
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from openstates.ca import fetch
+
+
+def make_zip(files):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as z:
+        for name, data in files.items():
+            z.writestr(name, data)
+    return buf.getvalue()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    ''' serves the server's `files` with ETags and Range support, like
+    downloads.leginfo.legislature.ca.gov '''
+
+    def do_GET(self):
+        name = self.path.lstrip('/')
+        self.server.requests.append((name, self.headers.get('Range')))
+        if name not in self.server.files:
+            self.send_error(404)
+            return
+        data = self.server.files[name]
+        etag = '"%d"' % hash(data)
+
+        start = 0
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range') == etag:
+            start = int(range_header.split('=')[1].rstrip('-'))
+            if start >= len(data):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %d-%d/%d' % (
+                start, len(data) - 1, len(data)))
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(data) - start))
+        self.end_headers()
+        self.wfile.write(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFetch(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.files = {
+            'pubinfo_2017.zip': make_zip({'BILL_TBL.dat': b'x' * 100000}),
+            'pubinfo_Mon.zip': make_zip({'BILL_TBL.dat': b'monday'}),
+            'pubinfo_Tue.zip': make_zip({'BILL_TBL.dat': b'tuesday',
+                                         'LAW_TBL.dat': b'law'}),
+        }
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.base_url = 'http://127.0.0.1:%d/' % self.server.server_port
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def read(self, *path):
+        with open(os.path.join(self.directory, *path), 'rb') as f:
+            return f.read()
+
+    def test_fetch_all(self):
+        filenames = ['pubinfo_2017.zip', 'pubinfo_Mon.zip', 'pubinfo_Tue.zip']
+        fetched = list(fetch.fetch_all(filenames, self.base_url,
+                                       self.directory, workers=3))
+
+        self.assertEqual([f.filename for f in fetched], filenames)
+        self.assertEqual([f.dirname for f in fetched],
+                         ['pubinfo_2017', 'pubinfo_Mon', 'pubinfo_Tue'])
+        self.assertEqual(fetched[0].size,
+                         len(self.server.files['pubinfo_2017.zip']))
+        self.assertEqual(self.read('pubinfo_Tue', 'LAW_TBL.dat'), b'law')
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['pubinfo_2017', 'pubinfo_Mon', 'pubinfo_Tue'])
+
+    def test_resume(self):
+        data = self.server.files['pubinfo_2017.zip']
+        path = os.path.join(self.directory, 'pubinfo_2017.zip')
+        with open(path + '.part', 'wb') as f:
+            f.write(data[:1000])
+        with open(path + '.part.validator', 'w') as f:
+            f.write('"%d"' % hash(data))
+
+        fetched = fetch.fetch('pubinfo_2017.zip', self.base_url,
+                              self.directory)
+
+        self.assertEqual(self.server.requests,
+                         [('pubinfo_2017.zip', 'bytes=1000-')])
+        self.assertEqual(fetched.size, len(data) - 1000)
+        self.assertEqual(self.read('pubinfo_2017', 'BILL_TBL.dat'),
+                         b'x' * 100000)
+        self.assertEqual(os.listdir(self.directory), ['pubinfo_2017'])
+
+    def test_changed_file_is_downloaded_again(self):
+        data = self.server.files['pubinfo_Mon.zip']
+        path = os.path.join(self.directory, 'pubinfo_Mon.zip')
+        with open(path + '.part', 'wb') as f:
+            f.write(b'last week')
+        with open(path + '.part.validator', 'w') as f:
+            f.write('"stale"')
+
+        fetched = fetch.fetch('pubinfo_Mon.zip', self.base_url,
+                              self.directory)
+
+        self.assertEqual(fetched.size, len(data))
+        self.assertEqual(self.read('pubinfo_Mon', 'BILL_TBL.dat'), b'monday')
+
+
+if __name__ == '__main__':
+    unittest.main()
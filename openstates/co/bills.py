@@ -25,7 +25,7 @@ BAD_URLS = [
 
 class COBillScraper(Scraper, LXMLMixin):
     _tz = pytz.timezone('US/Mountain')
-    categorizer = Categorizer()
+    categorizer = Categorizer(compiled=True)
 
     def scrape(self, chamber=None, session=None):
         """
@@ -8,7 +8,7 @@ from .actions import Categorizer
 
 
 class DEBillScraper(Scraper, LXMLMixin):
-    categorizer = Categorizer()
+    categorizer = Categorizer(compiled=True)
     chamber_codes = {'upper': 1, 'lower': 2}
     chamber_codes_rev = {1: 'upper', 2: 'lower'}
     chamber_map = {'House': 'lower', 'Senate': 'upper'}
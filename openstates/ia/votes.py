@@ -4,7 +4,7 @@ import re
 import collections
 import lxml.etree
 
-from pupa.utils.generic import convert_pdf
+from openstates.utils import convert_pdf
 from pupa.scrape import Scraper, VoteEvent
 
 
@@ -7,7 +7,8 @@ import pytz
 import scrapelib
 import lxml.html
 from pupa.scrape import Scraper, Bill, VoteEvent
-from pupa.utils import convert_pdf
+from openstates.utils import convert_pdf
+from openstates.utils.rollcall import CodedRollCall
 
 from ._utils import canonicalize_url
 
@@ -179,6 +180,7 @@ OTHER_FREQUENT_ACTION_PATTERNS_WHICH_ARE_CURRENTLY_UNCLASSIFIED = [
 ]
 
 VOTE_VALUES = ['NV', 'Y', 'N', 'E', 'A', 'P', '-']
+ROLL_CALL = CodedRollCall(VOTE_VALUES)
 
 COMMITTEE_CORRECTIONS = {
     'Elementary & Secondary Education: School Curriculum & Policies':
@@ -637,44 +639,11 @@ class IlBillScraper(Scraper):
 
 
 def find_columns_and_parse(vote_lines):
-    columns = find_columns(vote_lines)
-    votes = {}
-    for line in vote_lines:
-        for idx in reversed(columns):
-            bit = line[idx:]
-            line = line[:idx]
-            if bit:
-                vote, name = bit.split(' ', 1)
-                votes[name.strip()] = vote
-    return votes
-
-
-def _is_potential_column(line, i):
-    for val in VOTE_VALUES:
-        if re.search(r'^%s\s{2,10}(\w.).*' % val, line[i:]):
-            return True
-    return False
+    return dict(ROLL_CALL.parse(vote_lines))
 
 
 def find_columns(vote_lines):
-    potential_columns = []
-
-    for line in vote_lines:
-        pcols = set()
-        for i, x in enumerate(line):
-            if _is_potential_column(line, i):
-                pcols.add(i)
-        potential_columns.append(pcols)
-
-    starter = potential_columns[0]
-    for pc in potential_columns[1:-1]:
-        starter.intersection_update(pc)
-    last_row_cols = potential_columns[-1]
-    if not last_row_cols.issubset(starter):
-        raise Exception("Row's columns [%s] don't align with candidate final columns [%s]: %s" %
-                        (last_row_cols, starter, line))
-    # we should now only have values that appeared in every line
-    return sorted(starter)
+    return ROLL_CALL.find_columns(vote_lines).xs
 
 
 def build_sponsor_list(sponsor_atags):
@@ -1,13 +1,12 @@
 import re
 import datetime
-import os
 from collections import OrderedDict
 
 import scrapelib
 import pytz
 
 from pupa.scrape import Scraper, Bill, VoteEvent
-from pupa.utils.generic import convert_pdf
+from openstates.utils import PDFPipeline
 
 from .apiclient import ApiClient
 
@@ -40,6 +39,12 @@ class INBillScraper(Scraper):
 
         return url_template.format(session, url_segment, bill_number)
 
+    def _download_rollcalls(self, rollcalls, proxy):
+        for r in rollcalls:
+            proxy_link = proxy["url"] + r["link"]
+            (path, resp) = self.urlretrieve(proxy_link)
+            yield proxy_link, path
+
     def _process_votes(self, rollcalls, bill_id, original_chamber, session, proxy):
         result_types = {
             'FAILED': False,
@@ -52,12 +57,10 @@ class INBillScraper(Scraper):
             'ADOPTED': True,
         }
 
-        for r in rollcalls:
-            proxy_link = proxy["url"] + r["link"]
-            (path, resp) = self.urlretrieve(proxy_link)
-            text = convert_pdf(path, 'text').decode("utf-8")
+        for proxy_link, text in self.pdf_pipeline.convert(
+                self._download_rollcalls(rollcalls, proxy)):
+            text = text.decode("utf-8")
             lines = text.split("\n")
-            os.remove(path)
 
             chamber = "lower" if "house of representatives" in lines[0].lower() else "upper"
             date_parts = lines[1].strip().split()[-3:]
@@ -250,6 +253,11 @@ class INBillScraper(Scraper):
         # sunlight's put up a proxy service at this link
         # using our api key for pdf document access.
 
+        with PDFPipeline('text', remove=True,
+                         logger=self.logger) as self.pdf_pipeline:
+            yield from self._scrape_session(session, api_base_url, proxy)
+
+    def _scrape_session(self, session, api_base_url, proxy):
         client = ApiClient(self)
         r = client.get("bills", session=session)
         all_pages = client.unpaginate(r)
@@ -5,8 +5,7 @@ import os
 import re
 from collections import defaultdict
 from pupa.scrape import Scraper, Bill, VoteEvent as Vote
-from pupa.utils import convert_pdf
-from openstates.utils import LXMLMixin
+from openstates.utils import LXMLMixin, convert_pdf
 
 
 class LABillScraper(Scraper, LXMLMixin):
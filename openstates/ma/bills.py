@@ -4,13 +4,13 @@ import os
 from datetime import datetime
 import lxml.html
 from pupa.scrape import Scraper, Bill, VoteEvent
-from pupa.utils import convert_pdf
+from openstates.utils import convert_pdf
 
 from .actions import Categorizer
 
 
 class MABillScraper(Scraper):
-    categorizer = Categorizer()
+    categorizer = Categorizer(compiled=True)
     session_filters = {}
     chamber_filters = {}
     house_pdf_cache = {}
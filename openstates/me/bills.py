@@ -17,7 +17,7 @@ BLACKLISTED_BILL_IDS = {
 
 
 class MEBillScraper(Scraper):
-    categorizer = Categorizer()
+    categorizer = Categorizer(compiled=True)
 
     def scrape(self, chamber=None, session=None):
         chambers = [chamber] if chamber is not None else ['upper', 'lower']
@@ -1,12 +1,10 @@
-import os
 import re
 import pytz
 import collections
 import datetime as dt
 
-from openstates.utils import LXMLMixin
+from openstates.utils import LXMLMixin, PDFPipeline
 
-from pupa.utils.generic import convert_pdf
 from pupa.scrape import Scraper, VoteEvent
 
 motion_re = r"(?i)On motion of .*, .*"
@@ -31,11 +29,10 @@ class MOVoteScraper(Scraper, LXMLMixin):
 
         return obj
 
-    def _get_pdf(self, url):
-        (path, response) = self.urlretrieve(url)
-        data = convert_pdf(path, type='text')
-        os.remove(path)
-        return data
+    def _download_pdfs(self, urls):
+        for url in urls:
+            (path, response) = self.urlretrieve(url)
+            yield url, path
 
     def _scrape_upper_chamber(self, session):
         if int(session[:4]) >= 2016:
@@ -60,9 +57,14 @@ class MOVoteScraper(Scraper, LXMLMixin):
 
         page = self.lxmlize(url)
         journs = page.xpath("//table")[0].xpath(".//a")
-        for a in journs:
-            pdf_url = a.attrib['href']
-            data = self._get_pdf(pdf_url).decode()
+        with PDFPipeline('text', remove=True, logger=self.logger) as pipeline:
+            pdfs = pipeline.convert(
+                self._download_pdfs(a.attrib['href'] for a in journs))
+            yield from self._parse_journals(pdfs, url, session, vote_types)
+
+    def _parse_journals(self, pdfs, url, session, vote_types):
+        for pdf_url, data in pdfs:
+            data = data.decode()
             lines = data.split("\n")
 
             in_vote = False
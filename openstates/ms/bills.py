@@ -1,5 +1,5 @@
 from pupa.scrape import Scraper, Bill, VoteEvent
-from pupa.utils.generic import convert_pdf
+from openstates.utils import convert_pdf
 from datetime import datetime
 import lxml.etree
 import os
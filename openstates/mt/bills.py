@@ -8,7 +8,7 @@ from urllib.parse import urljoin
 from collections import defaultdict
 
 from pupa.scrape import Scraper, Bill, VoteEvent
-from pupa.utils.generic import convert_pdf
+from openstates.utils import convert_pdf
 from scrapelib import HTTPError
 
 import lxml.html
@@ -2,7 +2,7 @@
 import re
 from itertools import dropwhile
 from pupa.scrape import Organization, Scraper
-from pupa.utils.generic import convert_pdf
+from openstates.utils import convert_pdf
 
 
 committee_urls = {
@@ -11,7 +11,7 @@ class NDBillScraper(Scraper, LXMLMixin):
     Scrapes available legislative information from the website of the North
     Dakota legislature and stores it in the openstates  backend.
     """
-    categorizer = NDCategorizer()
+    categorizer = NDCategorizer(compiled=True)
 
     house_list_url = "http://www.legis.nd.gov/assembly/%s-%s/bill-text/house-bill.html"
     senate_list_url = "http://www.legis.nd.gov/assembly/%s-%s/bill-text/senate-bill.html"
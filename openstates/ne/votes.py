@@ -2,7 +2,7 @@ import re
 import datetime
 
 from pupa.scrape import Scraper, VoteEvent
-from pupa.utils.generic import convert_pdf
+from openstates.utils import convert_pdf
 
 BILL_RE = re.compile('^LEGISLATIVE (BILL|RESOLUTION) (\d+C?A?).')
 VETO_BILL_RE = re.compile('- Override (?:Line-Item )?Veto on (\w+)')
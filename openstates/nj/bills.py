@@ -223,6 +223,8 @@ class NJBillScraper(Scraper, MDBMixin):
 
         year_abr = ((int(session) - 209) * 2) + 2000
         self._init_mdb(year_abr)
+        self.export_tables('Committee', 'MainBill', 'BillSpon', 'BillWP',
+                           'BillHist', 'BillSubj')
         self.initialize_committees(year_abr)
         yield from self.scrape_bills(session, year_abr)
 
@@ -12,6 +12,7 @@ class NJCommitteeScraper(Scraper, MDBMixin):
         year_abr = session[0:4]
 
         self._init_mdb(year_abr)
+        self.export_tables('COMember', 'Committee')
         members_csv = self.access_to_csv('COMember')
         info_csv = self.access_to_csv('Committee')
 
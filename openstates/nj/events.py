@@ -58,6 +58,7 @@ class NJEventScraper(Scraper, MDBMixin):
 
         year_abr = ((int(session) - 209) * 2) + 2000
         self._init_mdb(year_abr)
+        self.export_tables('Committee', 'Agendas')
         self.initialize_committees(year_abr)
         records = self.access_to_csv("Agendas")
         for record in records:
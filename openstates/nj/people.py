@@ -12,6 +12,7 @@ class NJPersonScraper(Scraper, MDBMixin):
         year_abr = session[0:4]
 
         self._init_mdb(year_abr)
+        self.export_tables('Roster', 'LegBio')
 
         roster_csv = self.access_to_csv('Roster')
         bio_csv = self.access_to_csv('LegBio')
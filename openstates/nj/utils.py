@@ -1,8 +1,8 @@
 import os
 import re
-import csv
 import zipfile
-import subprocess
+
+from openstates.utils.mdb import MDBMixin as BaseMDBMixin
 
 
 def clean_committee_name(comm_name):
@@ -28,7 +28,7 @@ def chamber_name(chamber):
         return 'assembly'
 
 
-class MDBMixin(object):
+class MDBMixin(BaseMDBMixin):
 
     def _init_mdb(self, year):
         self.mdbfile = 'DB%s.mdb' % year
@@ -37,12 +37,3 @@ class MDBMixin(object):
         zf = zipfile.ZipFile(fname)
         zf.extract(self.mdbfile)
         os.remove(fname)
-
-    # stolen from nm/bills.py
-    def access_to_csv(self, table):
-        """ using mdbtools, read access tables as CSV """
-        commands = ['mdb-export', self.mdbfile, table]
-        pipe = subprocess.Popen(commands, stdout=subprocess.PIPE,
-                                close_fds=True).stdout
-        csvfile = csv.DictReader(line.decode() for line in pipe)
-        return csvfile
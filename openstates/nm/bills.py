@@ -1,8 +1,6 @@
 import os
 import re
-import csv
 import zipfile
-import subprocess
 from datetime import datetime
 
 import lxml.html
@@ -10,13 +8,15 @@ import lxml.etree
 
 from pupa.scrape import Scraper, Bill
 
+from openstates.utils.mdb import MDBMixin
+
 
 def session_slug(session):
     session_type = 'Special' if session.endswith('S') else 'Regular'
     return '{}%20{}'.format(session[2:4], session_type)
 
 
-class NMBillScraper(Scraper):
+class NMBillScraper(Scraper, MDBMixin):
 
     def _init_mdb(self, session):
         ftp_base = 'ftp://www.nmlegis.gov/other/'
@@ -38,6 +38,15 @@ class NMBillScraper(Scraper):
         # all of the data is in this Access DB, download & retrieve it
         mdbfile = '{}.accdb'.format(fname)
 
+        # the listing's date and name of the zip the mdbfile came from, so
+        # it's only downloaded again once a newer zip is posted
+        version = '{} {}'.format(*matches[-1])
+        version_file = mdbfile + '.version'
+        if os.path.exists(mdbfile) and os.path.exists(version_file):
+            with open(version_file) as f:
+                if f.read() == version:
+                    self.mdbfile = mdbfile
+
         # if a new mdbfile or it has changed
         if getattr(self, 'mdbfile', None) != mdbfile:
             self.mdbfile = mdbfile
@@ -45,21 +54,8 @@ class NMBillScraper(Scraper):
             zf = zipfile.ZipFile(fname)
             zf.extract(self.mdbfile)
             os.remove(fname)
-
-    def access_to_csv(self, table):
-        """ using mdbtools, read access tables as CSV """
-        commands = ['mdb-export', self.mdbfile, table]
-        try:
-            pipe = subprocess.Popen(commands,
-                                    stdout=subprocess.PIPE,
-                                    close_fds=True).stdout
-            csvfile = csv.DictReader([line.decode('utf8') for line
-                                      in pipe.readlines()])
-            return csvfile
-        except OSError:
-            self.warning("Failed to read mdb file. Have you installed "
-                         "'mdbtools' ?")
-            raise
+            with open(version_file, 'w') as f:
+                f.write(version)
 
     def scrape(self, chamber=None, session=None):
         if not session:
@@ -87,6 +83,9 @@ class NMBillScraper(Scraper):
         session_year = session[2:]
 
         self._init_mdb(session)
+        self.snapshot_tables({'tblSponsors': (), 'TblSubjects': (),
+                              'Legislation': ('BillID',),
+                              'TblLocations': (), 'Actions': ('BillID',)})
 
         # read in sponsor & subject mappings
         sponsor_map = {}
@@ -99,8 +98,8 @@ class NMBillScraper(Scraper):
 
         # get all bills into this dict, fill in action/docs before saving
         bills = {}
-        for data in [row for row in self.access_to_csv('Legislation') if
-                     row['BillID'].startswith(chamber_letter)]:
+        for data in self.mdb_snapshot.rows_with_prefix(
+                'Legislation', 'BillID', chamber_letter):
             # use their BillID for the key but build our own for storage
             bill_key = data['BillID'].replace(' ', '')
 
@@ -307,8 +306,8 @@ class NMBillScraper(Scraper):
         # these actions need a committee name spliced in
         actions_with_committee = ('SENT', '7650', '7654')
 
-        for action in [row for row in self.access_to_csv('Actions') if
-                       row['BillID'].startswith(chamber_letter)]:
+        for action in self.mdb_snapshot.rows_with_prefix(
+                'Actions', 'BillID', chamber_letter):
             bill_key = action['BillID'].replace(' ', '')
 
             if bill_key not in bills:
@@ -1,15 +1,15 @@
-import os
 import re
 import operator
 from datetime import datetime
-from bisect import bisect_left
+from collections import OrderedDict
 
 import lxml.html
 import lxml.etree
 import scrapelib
 
 from pupa.scrape import Scraper, VoteEvent
-from pupa.utils.generic import convert_pdf
+from openstates.utils import PDFPipeline
+from openstates.utils.rollcall import Columns
 
 # Senate vote header
 s_vote_header = re.compile(r'(YES)|(NO)|(ABS)|(EXC)|(REC)')
@@ -34,26 +34,6 @@ def convert_sv_char(c):
             return c
 
 
-def match_header(row_cols, cell_x):
-    """ Map the data column to the header column, has to be done once for each
-        column. The columns of the headers(yes/no/etc) do not mach up *perfect*
-        with data in the grid due to random preceding whitespace and mixed
-        fonts"""
-    row_cols.sort()
-    c = bisect_left(row_cols, cell_x)
-    if c == 0:
-        return row_cols[0]
-    elif c == len(row_cols):
-        return row_cols[-1]
-
-    before = row_cols[c - 1]
-    after = row_cols[c]
-    if after-cell_x < cell_x-before:
-        return after
-    else:
-        return before
-
-
 def session_slug(session):
     session_type = 'Special' if session.endswith('S') else 'Regular'
     return '{}%20{}'.format(session[2:4], session_type)
@@ -199,6 +179,10 @@ class NMVoteScraper(Scraper):
 
         doc = lxml.html.fromstring(html)
 
+        # the vote pdfs of this chamber and their bill ids
+        vote_suffix = 'SVOTE' if chamber == 'upper' else 'HVOTE'
+        bill_ids = OrderedDict()
+
         # all links but first one
         for fname in doc.xpath('//a/text()')[1:]:
             # if a COPY continue
@@ -219,45 +203,42 @@ class NMVoteScraper(Scraper):
             bill_id = bill_type + ' ' + bill_num
 
             # votes
-            if 'SVOTE' in suffix and chamber is 'upper':
-                sv_text = self.scrape_vote_text(doc_path + fname)
-                if not sv_text:
-                    continue
-
-                vote = self.parse_senate_vote(sv_text, doc_path + fname,
-                                              session, bill_id)
-                if not vote:
-                    self.warning(
-                        'Bad parse on the senate vote for {}'.format(bill_id))
-                else:
-                    yield vote
-
-            elif 'HVOTE' in suffix and chamber is 'lower':
-                hv_text = self.scrape_vote_text(doc_path + fname)
-                if not hv_text:
+            if vote_suffix in suffix:
+                bill_ids[doc_path + fname] = bill_id
+
+        # downloaded one after the other while the ones before are converted
+        with PDFPipeline('xml', remove=True, logger=self.logger) as pipeline:
+            for url, vote_text in pipeline.convert(
+                    self.download_vote_pdfs(bill_ids)):
+                if not vote_text:
                     continue
-                vote = self.parse_house_vote(hv_text, doc_path + fname,
-                                             session, bill_id)
-                if not vote:
-                    self.warning(
-                        'Bad parse on the house vote for {}'.format(bill_id))
+                bill_id = bill_ids[url]
+
+                if chamber == 'upper':
+                    vote = self.parse_senate_vote(vote_text, url, session,
+                                                  bill_id)
+                    if not vote:
+                        self.warning('Bad parse on the senate vote for {}'
+                                     .format(bill_id))
+                    else:
+                        yield vote
                 else:
-                    yield vote
+                    vote = self.parse_house_vote(vote_text, url, session,
+                                                 bill_id)
+                    if not vote:
+                        self.warning('Bad parse on the house vote for {}'
+                                     .format(bill_id))
+                    else:
+                        yield vote
 
-    def scrape_vote_text(self, filelocation, local=False):
-        """Retrieves or uses local copy of vote pdf and converts into XML."""
-        if not local:
+    def download_vote_pdfs(self, urls):
+        for url in urls:
             try:
-                filename, response = self.urlretrieve(url=filelocation)
-                vote_text = convert_pdf(filename, type='xml')
-                os.remove(filename)
+                filename, response = self.urlretrieve(url=url)
             except scrapelib.HTTPError:
-                self.warning('Request failed: {}'.format(filelocation))
-                return
-        else:
-            vote_text = convert_pdf(filelocation, type='xml')
-            os.remove(filelocation)
-        return vote_text
+                self.warning('Request failed: {}'.format(url))
+                continue
+            yield url, filename
 
     def parse_house_vote(self, hv_text, url, session, bill_id):
         """Sets any overrides and creates the vote instance"""
@@ -360,6 +341,12 @@ class NMVoteScraper(Scraper):
                     rows[top] = [(row_value, int(tag.attrib['left']),
                                   int(tag.attrib['width']))]
 
+        # The columns of the headers(yes/no/etc) do not mach up *perfect*
+        # with data in the grid due to random preceding whitespace and mixed
+        # fonts, so each data column is mapped to the nearest header, by
+        # where the first cell of the column ends
+        columns = Columns(row_heads)
+
         # Mark the votes in the datagrid
         for row_x, cells in rows.items():
             if t_begin < row_x <= t_stop:
@@ -377,9 +364,8 @@ class NMVoteScraper(Scraper):
                     if cells[x+1][1] not in column_map:
                         # Called one time for each column heading
                         # Map the data grid column to the header columns
-                        column_map[cells[x+1][1]] = \
-                            match_header(list(row_heads.keys()),
-                                         cells[x + 1][1] + cells[x + 1][2])
+                        column_map[cells[x+1][1]] = columns.nearest(
+                            cells[x + 1][1] + cells[x + 1][2])
                     vote_cast = row_heads[column_map[cells[x+1][1]]]
 
                     # Fix some odd encoding issues
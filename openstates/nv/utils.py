@@ -1,29 +1,10 @@
 import re
-import tempfile
-import subprocess
 
-
-def convert_pdf(filename, type='xml'):
-    commands = {'text': ['pdftotext', '-layout', filename, '-'],
-                'text-nolayout': ['pdftotext', filename, '-'],
-                'xml': ['pdftohtml', '-xml', '-stdout', filename],
-                'html': ['pdftohtml', '-stdout', filename]}
-    try:
-        pipe = subprocess.Popen(commands[type], stdout=subprocess.PIPE,
-                                close_fds=True).stdout
-    except OSError as e:
-        raise EnvironmentError("error running %s, missing executable? [%s]" %
-                               ' '.join(commands[type]), e)
-    data = pipe.read()
-    pipe.close()
-    return data
+from openstates.utils import convert_pdf
 
 
 def pdfdata_to_text(data):
-    with tempfile.NamedTemporaryFile(delete=True) as tmpf:
-        tmpf.write(data)
-        tmpf.flush()
-        return convert_pdf(tmpf.name, 'text')
+    return convert_pdf(data, 'text')
 
 
 def text_after_line_numbers(lines):
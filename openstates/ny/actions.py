@@ -7,6 +7,9 @@ from functools import partial
 from collections import namedtuple, defaultdict
 from types import MethodType
 
+from openstates.utils.actions import (CategorizationCache,
+                                      categorizer_fingerprint)
+
 
 class Rule(namedtuple('Rule', 'regexes types stop attrs')):
     '''If anyh of ``regexes`` matches the action text, the resulting
@@ -42,10 +45,12 @@ class BaseCategorizer(object):
     steps that make use of action or category info. The return
     value is a 2-tuple of category types and a dictionary of
     attributes to overwrite on the target action object.
+
+    If ``cache_size`` is set, results are kept in a CategorizationCache.
     '''
     rules = []
 
-    def __init__(self):
+    def __init__(self, cache_size=0):
         before_funcs = []
         after_funcs = []
         for name in dir(self):
@@ -60,15 +65,42 @@ class BaseCategorizer(object):
         self._before_funcs = before_funcs
         self._after_funcs = after_funcs
 
-    def categorize(self, text):
+        if cache_size:
+            self.cache = CategorizationCache(cache_size,
+                                             categorizer_fingerprint(self))
+        else:
+            self.cache = None
+
+    def load_cache(self, path):
+        if self.cache is None:
+            return False
+        return self.cache.load(path)
+
+    def save_cache(self, path):
+        if self.cache is not None:
+            self.cache.save(path)
 
-        whitespace = partial(re.sub, '\s{1,4}', '\s{,4}')
+    def categorize(self, text):
 
         # Run the before hook.
         text = self.before_categorize(text)
         for func in self._before_funcs:
             text = func(text)
 
+        if self.cache is None:
+            return self._categorize(text)
+
+        result = self.cache.get(text)
+        if result is None:
+            result = self._categorize(text)
+            self.cache.put(text, result)
+        # saved results come back from json as lists
+        return tuple(result)
+
+    def _categorize(self, text):
+
+        whitespace = partial(re.sub, r'\s{1,4}', r'\\s{,4}')
+
         types = set()
         attrs = defaultdict(set)
         for rule in self.rules:
@@ -129,7 +161,7 @@ class BaseCategorizer(object):
             if not v:
                 continue
             else:
-                v = filter(None, v)
+                v = list(filter(None, v))
 
             # Get rid of sets.
             if isinstance(v, set):
@@ -1,7 +1,9 @@
+import os
 import re
 import datetime
 from collections import defaultdict
 
+from pupa import settings
 from pupa.scrape import Scraper, Bill, VoteEvent
 
 from .apiclient import OpenLegislationAPIClient
@@ -10,7 +12,7 @@ from .actions import Categorizer
 
 
 class NYBillScraper(Scraper):
-    categorizer = Categorizer()
+    categorizer = Categorizer(cache_size=50000)
 
     def _parse_bill_number(self, bill_id):
         bill_id_regex = r'(^[ABCEJKLRS])(\d{,6})'
@@ -313,5 +315,12 @@ class NYBillScraper(Scraper):
 
         self.term_start_year = session.split('-')[0]
 
+        cache_path = os.path.join(settings.CACHE_DIR, 'categorizer', 'ny.json')
+        self.categorizer.load_cache(cache_path)
+
         for bill in self._generate_bills(session):
             yield from self._scrape_bill(session, bill)
+
+        self.categorizer.save_cache(cache_path)
+        self.info('action categorizer cache: %d hits, %d misses',
+                  self.categorizer.cache.hits, self.categorizer.cache.misses)
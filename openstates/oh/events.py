@@ -5,7 +5,7 @@ import re
 import pytz
 
 from pupa.scrape import Scraper, Event
-from pupa.utils.generic import convert_pdf
+from openstates.utils import convert_pdf
 
 
 class OHEventScraper(Scraper):
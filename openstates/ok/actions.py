@@ -67,7 +67,7 @@ _categorizer_rules = (
     Rule([u'Second Reading referred to .+? then to (?P<committees>.+)'],
          [u'referral-committee', u'reading-2']),
     Rule([u'(?i)Placed on Third Reading'], [u'reading-3']),
-    Rule([u'^(?i)Third Reading'], [u'reading-3']),
+    Rule([u'(?i)^Third Reading'], [u'reading-3']),
 
     Rule(r'committee substitute (?P<committees>.+?);'),
     Rule([u'Do Pass (as amended )?(?P<committees>.+)'], [u'committee-passage']),
@@ -77,7 +77,7 @@ _categorizer_rules = (
     Rule([u'Referred to (?P<committees>.+?)'], [u'referral-committee']),
     Rule([u'Reported Do Pass, amended by committee substitute (?P<committees>.+?);'],
          [u'committee-passage']),
-    Rule([u'^(?i)Reported Do Pass'], [u'committee-passage']),
+    Rule([u'(?i)^Reported Do Pass'], [u'committee-passage']),
     Rule([u'Do pass, amended by committee substitute (?P<committees>)'],
          [u'committee-passage']),
     Rule([u'Sent to Governor'], [u'executive-receipt'], actor='governor'),
@@ -12,7 +12,7 @@ class OKBillScraper(Scraper):
     bill_types = ['B', 'JR', 'CR', 'R']
     subject_map = collections.defaultdict(list)
 
-    categorizer = Categorizer()
+    categorizer = Categorizer(compiled=True)
 
     meta_session_id = {
         '2011-2012': '1200',
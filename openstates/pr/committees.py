@@ -2,8 +2,7 @@
 import re
 import os
 from pupa.scrape import Scraper, Organization
-from pupa.utils import convert_pdf
-from openstates.utils import LXMLMixin
+from openstates.utils import LXMLMixin, convert_pdf
 
 
 class PRCommitteeScraper(Scraper, LXMLMixin):
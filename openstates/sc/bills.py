@@ -7,7 +7,7 @@ from collections import defaultdict
 from functools import wraps
 
 from pupa.scrape import Scraper, Bill, VoteEvent
-from pupa.utils.generic import convert_pdf
+from openstates.utils import convert_pdf
 import lxml.html
 
 # Workaround to prevent chunking error (thanks @showerst)
@@ -2,6 +2,8 @@ import re
 
 from .lxmlize import LXMLMixin  # noqa
 from .lxmlize import url_xpath  # noqa
+from .pdf import convert_pdf  # noqa
+from .pdf import PDFPipeline  # noqa
 
 
 def validate_phone_number(phone_number):
@@ -0,0 +1,192 @@
+import re
+from collections import namedtuple, OrderedDict
+
+# a token is a run of word characters and ampersands, joined by single dots
+# and ending with at most one; abbreviations match token by token, so
+# "Com. on B., P., & C.P." yields Com. on B. P. & C.P.
+TOKEN_RE = re.compile(r'[\w&]+(?:\.[\w&]+)*\.?')
+# a whole token whose slug is one of the alternatives; each alternative
+# starts with a literal character and checks that it starts a token only
+# after it, so the regex engine skips ahead to the possible first characters
+VOCABULARY_TOKEN = r'(?:%s)(?!\.?[\w&])\.?'
+TOKEN_START = r'(?<![\w&].)(?<![\w&]\..)'
+# what may separate the tokens of one mention
+GAP_CHARS = ' \t\r\n\f\v,'
+
+
+def _span_key(found):
+    return found[:2]
+
+
+class Mention(namedtuple('Mention', 'start end text abbr name')):
+    '''An abbreviation found in a text: ``text[start:end]`` is the
+    matched ``text``, ``abbr`` the table entry it matched and ``name``
+    what it resolved to.
+    '''
+
+
+class _Node(object):
+    __slots__ = ('children', 'fail', 'output', 'outputs', 'depth')
+
+    def __init__(self, depth=0):
+        self.children = {}
+        self.fail = None
+        # (abbr, {table: name}) of the abbreviation ending here, if any
+        self.output = None
+        # (depth, output) of every abbreviation ending here, including
+        # those that are suffixes of it, filled in by _compile
+        self.outputs = ()
+        self.depth = depth
+
+
+class AbbreviationMatcher(object):
+    '''
+    Finds abbreviations, like committee abbreviations in action text, and
+    resolves them to names in a single pass over the text.
+
+    Abbreviations are split into tokens and slugified by dropping their
+    dots, so "REV. & TAX" also matches "REV. & TAX." and the tokens of a
+    mention may be separated by any run of whitespace and commas. The
+    tokens are kept in a trie with Aho-Corasick failure links, so the
+    text is scanned once no matter how many abbreviations there are, and
+    the scan is done by a regex that only stops at the tokens that appear
+    in some abbreviation.
+
+    Each abbreviation belongs to a table, like a chamber, and resolves to
+    its name in the table asked for or else the first other table that
+    has it.
+    '''
+
+    def __init__(self, tables=None, ignore_case=False):
+        self.ignore_case = ignore_case
+        self.tables = []
+        self.root = _Node()
+        self._token_re = None
+        for table, entries in (tables or {}).items():
+            for name, abbrs in entries:
+                for abbr in abbrs:
+                    self.add(abbr, name, table)
+
+    def slugify(self, token):
+        token = token.replace('.', '')
+        if self.ignore_case:
+            token = token.lower()
+        return token
+
+    def add(self, abbr, name, table=None):
+        tokens = [self.slugify(t) for t in TOKEN_RE.findall(abbr)]
+        if not tokens:
+            raise ValueError('no tokens in abbreviation %r' % abbr)
+        if table not in self.tables:
+            self.tables.append(table)
+
+        node = self.root
+        for token in tokens:
+            child = node.children.get(token)
+            if child is None:
+                child = node.children[token] = _Node(node.depth + 1)
+            node = child
+        if node.output is None:
+            node.output = (abbr, OrderedDict())
+        elif abbr.endswith('.'):
+            # keep the form of the abbreviation that ends with a dot
+            node.output = (abbr, node.output[1])
+        node.output[1].setdefault(table, name)
+        self._token_re = None
+
+    def _compile(self):
+        # breadth first, so a node's failure link is set before its children
+        root = self.root
+        root.fail = root
+        queue = []
+        for child in root.children.values():
+            child.fail = root
+            queue.append(child)
+        for node in queue:
+            for token, child in node.children.items():
+                fail = node.fail
+                while fail is not root and token not in fail.children:
+                    fail = fail.fail
+                child.fail = fail.children.get(token, root)
+                queue.append(child)
+            outputs = node.fail.outputs
+            if node.output is not None:
+                outputs = ((node.depth, node.output),) + outputs
+            node.outputs = outputs
+
+        vocabulary = set(token for node in queue
+                         for token in node.children)
+        vocabulary.update(root.children)
+        # grouped by first character, longest first, with dots anywhere as
+        # slugs don't have any
+        by_first = OrderedDict()
+        for token in sorted(vocabulary, key=len, reverse=True):
+            by_first.setdefault(token[0], []).append(
+                ''.join(r'\.?' + re.escape(c) for c in token[1:]))
+        alternatives = [re.escape(first) + TOKEN_START +
+                        '(?:%s)' % '|'.join(rests)
+                        for first, rests in by_first.items()]
+        self._token_re = re.compile(VOCABULARY_TOKEN % '|'.join(alternatives),
+                                    re.I if self.ignore_case else 0)
+
+    def resolve(self, names, table=None):
+        if table in names:
+            return names[table]
+        for other in self.tables:
+            if other in names:
+                return names[other]
+        raise KeyError(table)
+
+    def find(self, text, table=None):
+        '''
+        The non-overlapping mentions of abbreviations in ``text``, from
+        left to right, preferring the longest of those starting at the
+        same place, with their names resolved for ``table``.
+        '''
+        if self._token_re is None:
+            self._compile()
+        root = self.root
+        ignore_case = self.ignore_case
+
+        tokens = []
+        # (index of first token, -index of last token, output), so they
+        # sort leftmost and then longest first
+        found = []
+        node = root
+        prev_end = 0
+        for i, match in enumerate(self._token_re.finditer(text)):
+            start = match.start()
+            if node is not root and text[prev_end:start].strip(GAP_CHARS):
+                node = root
+            prev_end = match.end()
+            tokens.append(match)
+
+            token = match.group().replace('.', '')
+            if ignore_case:
+                token = token.lower()
+            while node is not root and token not in node.children:
+                node = node.fail
+            node = node.children.get(token, root)
+            for depth, output in node.outputs:
+                found.append((i - depth + 1, -i, output))
+
+        if not found:
+            return []
+        if len(found) > 1:
+            found.sort(key=_span_key)
+
+        mentions = []
+        next_token = 0
+        for first, last, (abbr, names) in found:
+            last = -last
+            if first < next_token:
+                continue
+            start = tokens[first].start()
+            end = tokens[last].end()
+            if not abbr.endswith('.') and text[end - 1] == '.':
+                # the dot ends the sentence, not the abbreviation
+                end -= 1
+            mentions.append(Mention(start, end, text[start:end], abbr,
+                                    self.resolve(names, table)))
+            next_token = last + 1
+        return mentions
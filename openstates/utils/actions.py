@@ -1,7 +1,36 @@
+import os
 import re
-from collections import namedtuple, defaultdict, Iterable
+import sys
+import json
+import time
+import atexit
+import hashlib
+import inspect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import namedtuple, defaultdict, OrderedDict
 from six import string_types
 
+from .rule_profile import RuleProfile
+
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+# literal runs shorter than this are too common to be worth prefiltering on
+MIN_KEYWORD_LENGTH = 3
+MAX_KEYWORD_COMBINATIONS = 4096
+# part of categorizer_fingerprint, for changes to categorization that
+# aren't in a categorizer's rules or modules
+CATEGORIZER_CACHE_VERSION = 1
+
 
 class Rule(namedtuple('Rule', 'regexes types stop attrs')):
     '''If any of ``regexes`` matches the action text, the resulting
@@ -27,7 +56,7 @@ class Rule(namedtuple('Rule', 'regexes types stop attrs')):
         for regex in regexes:
             if isinstance(regex, string_types):
                 if flexible_whitespace:
-                    regex = re.sub('\s{1,4}', '\s{,10}', regex)
+                    regex = re.sub(r'\s{1,4}', r'\\s{,10}', regex)
                 compiled_regexes.append(re.compile(regex))
             else:
                 compiled_regexes.append(regex)
@@ -39,12 +68,27 @@ class Rule(namedtuple('Rule', 'regexes types stop attrs')):
 
         return tuple.__new__(_cls, (compiled_regexes, types, stop, kwargs))
 
-    def match(self, text):
+    def match(self, text, regexes=None, profile=None):
+        '''Return the attrs matched from ``text`` or None if no regex matched.
+
+        If ``regexes`` is given, only that subset of the rule's regexes is
+        tried; the others are known not to match (see ``RulePrefilter``).
+        Each search is timed into ``profile``, a ``RuleProfile``, if given.
+        '''
         attrs = {}
         matched = False
 
-        for regex in self.regexes:
-            m = regex.search(text)
+        if regexes is None:
+            regexes = self.regexes
+
+        for regex in regexes:
+            if profile is None:
+                m = regex.search(text)
+            else:
+                start = time.perf_counter()
+                m = regex.search(text)
+                profile.record_regex(regex, text, time.perf_counter() - start,
+                                     m is not None)
             if m:
                 matched = True
                 # add any matched attrs
@@ -57,45 +101,410 @@ class Rule(namedtuple('Rule', 'regexes types stop attrs')):
             return None
 
 
+def _literal_runs(items, runs):
+    run = []
+    for op, av in items:
+        if op is sre_constants.LITERAL and av < 128:
+            run.append(chr(av))
+            continue
+        if run:
+            runs.append(''.join(run))
+            run = []
+        if op is sre_constants.SUBPATTERN:
+            # (group, pattern) before 3.6, (group, add, del, pattern) after
+            _literal_runs(av[-1], runs)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if av[0] >= 1:
+                _literal_runs(av[2], runs)
+    if run:
+        runs.append(''.join(run))
+    return runs
+
+
+def required_literals(regex):
+    '''Return the lowercased literal substrings that any text matched by
+    ``regex`` must contain.
+
+    Only literals that are not optional (outside branches, optional groups
+    and zero-minimum repeats) are returned, so the result is a necessary,
+    not sufficient, condition for a match.
+    '''
+    if isinstance(regex, string_types):
+        regex = re.compile(regex)
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return frozenset()
+    return frozenset(run.lower() for run in _literal_runs(parsed, [])
+                     if len(run) >= MIN_KEYWORD_LENGTH)
+
+
+def _is_ascii(text):
+    try:
+        text.encode('ascii')
+    except UnicodeError:
+        return False
+    return True
+
+
+class RulePrefilter(object):
+    '''Keyword prefilter for every regex of a sequence of rules.
+
+    The required literals of all the regexes are merged into one keyword
+    table which is swept once per action text; a regex is only worth
+    running if all of its literals are present, and a rule only if one of
+    its regexes is. The rules to try are memoized per combination of
+    keywords present.
+    '''
+
+    def __init__(self, rules):
+        self.rules = rules
+        literals = [[required_literals(regex) for regex in rule.regexes]
+                    for rule in rules]
+
+        keywords = set()
+        for rule_literals in literals:
+            for regex_literals in rule_literals:
+                keywords |= regex_literals
+        self.keywords = sorted(keywords)
+        bits = dict((kw, 1 << i) for i, kw in enumerate(self.keywords))
+        self._bits = [bits[kw] for kw in self.keywords]
+        self._candidates = {}
+
+        self._rules = []
+        for rule, rule_literals in zip(rules, literals):
+            required = []
+            for regex, regex_literals in zip(rule.regexes, rule_literals):
+                mask = 0
+                for literal in regex_literals:
+                    mask |= bits[literal]
+                required.append((regex, mask))
+            self._rules.append((rule, required))
+
+    def candidates(self, text):
+        '''Return ``(rule, regexes)`` pairs, in rule order, for the rules
+        with at least one regex that could match ``text``.
+        '''
+        # (?i) matches a few non-ascii characters against ascii literals
+        # that str.lower() doesn't map onto them, e.g. the Kelvin sign.
+        if not _is_ascii(text):
+            return [(rule, rule.regexes) for rule in self.rules]
+
+        lowered = text.lower()
+        present = tuple(map(lowered.__contains__, self.keywords))
+        try:
+            return self._candidates[present]
+        except KeyError:
+            pass
+
+        mask = 0
+        for bit, found in zip(self._bits, present):
+            if found:
+                mask |= bit
+        candidates = []
+        for rule, required in self._rules:
+            regexes = [regex for regex, regex_mask in required
+                       if mask & regex_mask == regex_mask]
+            if regexes:
+                candidates.append((rule, regexes))
+
+        # actions come from a few templates, so few keyword combinations
+        # turn up; bound the table anyway
+        if len(self._candidates) >= MAX_KEYWORD_COMBINATIONS:
+            self._candidates.clear()
+        self._candidates[present] = candidates
+        return candidates
+
+
+def _copy_result(value):
+    if isinstance(value, dict):
+        return dict((k, _copy_result(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_copy_result(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_copy_result(v) for v in value)
+    return value
+
+
+class CategorizationCache(object):
+    '''Bounded LRU cache of categorizer results keyed on action text.
+
+    Results are copied on the way in and out, since callers commonly
+    append to the lists in them. ``hits`` and ``misses`` count lookups.
+
+    The cache can be saved to and loaded from a JSON file so it survives
+    between scrapes; the file records the ``fingerprint`` of the
+    categorizer that filled it and is ignored if that has changed.
+    ``added`` returns the results put since it was last called, so a
+    worker process can send its new results back to be merged into the
+    cache that gets saved.
+    '''
+
+    def __init__(self, maxsize, fingerprint=None):
+        self.maxsize = maxsize
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        # texts put since added() was last called, once it has been
+        self._added = None
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, text):
+        '''Return a copy of the cached result for ``text`` or None.'''
+        try:
+            result = self._results[text]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._results.move_to_end(text)
+        self.hits += 1
+        return _copy_result(result)
+
+    def put(self, text, result):
+        self._results[text] = _copy_result(result)
+        self._results.move_to_end(text)
+        if self._added is not None:
+            self._added[text] = None
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def added(self):
+        '''Return the (text, result) pairs put since the last call and still
+        in the cache; the first call starts keeping track and returns none.
+        '''
+        added = self._added or ()
+        self._added = OrderedDict()
+        return [(text, _copy_result(self._results[text]))
+                for text in added if text in self._results]
+
+    def load(self, path):
+        '''Load results saved by ``save``. Returns False if there was no
+        usable cache file at ``path``.
+        '''
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return False
+        if data.get('fingerprint') != self.fingerprint:
+            return False
+        for text, result in data['results']:
+            self.put(text, result)
+        return True
+
+    def save(self, path):
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        data = {'fingerprint': self.fingerprint,
+                'results': list(self._results.items())}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+def categorizer_fingerprint(categorizer):
+    '''Return a digest of a categorizer's rules and the source of the
+    modules it's defined in, so persisted results can be thrown away when
+    either changes. The modules cover the hooks, the helpers they call and
+    decorated functions like NY's; bump CATEGORIZER_CACHE_VERSION for a
+    change outside them.
+    '''
+    digest = hashlib.sha1()
+    digest.update(('%d' % CATEGORIZER_CACHE_VERSION).encode('utf-8'))
+    cls = type(categorizer)
+    digest.update(('%s.%s' % (cls.__module__, cls.__name__)).encode('utf-8'))
+    for rule in categorizer.rules:
+        patterns = sorted((getattr(regex, 'pattern', regex),
+                           getattr(regex, 'flags', 0))
+                          for regex in rule.regexes)
+        digest.update(repr((patterns, sorted(rule.types), rule.stop,
+                            sorted(rule.attrs.items()))).encode('utf-8'))
+    modules = OrderedDict.fromkeys(base.__module__ for base in cls.__mro__
+                                   if base is not object)
+    for name in modules:
+        digest.update(name.encode('utf-8'))
+        try:
+            source = inspect.getsource(sys.modules[name])
+        except (KeyError, TypeError, OSError):
+            # no source to read, e.g. only bytecode was installed
+            continue
+        digest.update(source.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _categorize_chunk(categorizer, texts):
+    return [categorizer.categorize(text) for text in texts]
+
+
+def _process_pool(processes):
+    # Results have to come back exactly as categorize() returns them in
+    # this process, which includes the order of sets of types. Forked
+    # workers share our hash seed, spawned ones don't.
+    try:
+        return ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context('fork'))
+    except TypeError:
+        # before 3.7 there is no mp_context, and posix pools always fork
+        return ProcessPoolExecutor(processes)
+
+
 class BaseCategorizer(object):
     '''A class that exposes a main categorizer function
     and before and after hooks, in case categorization requires specific
     steps that make use of action or category info. The return
     value is a 2-tuple of category types and a dictionary of
     attributes to overwrite on the target action object.
+
+    If ``compiled`` is true, the rules are compiled into a ``RulePrefilter``
+    and only the regexes that can possibly match are run. The output is
+    the same either way.
+
+    If ``cache_size`` is set, the results for that many distinct action
+    texts are kept in a ``CategorizationCache``, see ``load_cache`` and
+    ``save_cache`` to keep them between runs.
+
+    If ``profile`` is true, or left as None and the
+    OPENSTATES_PROFILE_CATEGORIZERS environment variable is set, the time
+    spent in each rule and regex is collected into ``self.profile`` and
+    its report is logged when the process exits.
     '''
     rules = []
 
-    def __init__(self):
-        pass
+    def __init__(self, compiled=False, cache_size=0, profile=None):
+        self.compiled = compiled
+        self._prefilter = None
+
+        if profile is None:
+            profile = bool(os.environ.get('OPENSTATES_PROFILE_CATEGORIZERS'))
+        if profile:
+            self.profile = RuleProfile()
+            atexit.register(self.log_profile)
+        else:
+            self.profile = None
+
+        if cache_size:
+            self.cache = CategorizationCache(cache_size,
+                                             categorizer_fingerprint(self))
+        else:
+            self.cache = None
+
+    def load_cache(self, path):
+        if self.cache is None:
+            return False
+        return self.cache.load(path)
+
+    def save_cache(self, path):
+        if self.cache is not None:
+            self.cache.save(path)
+
+    def log_profile(self, logger=None):
+        if self.profile is not None:
+            self.profile.log(self.rules, logger)
+
+    @property
+    def prefilter(self):
+        if self._prefilter is None:
+            self._prefilter = RulePrefilter(self.rules)
+        return self._prefilter
 
     def categorize(self, text):
         # run pre-categorization hook on text
         text = self.pre_categorize(text)
 
-        types = set()
-        return_val = defaultdict(set)
+        if self.cache is None:
+            return self._categorize(text)
 
-        for rule in self.rules:
+        result = self.cache.get(text)
+        if result is None:
+            result = self._categorize(text)
+            self.cache.put(text, result)
+        return result
 
-            attrs = rule.match(text)
+    def categorize_many(self, texts, processes=None, chunksize=1000):
+        '''Categorize each of ``texts``, returning a list of results in
+        the same order, each the same as ``categorize`` would return.
 
-            # matched if attrs is not None - empty attr dict means a match
-            if attrs is not None:
-                # add types, rule attrs and matched attrs
-                types |= rule.types
+        Each distinct text is only categorized once. If ``processes`` is
+        more than one and there are more than ``chunksize`` distinct texts,
+        they are categorized in chunks across a pool of that many worker
+        processes.
+        '''
+        texts = list(texts)
+        unique = list(OrderedDict.fromkeys(texts))
+
+        if processes and processes > 1 and len(unique) > chunksize:
+            chunks = [unique[i:i + chunksize]
+                      for i in range(0, len(unique), chunksize)]
+            results = []
+            with _process_pool(processes) as pool:
+                for chunk_results in pool.map(_categorize_chunk,
+                                              [self] * len(chunks), chunks):
+                    results.extend(chunk_results)
+        else:
+            results = [self.categorize(text) for text in unique]
+
+        # hand out the result itself the first time, and copies after that
+        by_text = dict(zip(unique, results))
+        handed_out = set()
+        categorized = []
+        for text in texts:
+            result = by_text[text]
+            if text in handed_out:
+                result = _copy_result(result)
+            else:
+                handed_out.add(text)
+            categorized.append(result)
+        return categorized
+
+    def matching_rules(self, text):
+        '''Yield ``(rule, attrs)`` for each rule that matches ``text``,
+        which should already have been through ``pre_categorize``, in the
+        order the rules are applied.
+        '''
+        if self.compiled:
+            candidates = self.prefilter.candidates(text)
+        else:
+            candidates = ((rule, None) for rule in self.rules)
+
+        profile = self.profile
+        for rule, regexes in candidates:
 
-                # Also add its specified attrs.
-                for k, v in attrs.items():
-                    return_val[k].add(v)
+            if profile is None:
+                attrs = rule.match(text, regexes)
+            else:
+                start = time.perf_counter()
+                attrs = rule.match(text, regexes, profile)
+                profile.record_rule(rule, time.perf_counter() - start,
+                                    attrs is not None)
 
-                return_val.update(**rule.attrs)
+            # matched if attrs is not None - empty attr dict means a match
+            if attrs is not None:
+                yield rule, attrs
 
                 # break if there was a match and rule says so, otherwise
                 # continue testing against other rules
                 if rule.stop:
                     break
 
+    def _categorize(self, text):
+        types = set()
+        return_val = defaultdict(set)
+
+        for rule, attrs in self.matching_rules(text):
+            # add types, rule attrs and matched attrs
+            types |= rule.types
+
+            # Also add its specified attrs.
+            for k, v in attrs.items():
+                return_val[k].add(v)
+
+            return_val.update(**rule.attrs)
+
         # set type
         return_val['classification'] = list(types)
 
@@ -0,0 +1,32 @@
+import os
+import hashlib
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# (device, inode, size, mtime, ctime) -> sha1, so a file is only hashed
+# again once it changes; ctime changes with any write, even one that keeps
+# the size and sets the mtime back
+_hashes = {}
+
+
+def file_hash(path, memoize=True):
+    '''The sha1 of the contents of the file at `path`. With `memoize`, the
+    hash is kept until the file changes, for files like databases that are
+    hashed over and over; files that are written once and hashed once,
+    like downloads to a temporary path, should be hashed without it.'''
+    if not memoize:
+        return _hash_contents(path)
+    stat = os.stat(path)
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns,
+           stat.st_ctime_ns)
+    if key not in _hashes:
+        _hashes[key] = _hash_contents(path)
+    return _hashes[key]
+
+
+def _hash_contents(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
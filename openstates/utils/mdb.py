@@ -0,0 +1,237 @@
+import os
+import csv
+import shutil
+import sqlite3
+import tempfile
+import subprocess
+from urllib.request import pathname2url
+from concurrent.futures import ThreadPoolExecutor
+
+from pupa import settings
+
+from .hashing import file_hash
+
+# how many tables are exported with mdb-export at once
+EXPORT_WORKERS = int(os.environ.get('MDB_EXPORT_WORKERS', 4))
+# bytes of a snapshot read through a memory map rather than read() calls
+SNAPSHOT_MMAP_SIZE = 256 * 1024 * 1024
+
+
+class MDBExport(object):
+    '''
+    CSV exports of the tables of an Access database.
+
+    Each table is exported with mdbtools' mdb-export the first time it's
+    read and kept under `cache_dir`, in a directory named after the
+    database file and the hash of its contents, so the export is reused
+    by every scraper and chamber reading the same table until the
+    database is replaced by a different one. Rows are read lazily from
+    the exported file.
+    '''
+
+    def __init__(self, mdbfile, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(settings.CACHE_DIR, 'mdb')
+        self.mdbfile = mdbfile
+        self.cache_dir = cache_dir
+        self.name = os.path.basename(mdbfile)
+        self.directory = os.path.join(
+            cache_dir, '%s-%s' % (self.name, file_hash(mdbfile)))
+
+    def path(self, table):
+        return os.path.join(self.directory, '%s.csv' % table)
+
+    def prune(self):
+        '''Remove the exports of older versions of the database.'''
+        prefix = self.name + '-'
+        for dirname in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, dirname)
+            if dirname.startswith(prefix) and path != self.directory:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def export(self, table):
+        '''The path of the CSV export of `table`, exporting it if needed.'''
+        path = self.path(table)
+        if os.path.exists(path):
+            return path
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+            self.prune()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                subprocess.check_call(['mdb-export', self.mdbfile, table],
+                                      stdout=f, close_fds=True)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return path
+
+    def export_all(self, tables, workers=None):
+        '''Export `tables` concurrently.'''
+        if workers is None:
+            workers = EXPORT_WORKERS
+        with ThreadPoolExecutor(max(workers, 1)) as executor:
+            return list(executor.map(self.export, tables))
+
+    def rows(self, table):
+        '''The rows of `table`, as dicts, read lazily from its export.'''
+        return self._read(self.export(table))
+
+    def _read(self, path):
+        with open(path, encoding='utf8', newline='') as f:
+            yield from csv.DictReader(f)
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+class MDBSnapshot(object):
+    '''
+    An SQLite copy of tables of an Access database, next to their
+    MDBExport CSV files, with indexes on the columns they're looked up by.
+
+    Tables are added the first time they're asked for and then reused
+    until the database changes, like the exports. Values are kept as the
+    text mdb-export wrote, so rows read back are the same dicts
+    csv.DictReader makes, in the same order, and the file is read through
+    a memory map.
+    '''
+
+    FILENAME = 'snapshot.sqlite'
+
+    def __init__(self, export):
+        self.export = export
+        self.path = os.path.join(export.directory, self.FILENAME)
+        self._connection = None
+
+    def tables(self):
+        if not os.path.exists(self.path):
+            return set()
+        return set(name for name, in self.connection().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"))
+
+    def build(self, indexes):
+        '''Add the tables of `indexes`, {table: [columns to index]},
+        exporting the ones that aren't in the snapshot yet concurrently.'''
+        missing = [table for table in indexes if table not in self.tables()]
+        self.close()
+        if missing:
+            paths = self.export.export_all(missing)
+            # in one transaction, so a table is either fully loaded or not
+            # there at all
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            try:
+                connection.execute('BEGIN')
+                for table, path in zip(missing, paths):
+                    self._load(connection, table, path)
+                connection.execute('COMMIT')
+            finally:
+                connection.close()
+
+        connection = sqlite3.connect(self.path)
+        try:
+            for table, columns in indexes.items():
+                for column in columns:
+                    connection.execute(
+                        'CREATE INDEX IF NOT EXISTS %s ON %s (%s)' % (
+                            _quote('%s_%s' % (table, column)), _quote(table),
+                            _quote(column)))
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _load(self, connection, table, path):
+        with open(path, encoding='utf8', newline='') as f:
+            reader = csv.reader(f)
+            columns = next(reader, [])
+            connection.execute('CREATE TABLE %s (%s)' % (
+                _quote(table),
+                ', '.join('%s TEXT' % _quote(column) for column in columns)))
+            connection.executemany(
+                'INSERT INTO %s VALUES (%s)' % (
+                    _quote(table), ', '.join('?' * len(columns))),
+                # like DictReader, pad short rows and drop extra values
+                (row[:len(columns)] + [None] * (len(columns) - len(row))
+                 for row in reader if row))
+
+    def connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                'file:%s?mode=ro' % pathname2url(self.path), uri=True)
+            self._connection.execute('PRAGMA mmap_size = %d' %
+                                     SNAPSHOT_MMAP_SIZE)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _select(self, table, where='', params=()):
+        cursor = self.connection().execute(
+            'SELECT * FROM %s %s ORDER BY rowid' % (_quote(table), where),
+            params)
+        columns = [column[0] for column in cursor.description]
+        for row in cursor:
+            yield dict(zip(columns, row))
+
+    def rows(self, table):
+        return self._select(table)
+
+    def lookup(self, table, column, value):
+        '''The rows of `table` whose `column` is `value`.'''
+        return self._select(table, 'WHERE %s = ?' % _quote(column), (value,))
+
+    def rows_with_prefix(self, table, column, prefix):
+        '''The rows of `table` whose `column` starts with `prefix`, found
+        with a range scan of its index.'''
+        return self._select(table, 'WHERE %s >= ? AND %s < ?' % (
+            _quote(column), _quote(column)), (prefix, prefix + '\U0010ffff'))
+
+
+class MDBMixin(object):
+    '''access_to_csv for scrapers reading the Access database at
+    `self.mdbfile`, through an MDBExport of it, and an MDBSnapshot of the
+    tables passed to snapshot_tables.'''
+
+    def mdb_export(self):
+        return MDBExport(self.mdbfile)
+
+    def snapshot_tables(self, indexes):
+        '''Build (or reuse) the snapshot of `indexes`, {table: [columns to
+        index]}, and read those tables from it.'''
+        try:
+            self.mdb_snapshot = MDBSnapshot(self.mdb_export())
+            self.mdb_snapshot.build(indexes)
+        except OSError:
+            self.warning("Failed to read mdb file. Have you installed "
+                         "'mdbtools' ?")
+            raise
+        return self.mdb_snapshot
+
+    def export_tables(self, *tables):
+        '''Export `tables` ahead of reading them, several at a time.'''
+        try:
+            self.mdb_export().export_all(tables)
+        except OSError:
+            self.warning("Failed to read mdb file. Have you installed "
+                         "'mdbtools' ?")
+            raise
+
+    def access_to_csv(self, table):
+        """ using mdbtools, read access tables as CSV """
+        snapshot = getattr(self, 'mdb_snapshot', None)
+        if (snapshot is not None and
+                snapshot.export.directory == self.mdb_export().directory and
+                table in snapshot.tables()):
+            return snapshot.rows(table)
+        try:
+            return self.mdb_export().rows(table)
+        except OSError:
+            self.warning("Failed to read mdb file. Have you installed "
+                         "'mdbtools' ?")
+            raise
@@ -0,0 +1,381 @@
+import os
+import re
+import time
+import hashlib
+import tempfile
+import subprocess
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from pupa import settings
+
+from .hashing import file_hash
+
+# megabytes of converted text kept on disk, least recently used first out;
+# 0 turns the cache off
+PDF_CACHE_SIZE = int(os.environ.get('PDF_CACHE_SIZE', 1024))
+# how many PDFs a PDFPipeline converts at once, in worker processes
+PDF_PROCESSES = int(os.environ.get('PDF_PROCESSES',
+                                   min(4, os.cpu_count() or 1)))
+# conversions slower than this many seconds are logged as warnings
+SLOW_CONVERSION = 30
+
+# the backend convert_pdf uses first: a name in BACKENDS, or "auto" for the
+# first one that's installed. python-poppler's output isn't known to match
+# the commands' exactly, so it's only used when asked for
+PDF_BACKEND = os.environ.get('PDF_BACKEND', 'poppler')
+
+
+class PopplerCommands(object):
+    '''
+    Converts with poppler's pdftotext and pdftohtml commands, a process per
+    PDF. PDFs given as bytes are written to a temporary file first.
+    '''
+
+    commands = {'text': ['pdftotext', '-layout', '{}', '-'],
+                'text-nolayout': ['pdftotext', '{}', '-'],
+                'xml': ['pdftohtml', '-xml', '-stdout', '{}'],
+                'html': ['pdftohtml', '-stdout', '{}']}
+    types = frozenset(commands)
+
+    def __init__(self):
+        self._version = None
+
+    def version(self):
+        '''The version pdftotext reports, which pdftohtml shares.'''
+        if self._version is None:
+            try:
+                process = subprocess.Popen(['pdftotext', '-v'],
+                                           stdout=subprocess.PIPE,
+                                           stderr=subprocess.STDOUT,
+                                           close_fds=True)
+                output = process.communicate()[0].decode('utf-8', 'replace')
+            except OSError:
+                output = ''
+            match = re.search(r'version (\S+)', output)
+            self._version = match.group(1) if match else 'unknown'
+        return self._version
+
+    def convert(self, source, type):
+        if isinstance(source, bytes):
+            with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+                f.write(source)
+                f.flush()
+                return self.convert(f.name, type)
+
+        command = [arg.format(source) for arg in self.commands[type]]
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                       close_fds=True)
+        except OSError as e:
+            raise EnvironmentError(
+                'error running %s, missing executable? [%s]' %
+                (' '.join(command), e))
+        data = process.communicate()[0]
+        return data, process.returncode == 0
+
+
+class PopplerLibrary(object):
+    '''
+    Extracts text like pdftotext, in process, with poppler's own library
+    through python-poppler, so no process is started and PDFs given as
+    bytes are read from memory.
+    '''
+
+    # the TextLayout of pdftotext with and without -layout
+    layouts = {'text': 'physical_layout',
+               'text-nolayout': 'non_raw_non_physical_layout'}
+    types = frozenset(layouts)
+
+    def __init__(self):
+        import poppler
+        self.poppler = poppler
+
+    def version(self):
+        '''The version of the poppler library python-poppler uses.'''
+        version = getattr(self.poppler, 'version', None)
+        if callable(version):
+            return str(version())
+        return getattr(self.poppler, '__version__', 'unknown')
+
+    def convert(self, source, type):
+        poppler = self.poppler
+        if isinstance(source, bytes):
+            document = poppler.load_from_data(source)
+        else:
+            document = poppler.load_from_file(source)
+        layout = getattr(poppler.TextLayout, self.layouts[type])
+        # pdftotext ends each page with a form feed
+        text = ''.join(document.create_page(i).text(layout_mode=layout) +
+                       '\f' for i in range(document.pages))
+        return text.encode('utf-8'), True
+
+
+# name -> backend class, in the order "auto" tries them
+BACKENDS = OrderedDict([('python-poppler', PopplerLibrary),
+                        ('poppler', PopplerCommands)])
+_backends = {}
+
+
+def get_backend(name):
+    '''The backend registered as `name`, or None if it isn't installed.'''
+    if name not in _backends:
+        try:
+            _backends[name] = BACKENDS[name]()
+        except ImportError:
+            _backends[name] = None
+    return _backends[name]
+
+
+def backend_id(name):
+    '''`name` and the version of the backend, which a converted PDF is
+    cached under, as the output changes from one to the next.'''
+    version = re.sub(r'[^\w.-]', '_', get_backend(name).version())
+    return '%s-%s' % (name, version)
+
+
+def backends_for(type, backend=None):
+    '''The names of the installed backends that convert to `type`, in the
+    order extract tries them, for `backend` (PDF_BACKEND by default).'''
+    if backend is None:
+        backend = PDF_BACKEND
+    if type not in PopplerCommands.types:
+        raise KeyError(type)
+    names = list(BACKENDS) if backend == 'auto' else [backend]
+    names = [name for name in names if name != 'poppler'] + ['poppler']
+    return [name for name in names if get_backend(name) is not None and
+            type in get_backend(name).types]
+
+
+def extract(source, type='xml', backend=None):
+    '''
+    Convert `source`, the path or contents of a PDF, to `type` with
+    `backend` (PDF_BACKEND by default), falling back to the poppler commands
+    for the types it doesn't do or if it fails. Returns the output, whether
+    the conversion succeeded and the name of the backend that did it.
+    '''
+    names = backends_for(type, backend)
+    for name in names[:-1]:
+        try:
+            data, ok = get_backend(name).convert(source, type)
+        except Exception:
+            # a PDF the library can't read may still convert below
+            continue
+        if ok:
+            return data, ok, name
+    data, ok = get_backend(names[-1]).convert(source, type)
+    return data, ok, names[-1]
+
+
+class PDFCache(object):
+    '''
+    Converted PDFs on disk, keyed by the hash of the PDF's contents, the
+    backend that converted it and its version, and the output type, so a
+    PDF that was converted before, by any scraper and under any filename,
+    isn't converted again.
+
+    Once the files take up more than `max_size` bytes, the least recently
+    used are removed until they take up at most 90% of it.
+    '''
+
+    def __init__(self, cache_dir=None, max_size=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(settings.CACHE_DIR, 'pdf')
+        if max_size is None:
+            max_size = PDF_CACHE_SIZE * 1024 * 1024
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, digest, backend, type):
+        return os.path.join(self.cache_dir, digest[:2], '%s.%s.%s' % (
+            digest, backend_id(backend), type))
+
+    def get(self, path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # mark it as recently used for eviction
+        os.utime(path)
+        return data
+
+    def put(self, path, data):
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        if self._size is not None:
+            self._size += len(data)
+        if self.size() > self.max_size:
+            self.evict(self.max_size * 9 // 10)
+
+    def files(self):
+        '''(mtime, size, path) of each file in the cache.'''
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def size(self):
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self.files())
+        return self._size
+
+    def evict(self, max_size):
+        files = sorted(self.files())
+        size = sum(size for _, size, _ in files)
+        for _, file_size, path in files:
+            if size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+        self._size = size
+
+    def convert(self, source, type='xml'):
+        if self.max_size <= 0:
+            return extract(source, type)[0]
+
+        if isinstance(source, bytes):
+            digest = hashlib.sha1(source).hexdigest()
+        else:
+            # PDFs are often downloaded to the same temporary path, so
+            # they are hashed on every conversion
+            digest = file_hash(source, memoize=False)
+        # kept under the backend that converted it, which is the poppler
+        # commands when the one tried first failed, so each is looked up in
+        # the order extract tries them
+        for backend in backends_for(type):
+            data = self.get(self.path(digest, backend, type))
+            if data is not None:
+                self.hits += 1
+                return data
+        self.misses += 1
+        data, ok, backend = extract(source, type)
+        # a failed conversion is tried again next time
+        if ok:
+            self.put(self.path(digest, backend, type), data)
+        return data
+
+
+_cache = None
+
+
+def convert_pdf(filename, type='xml'):
+    '''The output of pdftotext/pdftohtml for `filename`, or for the PDF
+    itself if it's bytes, from the shared PDFCache if it was converted
+    before.'''
+    global _cache
+    if _cache is None:
+        _cache = PDFCache()
+    return _cache.convert(filename, type)
+
+
+Timing = namedtuple('Timing', 'key size seconds')
+
+
+def _convert(source, type):
+    # in a worker process: source is the path of a PDF or its contents
+    start = time.perf_counter()
+    data = convert_pdf(source, type)
+    return data, time.perf_counter() - start
+
+
+class PDFPipeline(object):
+    '''
+    Converts a stream of PDFs with convert_pdf in up to `processes` worker
+    processes.
+
+    The PDFs are taken from the stream as the workers free up, so while
+    they're converting the scraper downloads the next ones, and at most
+    twice as many as there are workers are held at once. The conversion
+    time and size of each PDF is kept in `timings` and logged to `logger`.
+    '''
+
+    def __init__(self, type='xml', processes=None, remove=False,
+                 logger=None):
+        if processes is None:
+            processes = PDF_PROCESSES
+        self.type = type
+        self.processes = processes
+        # remove PDFs given by path once they're converted
+        self.remove = remove
+        self.logger = logger
+        self.timings = []
+        # started on the first conversion and kept until close()
+        self._executor = None
+
+    def executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.processes)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def convert(self, documents):
+        '''
+        Convert each (key, source) of `documents`, where source is a path
+        or the contents of a PDF, and yield (key, converted data) in the
+        same order.
+        '''
+        if self.processes <= 1:
+            for key, source in documents:
+                yield key, self._finish(key, source, _convert(source,
+                                                              self.type))
+            return
+
+        pending = deque()
+        try:
+            for key, source in documents:
+                pending.append((key, source, self.executor().submit(
+                    _convert, source, self.type)))
+                if len(pending) >= self.processes * 2:
+                    key, source, future = pending.popleft()
+                    yield key, self._finish(key, source, future.result())
+            while pending:
+                key, source, future = pending.popleft()
+                yield key, self._finish(key, source, future.result())
+        finally:
+            for key, source, future in pending:
+                future.cancel()
+
+    def _finish(self, key, source, result):
+        data, seconds = result
+        if isinstance(source, bytes):
+            size = len(source)
+        else:
+            size = os.path.getsize(source)
+            if self.remove:
+                os.remove(source)
+        timing = Timing(key, size, seconds)
+        self.timings.append(timing)
+        if self.logger:
+            log = (self.logger.warning if seconds > SLOW_CONVERSION
+                   else self.logger.debug)
+            log('converted %s (%d bytes) in %.2fs', key, size, seconds)
+        return data
@@ -0,0 +1,149 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+WORD_RE = re.compile(r'\S+')
+NAME_START_RE = re.compile(r'\w')
+
+
+class Token(namedtuple('Token', 'x text')):
+    '''A word of a roll call and where it starts, as a character column of
+    pdftotext -layout output or a pdftohtml coordinate.'''
+
+    @property
+    def end(self):
+        return self.x + len(self.text)
+
+
+def line_tokens(line):
+    '''The words of a line of pdftotext -layout output.'''
+    return [Token(m.start(), m.group()) for m in WORD_RE.finditer(line)]
+
+
+class Columns(object):
+    '''
+    The x positions of the columns of a roll call, found once per page.
+
+    nearest() maps a position to the closest column, for cells that don't
+    line up exactly with their header, and index() to the column it falls
+    in. Both are bisections of the sorted positions, and nearest() is
+    remembered per position as the cells of a column share theirs.
+    '''
+
+    def __init__(self, xs):
+        self.xs = sorted(xs)
+        self._nearest = {}
+
+    def __len__(self):
+        return len(self.xs)
+
+    def __iter__(self):
+        return iter(self.xs)
+
+    def nearest(self, x):
+        '''The column closest to `x`, the left one on a tie.'''
+        try:
+            return self._nearest[x]
+        except KeyError:
+            pass
+        xs = self.xs
+        i = bisect_left(xs, x)
+        if i == 0:
+            column = xs[0]
+        elif i == len(xs):
+            column = xs[-1]
+        elif xs[i] - x < x - xs[i - 1]:
+            column = xs[i]
+        else:
+            column = xs[i - 1]
+        self._nearest[x] = column
+        return column
+
+    def index(self, x):
+        '''The index of the column `x` is in, or -1 if it's left of them.'''
+        return bisect_right(self.xs, x) - 1
+
+
+class CodedRollCall(object):
+    '''
+    Roll calls laid out as rows of "CODE  Name" entries in columns, like
+    the pdftotext -layout output of IL's roll calls:
+
+        Y    Althoff     Y    Dillard     N   Lauzen        NV   Righter
+        NV   Bivins      Y    Forby       Y   Lightford     P    Risinger
+
+    The columns are where every row has a vote code that's followed by
+    between `min_gap` and `max_gap` spaces and a name, and after finding
+    them each row is split into (name, code) pairs in one pass over its
+    words.
+    '''
+
+    def __init__(self, codes, min_gap=2, max_gap=10):
+        self.codes = frozenset(codes)
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+
+    def entry_starts(self, tokens):
+        '''The positions in `tokens` of the codes that start an entry.'''
+        codes = self.codes
+        starts = set()
+        for token, following in zip(tokens, tokens[1:]):
+            if (token.text in codes and
+                    self.min_gap <= following.x - token.end <= self.max_gap and
+                    NAME_START_RE.match(following.text)):
+                starts.add(token.x)
+        return starts
+
+    def find_columns(self, lines):
+        '''The Columns of `lines`, raising ValueError if the last, which may
+        be short, has entries that aren't in the others' columns.'''
+        rows = [self.entry_starts(line_tokens(line)) for line in lines]
+        if not rows:
+            return Columns([])
+        columns = set(rows[0])
+        for row in rows[1:-1]:
+            columns.intersection_update(row)
+        if not rows[-1].issubset(columns):
+            raise ValueError("Row's columns [%s] don't align with candidate "
+                             "final columns [%s]: %s" % (
+                                 sorted(rows[-1]), sorted(columns),
+                                 lines[-1]))
+        return Columns(columns)
+
+    def entries(self, line, columns):
+        '''The (name, code) pairs of `line`, from left to right; the code is
+        None for an entry with no vote code.'''
+        tokens = line_tokens(line)
+        entries = []
+        column = None
+        start = None
+        for i, token in enumerate(tokens):
+            index = columns.index(token.x)
+            if index < 0:
+                continue
+            if index != column:
+                if start is not None:
+                    entries.append(self._entry(line, tokens[start:i]))
+                column = index
+                start = i
+        if start is not None:
+            entries.append(self._entry(line, tokens[start:]))
+        return [entry for entry in entries if entry[0]]
+
+    def _entry(self, line, tokens):
+        if tokens[0].text in self.codes:
+            code = tokens[0].text
+            tokens = tokens[1:]
+        else:
+            code = None
+        if not tokens:
+            return None, code
+        return line[tokens[0].x:tokens[-1].end], code
+
+    def parse(self, lines):
+        '''The (name, code) pairs of the roll call in `lines`.'''
+        columns = self.find_columns(lines)
+        pairs = []
+        for line in lines:
+            pairs.extend(self.entries(line, columns))
+        return pairs
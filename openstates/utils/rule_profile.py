@@ -0,0 +1,203 @@
+import time
+import logging
+from collections import defaultdict
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+# a single search over an action string normally takes a microsecond or
+# two; one slower than this has very likely been backtracking
+SLOW_SEARCH_SECONDS = 0.0001
+
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+_SPACE_CATEGORIES = (sre_constants.CATEGORY_SPACE,
+                     sre_constants.CATEGORY_NOT_DIGIT,
+                     sre_constants.CATEGORY_NOT_WORD)
+
+
+def _can_match_space(items):
+    '''Whether a single-character pattern item can match whitespace.'''
+    for op, av in items:
+        if op is sre_constants.ANY:
+            return True
+        if op is sre_constants.LITERAL:
+            return chr(av).isspace()
+        if op is sre_constants.NOT_LITERAL:
+            return not chr(av).isspace()
+        if op is sre_constants.IN:
+            negate = False
+            has_space = False
+            for set_op, set_av in av:
+                if set_op is sre_constants.NEGATE:
+                    negate = True
+                elif set_op is sre_constants.CATEGORY:
+                    has_space |= set_av in _SPACE_CATEGORIES
+                elif set_op is sre_constants.LITERAL:
+                    has_space |= chr(set_av).isspace()
+            return has_space != negate
+    return False
+
+
+def _describe(op, av):
+    if op in _REPEATS:
+        low, high, items = av
+        if high == sre_constants.MAXREPEAT:
+            high = ''
+        inner = ''.join(_describe(*item) for item in items)
+        return '%s{%s,%s}' % (inner, low, high)
+    if op is sre_constants.ANY:
+        return '.'
+    if op is sre_constants.LITERAL:
+        return chr(av)
+    if op is sre_constants.IN:
+        if (len(av) == 1 and av[0][0] is sre_constants.CATEGORY and
+                av[0][1] is sre_constants.CATEGORY_SPACE):
+            return r'\s'
+        return '[...]'
+    if op is sre_constants.SUBPATTERN:
+        return '(...)'
+    return '?'
+
+
+def _is_variable_repeat(op, av):
+    return op in _REPEATS and av[0] != av[1]
+
+
+def _is_repeated(op, av):
+    return op in _REPEATS and av[1] > 1
+
+
+def _contains_variable_repeat(items):
+    for op, av in items:
+        if _is_variable_repeat(op, av):
+            return True
+        if op is sre_constants.SUBPATTERN and _contains_variable_repeat(av[-1]):
+            return True
+    return False
+
+
+def _hazards(items, hazards):
+    previous = None
+    for op, av in items:
+        if _is_variable_repeat(op, av):
+            if _is_repeated(op, av) and _contains_variable_repeat(av[2]):
+                hazards.append('nested quantifier %s' % _describe(op, av))
+            if (previous is not None and _can_match_space(previous[1][2]) and
+                    _can_match_space(av[2])):
+                hazards.append('adjacent %s and %s can both match whitespace'
+                               % (_describe(*previous), _describe(op, av)))
+            previous = (op, av)
+        else:
+            previous = None
+
+        if op is sre_constants.SUBPATTERN:
+            _hazards(av[-1], hazards)
+        elif op in _REPEATS:
+            _hazards(av[2], hazards)
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                _hazards(branch, hazards)
+    return hazards
+
+
+def backtracking_hazards(regex):
+    '''Return descriptions of the constructs in ``regex`` that make the
+    engine backtrack heavily on texts that almost match: quantifiers
+    nested in quantifiers, and neighbouring quantifiers that compete for
+    the same whitespace, like the ``\\s{,10}`` that ``Rule``'s
+    flexible_whitespace puts next to an existing ``\\s+``.
+    '''
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return []
+    return _hazards(parsed, [])
+
+
+def _search_seconds(regex, text, repeat=3):
+    '''Best of a few timings of ``regex.search(text)``, so that a single
+    slow sample caused by a GC pause or the scheduler isn't reported.
+    '''
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        regex.search(text)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+
+class _Stats(object):
+    __slots__ = ('calls', 'matches', 'seconds', 'worst', 'worst_text')
+
+    def __init__(self):
+        self.calls = 0
+        self.matches = 0
+        self.seconds = 0.0
+        self.worst = 0.0
+        self.worst_text = None
+
+    def add(self, seconds, matched, text):
+        self.calls += 1
+        self.matches += matched
+        self.seconds += seconds
+        if seconds > self.worst:
+            self.worst = seconds
+            self.worst_text = text
+
+
+class RuleProfile(object):
+    '''Time spent and match/no-match counts per rule and per regex,
+    collected by a categorizer created with ``profile=True``.
+
+    Rules the compiled prefilter skips are not tried and aren't counted.
+    '''
+
+    def __init__(self):
+        self._rules = defaultdict(_Stats)
+        self._regexes = defaultdict(_Stats)
+
+    def record_rule(self, rule, seconds, matched):
+        self._rules[id(rule)].add(seconds, matched, None)
+
+    def record_regex(self, regex, text, seconds, matched):
+        self._regexes[id(regex)].add(seconds, matched, text)
+
+    def report(self, rules):
+        '''Return the report for ``rules`` as a list of lines, slowest rule
+        first. Regexes that are slow or have backtracking hazards are
+        flagged with a ``!``.
+        '''
+        lines = []
+        indexed = sorted(enumerate(rules),
+                         key=lambda item: -self._rules[id(item[1])].seconds)
+        for index, rule in indexed:
+            stats = self._rules[id(rule)]
+            lines.append(
+                'rule %3d  tried %8d  matched %8d  total %9.2fms  mean %7.2fus'
+                % (index, stats.calls, stats.matches, stats.seconds * 1e3,
+                   stats.seconds / stats.calls * 1e6 if stats.calls else 0))
+            for regex in rule.regexes:
+                stats = self._regexes[id(regex)]
+                lines.append(
+                    '    searched %8d  matched %8d  total %9.2fms  '
+                    'worst %9.2fus  %s'
+                    % (stats.calls, stats.matches, stats.seconds * 1e3,
+                       stats.worst * 1e6, regex.pattern))
+                if stats.worst > SLOW_SEARCH_SECONDS:
+                    seconds = _search_seconds(regex, stats.worst_text)
+                    if seconds > SLOW_SEARCH_SECONDS:
+                        lines.append('      ! %.0fus searching %r' % (
+                            seconds * 1e6, stats.worst_text))
+                for hazard in backtracking_hazards(regex):
+                    lines.append('      ! %s' % hazard)
+        return lines
+
+    def log(self, rules, logger=None):
+        logger = logger or logging.getLogger('openstates')
+        logger.info('action categorizer profile:\n%s',
+                    '\n'.join(self.report(rules)))
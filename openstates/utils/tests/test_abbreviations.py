@@ -0,0 +1,72 @@
+import unittest
+from collections import OrderedDict
+
+from openstates.utils.abbreviations import AbbreviationMatcher
+
+
+TABLES = OrderedDict([
+    ('upper', [('Senate Education', ['ED.']),
+               ('Senate Budget and Fiscal Review', ['B. & F.R.']),
+               ('Senate Revenue', ['REV. & TAX'])]),
+    ('lower', [('Assembly Education', ['ED.']),
+               ('Assembly Higher Education', ['HIGHER ED.']),
+               ('Assembly Banking and Finance', ['B. & F.']),
+               ('Assembly Business', ['B., P., & C.P.'])]),
+])
+
+
+class AbbreviationMatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = AbbreviationMatcher(TABLES)
+
+    def names(self, text, table):
+        return [m.name for m in self.matcher.find(text, table)]
+
+    def test_spans(self):
+        text = 'Referred to Coms. on ED. and B. & F.R.'
+        mentions = self.matcher.find(text, 'upper')
+        self.assertEqual([text[m.start:m.end] for m in mentions],
+                         ['ED.', 'B. & F.R.'])
+        self.assertEqual([m.text for m in mentions], ['ED.', 'B. & F.R.'])
+
+    def test_resolves_for_table_then_others(self):
+        text = 'Referred to Com. on ED.'
+        self.assertEqual(self.names(text, 'upper'), ['Senate Education'])
+        self.assertEqual(self.names(text, 'lower'), ['Assembly Education'])
+        self.assertEqual(self.names('Referred to Com. on B. & F.', 'upper'),
+                         ['Assembly Banking and Finance'])
+
+    def test_longest_match(self):
+        self.assertEqual(self.names('To Com. on B. & F.R. and HIGHER ED.',
+                                    'lower'),
+                         ['Senate Budget and Fiscal Review',
+                          'Assembly Higher Education'])
+
+    def test_separators(self):
+        self.assertEqual(self.names('Com. on B.,P.,  &  C.P.', 'lower'),
+                         ['Assembly Business'])
+        # tokens of a mention may only be separated by spaces and commas
+        self.assertEqual(self.names('Com. on B. -& F.', 'lower'), [])
+
+    def test_whole_tokens(self):
+        self.assertEqual(self.names('REVISED. & TAXES', 'upper'), [])
+        self.assertEqual(self.names('Com. on ED.S', 'upper'), [])
+
+    def test_sentence_dot(self):
+        text = 'Re-refer to Com. on REV. & TAX.'
+        mentions = self.matcher.find(text, 'upper')
+        self.assertEqual([m.text for m in mentions], ['REV. & TAX'])
+        self.assertEqual(mentions[0].end, len(text) - 1)
+
+    def test_ignore_case(self):
+        matcher = AbbreviationMatcher(TABLES, ignore_case=True)
+        self.assertEqual([m.name for m in matcher.find('com. on b. & f.r.',
+                                                       'upper')],
+                         ['Senate Budget and Fiscal Review'])
+        self.assertEqual(self.names('com. on b. & f.r.', 'upper'), [])
+
+    def test_add(self):
+        self.matcher.add('Com.', 'Committee', 'upper')
+        self.assertEqual(self.names('Referred to Com. on ED.', 'upper'),
+                         ['Committee', 'Senate Education'])
@@ -0,0 +1,179 @@
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from openstates.utils import actions
+from openstates.utils.actions import (Rule, BaseCategorizer, required_literals,
+                                      categorizer_fingerprint)
+from openstates.utils.rule_profile import backtracking_hazards
+
+
+class Categorizer(BaseCategorizer):
+    rules = (
+        Rule(r'(?i)Referred to (?P<committees>.+)', 'referral-committee'),
+        Rule(r'Read first time\.', 'reading-1'),
+        Rule([r'(?i)read third time.{,5}passed',
+              r'(?i)Read third time.+?Passed'],
+             ['passage', 'reading-3']),
+        Rule(r'Vetoed by (the )?Governor', 'executive-veto', stop=True),
+        Rule(r'Governor', 'executive-receipt', actor='executive'),
+        Rule(r'(?P<bill_id>[HS]B \d+)'),
+    )
+
+
+ACTIONS = [
+    'Read first time. To print.',
+    'Referred to Com. on APPR.',
+    'READ THIRD TIME. PASSED.',
+    'Read third time and Passed over objections.',
+    'Vetoed by the Governor.',
+    'To Governor.',
+    'Substituted by HB 22.',
+    'Referred to Kelvin Committee.',
+    '',
+]
+
+
+class TestRequiredLiterals(unittest.TestCase):
+    def test_literal_runs(self):
+        self.assertEqual(required_literals(r'(?i)read third time.{,5}passed'),
+                         set(['read third time', 'passed']))
+
+    def test_optional_parts_are_skipped(self):
+        self.assertEqual(required_literals(r'Vetoed by (the )?Governor'),
+                         set(['vetoed by ', 'governor']))
+        self.assertEqual(required_literals(r'(Ayes|Noes) \d+'), set())
+
+
+class TestCompiledCategorizer(unittest.TestCase):
+    def test_same_output(self):
+        plain = Categorizer()
+        compiled = Categorizer(compiled=True)
+        for action in ACTIONS:
+            self.assertEqual(repr(compiled.categorize(action)),
+                             repr(plain.categorize(action)))
+
+    def test_stop_and_attrs(self):
+        attrs = Categorizer(compiled=True).categorize('Vetoed by Governor.')
+        self.assertEqual(attrs['classification'], ['executive-veto'])
+        self.assertNotIn('actor', attrs)
+
+        attrs = Categorizer(compiled=True).categorize('To Governor.')
+        self.assertEqual(attrs['classification'], ['executive-receipt'])
+        self.assertEqual(attrs['actor'], 'executive')
+
+
+class TestCategorizeMany(unittest.TestCase):
+    def test_same_as_categorize(self):
+        categorizer = Categorizer()
+        texts = ACTIONS * 3
+        expected = [categorizer.categorize(text) for text in texts]
+        self.assertEqual(categorizer.categorize_many(texts), expected)
+        self.assertEqual(
+            categorizer.categorize_many(texts, processes=2, chunksize=2),
+            expected)
+
+    def test_duplicates_are_copies(self):
+        first, second = Categorizer().categorize_many(
+            ['Referred to Com. on APPR.'] * 2)
+        self.assertEqual(first, second)
+        self.assertIsNot(first['committees'], second['committees'])
+
+
+class TestCategorizationCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_hits_and_copies(self):
+        categorizer = Categorizer(cache_size=2)
+        first = categorizer.categorize('Referred to Com. on APPR.')
+        first['committees'].append('Com. on RLS.')
+        second = categorizer.categorize('Referred to Com. on APPR.')
+        self.assertEqual(second['committees'], ['Com. on APPR.'])
+        self.assertEqual((categorizer.cache.hits, categorizer.cache.misses),
+                         (1, 1))
+
+    def test_bounded(self):
+        categorizer = Categorizer(cache_size=2)
+        for action in ACTIONS:
+            categorizer.categorize(action)
+        self.assertEqual(len(categorizer.cache), 2)
+
+    def test_persisted(self):
+        path = os.path.join(self.tmp, 'categorizer', 'xx.json')
+        categorizer = Categorizer(cache_size=100)
+        for action in ACTIONS:
+            categorizer.categorize(action)
+        categorizer.save_cache(path)
+
+        reloaded = Categorizer(cache_size=100)
+        self.assertTrue(reloaded.load_cache(path))
+        for action in ACTIONS:
+            self.assertEqual(reloaded.categorize(action),
+                             categorizer.categorize(action))
+        self.assertEqual(reloaded.cache.misses, 0)
+
+    def test_stale_file_ignored(self):
+        path = os.path.join(self.tmp, 'xx.json')
+        categorizer = Categorizer(cache_size=100)
+        categorizer.categorize('To Governor.')
+        categorizer.save_cache(path)
+
+        class Changed(Categorizer):
+            rules = Categorizer.rules[1:]
+
+        self.assertFalse(Changed(cache_size=100).load_cache(path))
+
+    def test_added(self):
+        categorizer = Categorizer(cache_size=100)
+        categorizer.categorize('To Governor.')
+        self.assertEqual(categorizer.cache.added(), [])
+        categorizer.categorize('To Governor.')
+        categorizer.categorize('Vetoed by the Governor.')
+        self.assertEqual(categorizer.cache.added(),
+                         [('Vetoed by the Governor.',
+                           categorizer.categorize('Vetoed by the Governor.'))])
+        self.assertEqual(categorizer.cache.added(), [])
+
+    def test_fingerprint_covers_module_source(self):
+        fingerprint = categorizer_fingerprint(Categorizer())
+        getsource = actions.inspect.getsource
+        # a helper or hook in the categorizer's module was edited
+        with mock.patch.object(actions.inspect, 'getsource',
+                               lambda module: getsource(module) + '#'):
+            self.assertNotEqual(categorizer_fingerprint(Categorizer()),
+                                fingerprint)
+        with mock.patch.object(actions, 'CATEGORIZER_CACHE_VERSION', 0):
+            self.assertNotEqual(categorizer_fingerprint(Categorizer()),
+                                fingerprint)
+        self.assertEqual(categorizer_fingerprint(Categorizer()), fingerprint)
+
+
+class TestRuleProfile(unittest.TestCase):
+    def test_counts(self):
+        categorizer = Categorizer(profile=True)
+        for action in ACTIONS:
+            categorizer.categorize(action)
+        report = categorizer.profile.report(categorizer.rules)
+        self.assertEqual(len([line for line in report
+                              if line.startswith('rule')]),
+                         len(Categorizer.rules))
+        self.assertTrue(report[0].startswith('rule'))
+
+    def test_hazards(self):
+        self.assertEqual(backtracking_hazards(re.compile(r'Read\s{,10}first')),
+                         [])
+        self.assertEqual(len(backtracking_hazards(re.compile(r'a\s{,10}\s+b'))),
+                         1)
+        self.assertEqual(len(backtracking_hazards(re.compile(r'^(\w+\s?)+$'))),
+                         1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from openstates.utils.hashing import file_hash
+
+
+class TestFileHash(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'download.pdf')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, contents):
+        with open(self.path, 'w') as f:
+            f.write(contents)
+
+    def test_rewritten_in_place(self):
+        self.write('first')
+        stat = os.stat(self.path)
+        first = file_hash(self.path)
+        self.assertEqual(file_hash(self.path), first)
+        # the same size at the same path, and the same mtime
+        self.write('other')
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertNotEqual(file_hash(self.path), first)
+        self.assertEqual(file_hash(self.path),
+                         file_hash(self.path, memoize=False))
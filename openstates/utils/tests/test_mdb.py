@@ -0,0 +1,117 @@
+import os
+import stat
+import shutil
+import tempfile
+import unittest
+
+from openstates.utils.mdb import MDBExport, MDBSnapshot
+
+# stands in for mdbtools' mdb-export: prints the "table" in the database,
+# a file of CSV text per table, and logs each export it does
+MDB_EXPORT = '''#!/bin/sh
+echo "$2" >> "$(dirname "$0")/exports.log"
+cat "$1.$2"
+'''
+
+
+class MDBTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.bin_dir = os.path.join(self.directory, 'bin')
+        os.mkdir(self.bin_dir)
+        script = os.path.join(self.bin_dir, 'mdb-export')
+        with open(script, 'w') as f:
+            f.write(MDB_EXPORT)
+        os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.bin_dir + os.pathsep + self.path
+
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        self.mdbfile = os.path.join(self.directory, 'DB2016.mdb')
+        self.write_db('one')
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        shutil.rmtree(self.directory)
+
+    def write_db(self, version):
+        with open(self.mdbfile, 'w') as f:
+            f.write(version)
+        for table in ('Bills', 'Actions'):
+            with open('%s.%s' % (self.mdbfile, table), 'w') as f:
+                f.write('BillID,Note\n')
+                f.write('S1,"%s ""%s"", with\na newline"\n' % (table, version))
+                f.write('H2,%s\n' % version)
+
+    def exports(self):
+        with open(os.path.join(self.bin_dir, 'exports.log')) as f:
+            return f.read().split()
+
+
+class TestMDBExport(MDBTestCase):
+
+    def test_rows(self):
+        rows = MDBExport(self.mdbfile, self.cache_dir).rows('Bills')
+        self.assertEqual(next(rows), {'BillID': 'S1',
+                                      'Note': 'Bills "one", with\na newline'})
+        self.assertEqual(list(rows), [{'BillID': 'H2', 'Note': 'one'}])
+
+    def test_exported_once(self):
+        MDBExport(self.mdbfile, self.cache_dir).export_all(['Bills', 'Actions'])
+        for _ in range(2):
+            export = MDBExport(self.mdbfile, self.cache_dir)
+            self.assertEqual(len(list(export.rows('Bills'))), 2)
+            self.assertEqual(len(list(export.rows('Actions'))), 2)
+        self.assertEqual(sorted(self.exports()), ['Actions', 'Bills'])
+
+    def test_changed_database(self):
+        old = MDBExport(self.mdbfile, self.cache_dir)
+        list(old.rows('Bills'))
+
+        # a new download of the same database is still cached
+        self.write_db('one')
+        os.utime(self.mdbfile, (0, 0))
+        self.assertEqual(MDBExport(self.mdbfile, self.cache_dir).directory,
+                         old.directory)
+
+        self.write_db('two')
+        new = MDBExport(self.mdbfile, self.cache_dir)
+        self.assertEqual(list(new.rows('Bills'))[1]['Note'], 'two')
+        self.assertEqual(self.exports(), ['Bills', 'Bills'])
+        self.assertFalse(os.path.exists(old.directory))
+
+
+class TestMDBSnapshot(MDBTestCase):
+
+    def snapshot(self, indexes={'Bills': ['BillID'], 'Actions': []}):
+        snapshot = MDBSnapshot(MDBExport(self.mdbfile, self.cache_dir))
+        snapshot.build(indexes)
+        self.addCleanup(snapshot.close)
+        return snapshot
+
+    def test_same_rows_as_export(self):
+        snapshot = self.snapshot()
+        export = MDBExport(self.mdbfile, self.cache_dir)
+        for table in ('Bills', 'Actions'):
+            self.assertEqual(list(snapshot.rows(table)),
+                             list(export.rows(table)))
+
+    def test_lookups(self):
+        snapshot = self.snapshot()
+        self.assertEqual([row['BillID'] for row in
+                          snapshot.rows_with_prefix('Bills', 'BillID', 'S')],
+                         ['S1'])
+        self.assertEqual(list(snapshot.lookup('Bills', 'BillID', 'H2')),
+                         [{'BillID': 'H2', 'Note': 'one'}])
+        plan = snapshot.connection().execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM Bills WHERE BillID >= ?',
+            ('S',)).fetchall()
+        self.assertIn('Bills_BillID', str(plan))
+
+    def test_tables_added_once(self):
+        self.snapshot({'Bills': []})
+        snapshot = self.snapshot()
+        self.assertEqual(snapshot.tables(), {'Bills', 'Actions'})
+        self.snapshot()
+        self.assertEqual(sorted(self.exports()), ['Actions', 'Bills'])
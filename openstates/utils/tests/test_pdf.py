@@ -0,0 +1,174 @@
+import os
+import stat
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from openstates.utils.hashing import file_hash
+from openstates.utils import pdf
+from openstates.utils.pdf import PDFCache, PDFPipeline, extract
+
+# stands in for poppler's pdftotext and pdftohtml: prints the contents of
+# the file it's given and logs each conversion it does
+CONVERTER = '''#!/bin/sh
+[ "$1" = -v ] && { echo "$(basename "$0") version 0.1" >&2; exit 0; }
+echo "$(basename "$0")" >> "$(dirname "$0")/convert.log"
+for arg; do [ -f "$arg" ] && cat "$arg"; done
+exit 0
+'''
+
+
+class FakeLibrary(object):
+    types = frozenset(['text'])
+
+    def version(self):
+        return '1.0'
+
+    def convert(self, source, type):
+        if not isinstance(source, bytes):
+            with open(source, 'rb') as f:
+                source = f.read()
+        if source == b'broken':
+            raise ValueError(source)
+        return source.upper(), True
+
+
+class TestPDFCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.bin_dir = os.path.join(self.directory, 'bin')
+        os.mkdir(self.bin_dir)
+        for name in ('pdftotext', 'pdftohtml'):
+            script = os.path.join(self.bin_dir, name)
+            with open(script, 'w') as f:
+                f.write(CONVERTER)
+            os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+        self.path = os.environ['PATH']
+        os.environ['PATH'] = self.bin_dir + os.pathsep + self.path
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        # what convert_pdf uses, here and in pipeline workers
+        self.default_cache = pdf._cache
+        pdf._cache = PDFCache(self.cache_dir)
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        pdf._cache = self.default_cache
+        shutil.rmtree(self.directory)
+
+    def pdf(self, name, contents):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(contents)
+        return path
+
+    def conversions(self):
+        try:
+            with open(os.path.join(self.bin_dir, 'convert.log')) as f:
+                return f.read().split()
+        except FileNotFoundError:
+            return []
+
+    def test_keyed_by_contents_and_type(self):
+        cache = PDFCache(self.cache_dir, max_size=1024)
+        self.assertEqual(cache.convert(self.pdf('a.pdf', 'journal'), 'text'),
+                         b'journal')
+        # the same PDF downloaded again under another name
+        cache = PDFCache(self.cache_dir, max_size=1024)
+        self.assertEqual(cache.convert(self.pdf('b.pdf', 'journal'), 'text'),
+                         b'journal')
+        self.assertEqual(cache.convert(self.pdf('b.pdf', 'journal'), 'xml'),
+                         b'journal')
+        self.assertEqual(cache.convert(self.pdf('a.pdf', 'votes'), 'text'),
+                         b'votes')
+        self.assertEqual(self.conversions(),
+                         ['pdftotext', 'pdftohtml', 'pdftotext'])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_eviction(self):
+        cache = PDFCache(self.cache_dir, max_size=25)
+        for i, name in enumerate(('a', 'b', 'c')):
+            path = self.pdf(name, name * 10)
+            cache.convert(path, 'text')
+            os.utime(cache.path(file_hash(path), 'poppler', 'text'), (i, i))
+        # "a" was least recently used and went when "c" was added
+        self.assertEqual(cache.size(), 20)
+        cache = PDFCache(self.cache_dir, max_size=25)
+        cache.convert(self.pdf('b', 'b' * 10), 'text')
+        cache.convert(self.pdf('a', 'a' * 10), 'text')
+        self.assertEqual(self.conversions(),
+                         ['pdftotext', 'pdftotext', 'pdftotext', 'pdftotext'])
+
+    def test_disabled(self):
+        cache = PDFCache(self.cache_dir, max_size=0)
+        path = self.pdf('a.pdf', 'journal')
+        for _ in range(2):
+            self.assertEqual(cache.convert(path, 'text-nolayout'), b'journal')
+        self.assertEqual(self.conversions(), ['pdftotext', 'pdftotext'])
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_pipeline(self):
+        for processes in (1, 3):
+            documents = [('a', self.pdf('a.pdf', 'first')),
+                         ('b', b'second'),
+                         ('c', self.pdf('c.pdf', 'third' * 100))]
+            with PDFPipeline('text', processes, remove=True) as pipeline:
+                self.assertEqual(list(pipeline.convert(iter(documents))),
+                                 [('a', b'first'), ('b', b'second'),
+                                  ('c', b'third' * 100)])
+            self.assertEqual([(t.key, t.size) for t in pipeline.timings],
+                             [('a', 5), ('b', 6), ('c', 500)])
+            self.assertFalse(os.path.exists(documents[0][1]))
+
+    def test_bytes(self):
+        cache = PDFCache(self.cache_dir, max_size=1024)
+        self.assertEqual(cache.convert(b'journal', 'text'), b'journal')
+        self.assertEqual(cache.convert(self.pdf('a.pdf', 'journal'), 'text'),
+                         b'journal')
+        self.assertEqual(self.conversions(), ['pdftotext'])
+
+    def test_backends(self):
+        pdf.BACKENDS['fake'] = FakeLibrary
+        self.addCleanup(pdf.BACKENDS.pop, 'fake')
+        self.addCleanup(pdf._backends.pop, 'fake', None)
+
+        path = self.pdf('a.pdf', 'journal')
+        self.assertEqual(extract(path, 'text', 'fake'),
+                         (b'JOURNAL', True, 'fake'))
+        self.assertEqual(extract(b'journal', 'text', 'fake'),
+                         (b'JOURNAL', True, 'fake'))
+        self.assertEqual(self.conversions(), [])
+        # the poppler commands do what the backend can't
+        self.assertEqual(extract(path, 'xml', 'fake'),
+                         (b'journal', True, 'poppler'))
+        self.assertEqual(extract(b'broken', 'text', 'fake'),
+                         (b'broken', True, 'poppler'))
+        self.assertEqual(self.conversions(), ['pdftohtml', 'pdftotext'])
+        # only used when asked for
+        self.assertEqual(extract(path, 'text'), (b'journal', True, 'poppler'))
+
+    def test_keyed_by_backend(self):
+        pdf.BACKENDS['fake'] = FakeLibrary
+        self.addCleanup(pdf.BACKENDS.pop, 'fake')
+        self.addCleanup(pdf._backends.pop, 'fake', None)
+
+        path = self.pdf('a.pdf', 'journal')
+        cache = PDFCache(self.cache_dir, max_size=1024)
+        with mock.patch.object(pdf, 'PDF_BACKEND', 'fake'):
+            self.assertEqual(cache.convert(path, 'text'), b'JOURNAL')
+            self.assertEqual(cache.convert(b'broken', 'text'), b'broken')
+            self.assertEqual(cache.convert(path, 'text'), b'JOURNAL')
+        self.assertEqual(cache.convert(path, 'text'), b'journal')
+        self.assertEqual(cache.convert(path, 'text'), b'journal')
+        self.assertEqual(self.conversions(), ['pdftotext', 'pdftotext'])
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+        # what the commands converted after the backend failed is found
+        # under theirs
+        with mock.patch.object(pdf, 'PDF_BACKEND', 'fake'):
+            self.assertEqual(cache.convert(b'broken', 'text'), b'broken')
+        self.assertEqual(self.conversions(), ['pdftotext', 'pdftotext'])
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+        self.assertTrue(os.path.exists(
+            cache.path(file_hash(path), 'fake', 'text')))
+        self.assertIn('.fake-1.0.text', cache.path('ab', 'fake', 'text'))
@@ -0,0 +1,54 @@
+import unittest
+
+from openstates.utils.rollcall import CodedRollCall, Columns
+
+IL_LINES = [
+    'Y    Althoff     Y    Dillard     N   Lauzen        NV   Righter',
+    'NV   Bivins      Y    Forby       Y   Lightford     P    Risinger',
+    'Y    DeLeo       Y    Jones, J.   P   Peterson      Y    Wilhelmi',
+    'Y    Delgado     Y    Koehler     Y   Radogno       Y    Mr. President',
+    'Y    Demuzio     Y    Kotowski    Y   Raoul',
+]
+
+
+class TestCodedRollCall(unittest.TestCase):
+
+    def setUp(self):
+        self.roll_call = CodedRollCall(['NV', 'Y', 'N', 'E', 'A', 'P', '-'])
+
+    def test_columns(self):
+        self.assertEqual(self.roll_call.find_columns(IL_LINES).xs,
+                         [0, 17, 34, 52])
+
+    def test_parse(self):
+        pairs = self.roll_call.parse(IL_LINES)
+        self.assertEqual(len(pairs), 19)
+        self.assertEqual(pairs[:4], [('Althoff', 'Y'), ('Dillard', 'Y'),
+                                     ('Lauzen', 'N'), ('Righter', 'NV')])
+        self.assertIn(('Jones, J.', 'Y'), pairs)
+        self.assertIn(('Mr. President', 'Y'), pairs)
+        self.assertEqual(pairs[-1], ('Raoul', 'Y'))
+
+    def test_missing_code(self):
+        lines = ['Y   Gentry, N.      Y   Madalena, J.',
+                 'Y   Jeff, S.        N   Powdrell-C, J.',
+                 'Y   Egolf, B.           Larranaga, L.']
+        self.assertEqual(self.roll_call.parse(lines)[-2:],
+                         [('Egolf, B.', 'Y'), ('Larranaga, L.', None)])
+
+    def test_misaligned(self):
+        with self.assertRaises(ValueError):
+            self.roll_call.find_columns(IL_LINES[:2] + ['   Y    Raoul'])
+
+
+class TestColumns(unittest.TestCase):
+
+    def test_nearest(self):
+        columns = Columns([300, 100, 200])
+        self.assertEqual([columns.nearest(x) for x in (0, 149, 150, 151, 999)],
+                         [100, 100, 100, 200, 300])
+
+    def test_index(self):
+        columns = Columns([10, 0, 20])
+        self.assertEqual([columns.index(x) for x in (-1, 0, 9, 10, 25)],
+                         [-1, 0, 0, 1, 2])
@@ -1,3 +1,4 @@
+import os
 import re
 import datetime
 import scrapelib
@@ -5,6 +6,7 @@ from collections import defaultdict
 
 from .actions import Categorizer
 from .utils import xpath
+from pupa import settings
 from pupa.scrape import Scraper, Bill, VoteEvent as Vote
 from openstates.utils import LXMLMixin
 
@@ -17,7 +19,7 @@ class WABillScraper(Scraper, LXMLMixin):
     # API Docs: http://wslwebservices.leg.wa.gov/legislationservice.asmx
 
     _base_url = 'http://wslwebservices.leg.wa.gov/legislationservice.asmx'
-    categorizer = Categorizer()
+    categorizer = Categorizer(compiled=True, cache_size=50000)
     _subjects = defaultdict(list)
 
     ORDINALS = {
@@ -176,9 +178,16 @@ class WABillScraper(Scraper, LXMLMixin):
             self.info('no session specified, using %s', session)
         chambers = [chamber] if chamber else ['upper', 'lower']
 
+        cache_path = os.path.join(settings.CACHE_DIR, 'categorizer', 'wa.json')
+        self.categorizer.load_cache(cache_path)
+
         for chamber in chambers:
             yield from self.scrape_chamber(chamber, session)
 
+        self.categorizer.save_cache(cache_path)
+        self.info('action categorizer cache: %d hits, %d misses',
+                  self.categorizer.cache.hits, self.categorizer.cache.misses)
+
     def scrape_chamber(self, chamber, session):
         self.biennium = "%s-%s" % (session[0:4], session[7:9])
         self._load_versions(chamber)
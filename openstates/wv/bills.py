@@ -6,7 +6,7 @@ from urllib.parse import unquote_plus, parse_qsl, urlparse
 
 import lxml.html
 
-from pupa.utils import convert_pdf
+from openstates.utils import convert_pdf
 from pupa.scrape import Scraper, Bill, VoteEvent as Vote
 import scrapelib
 
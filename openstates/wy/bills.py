@@ -4,10 +4,9 @@ import datetime
 from collections import defaultdict
 
 import scrapelib
-from pupa.utils.generic import convert_pdf
 from pupa.scrape import Scraper, Bill, VoteEvent
 
-from openstates.utils import LXMLMixin
+from openstates.utils import LXMLMixin, convert_pdf
 
 
 TIMEZONE = pytz.timezone('US/Mountain')
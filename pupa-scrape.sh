@@ -19,5 +19,5 @@ fi
 
 export PUPA_DATA_DIR='../openstates/_data'
 export PYTHONPATH=./billy_metadata/
-$BILLY_ENV/bin/python -m pupa2billy.run $state
+$BILLY_ENV/bin/python -m pupa2billy.run $state ${PUPA2BILLY_ARGS:-}
 $BILLY_ENV/bin/billy-update $state --import --report
@@ -1,4 +1,5 @@
-from .utils import get_json, parse_psuedo_id, parse_date
+from .utils import parse_psuedo_id, parse_date
+from .manifest import ManifestMixin
 from billy.scrape.bills import BillScraper, Bill
 
 
@@ -39,14 +40,14 @@ def _action_categories(categories):
     return [ACTION_MAPPING[c] for c in categories if c != 'other']
 
 
-class PupaBillScraper(BillScraper):
+class PupaBillScraper(ManifestMixin, BillScraper):
 
     def __init__(self, *args, **kwargs):
         self.jurisdiction = kwargs.pop('jurisdiction')
         super(PupaBillScraper, self).__init__(*args, **kwargs)
 
     def scrape(self, **kwargs):
-        for bill in get_json(self.jurisdiction, 'bill'):
+        for bill in self.iter_inputs('bill'):
             self.process_bill(bill)
 
     def process_bill(self, data):
@@ -1,22 +1,31 @@
 from collections import defaultdict
 from billy.scrape.committees import CommitteeScraper, Committee
-from .utils import get_json, parse_psuedo_id
+from .utils import parse_psuedo_id, pupa_filename
+from .lookups import Lookups
+from .manifest import ManifestMixin
 
 
-class PupaCommitteeScraper(CommitteeScraper):
+class PupaCommitteeScraper(ManifestMixin, CommitteeScraper):
 
     def __init__(self, *args, **kwargs):
         self.jurisdiction = kwargs.pop('jurisdiction')
+        self.lookups = kwargs.pop('lookups', None)
         super(PupaCommitteeScraper, self).__init__(*args, **kwargs)
 
     def scrape(self, **kwargs):
+        if self.lookups is None:
+            self.lookups = Lookups(self.jurisdiction)
+
         self.memberships = defaultdict(list)
 
-        for mem in get_json(self.jurisdiction, 'membership'):
+        for mem in self.lookups.memberships:
             self.memberships[mem['organization_id']].append(mem)
 
-        for com in get_json(self.jurisdiction, 'organization'):
-            self.process_committee(com)
+        for com in self.lookups.organizations.values():
+            name = pupa_filename('organization', com['_id'])
+            if self.is_pending(name):
+                self.begin_input(name)
+                self.process_committee(com)
 
     def process_committee(self, data):
         if data['classification'] != 'committee':
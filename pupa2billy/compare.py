@@ -1,14 +1,38 @@
 from __future__ import print_function
 import os
 import re
-import sys
 import json
 import glob
+import argparse
 import itertools
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
+from .utils import fork_pool
+
+
+def load_json(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def _diff(task):
+    """ pool worker: load and diff a batch of pairs, loading each file
+    the batch reads once """
+    comparator, pairs = task
+    loaded = {}
+    return [(key, comparator.diff(key, comparator.load(source1, loaded),
+                                  comparator.load(source2, loaded)))
+            for key, source1, source2 in pairs]
+
+
+class Comparator(object):
+    """ compares the billy files of one type in two data directories
+
+    Files are paired by key without loading them, and each pair is loaded
+    and diffed on its own, in a pool of processes if one is given, so only
+    the pairs being compared are held in memory.
+    """
 
-class Comparator:
     def __init__(self, objtype):
         self.objtype = objtype
         self.compared = 0
@@ -17,8 +41,9 @@ class Comparator:
     def summary(self):
         print(self.objtype, self.differed, 'differed out of', self.compared)
 
-    def compare_json(self, key, val1, val2):
-        differed = 0
+    def diff(self, key, val1, val2):
+        """ a list of differences between two objects, as dicts """
+        diffs = []
         for k, v1 in val1.items():
             v2 = val2.get(k)
             if self.objtype == 'bills' and k == 'votes':
@@ -40,46 +65,84 @@ class Comparator:
                     a1.pop('date')
                     a2.pop('date')
                     if a1 != a2:
-                        print('action', i, 'differ', a1, '!=', a2)
+                        diffs.append({'type': self.objtype, 'key': key,
+                                      'field': k, 'index': i,
+                                      'old': a1, 'new': a2})
 
                 # don't do the normal check for actions
                 continue
 
             if v1 != v2:
-                print(key, 'differ on', k, v1, '!=', v2)
+                diffs.append({'type': self.objtype, 'key': key, 'field': k,
+                              'old': v1, 'new': v2})
+        return diffs
+
+    def keys(self, dirname, pool=None):
+        """ dirname => {key: source to load} """
+        files = glob.glob(os.path.join(dirname, self.objtype) + '/*.json')
+        return dict((os.path.basename(f), f) for f in files)
+
+    def load(self, source, loaded=None):
+        return load_json(source)
+
+    def batches(self, keys, keys1, keys2):
+        """ the (key, source1, source2) pairs of keys, in lists that are
+        loaded and diffed together """
+        return ([(key, keys1[key], keys2[key])] for key in keys)
+
+    def report(self, key, diffs, report=None):
+        differed = 0
+        for d in diffs:
+            if 'index' in d:
+                print('action', d['index'], 'differ', d['old'], '!=', d['new'])
+            else:
+                print(key, 'differ on', d['field'], d['old'], '!=', d['new'])
+                # differing actions are printed but not counted
                 differed = 1
+            if report:
+                report.write(json.dumps(d, sort_keys=True) + '\n')
 
         self.differed += differed
         self.compared += 1
 
-    def load_json(self, dirname):
-        """ dirname => {key: jsonobj} """
-        files = glob.glob(os.path.join(dirname, self.objtype) + '/*.json')
-        return {os.path.basename(f): json.load(open(f)) for f in files}
-
-    def compare(self, dir1, dir2):
-        files1 = self.load_json(dir1)
-        files2 = self.load_json(dir2)
+    def compare(self, dir1, dir2, pool=None, report=None, chunksize=20):
+        keys1 = self.keys(dir1, pool)
+        keys2 = self.keys(dir2, pool)
 
-        k1set = set(files1.keys())
-        k2set = set(files2.keys())
+        k1set = set(keys1)
+        k2set = set(keys2)
 
         only1 = k1set - k2set
         only2 = k2set - k1set
 
-        if only1:
-            print(self.objtype, 'some files only found in old')
-            for f in only1:
-                print('   ', f)
-        if only2:
-            print(self.objtype, 'some files only found in new')
-            for f in only2:
-                print('   ', f)
+        for only, which in ((only1, 'old'), (only2, 'new')):
+            if not only:
+                continue
+            print(self.objtype, 'some files only found in', which)
+            for key in sorted(only):
+                print('   ', key)
+                if report:
+                    report.write(json.dumps({'type': self.objtype,
+                                             'key': key,
+                                             'only_in': which},
+                                            sort_keys=True) + '\n')
 
-        for key in k1set & k2set:
-            self.compare_json(key, files1[key], files2[key])
+        tasks = ((self, pairs) for pairs in
+                 self.batches(sorted(k1set & k2set), keys1, keys2))
+        if pool:
+            results = pool.imap(_diff, tasks, chunksize)
+        else:
+            results = (_diff(task) for task in tasks)
+        for batch in results:
+            for key, diffs in batch:
+                self.report(key, diffs, report)
 
         self.summary()
+        if report:
+            report.write(json.dumps({'type': self.objtype,
+                                     'compared': self.compared,
+                                     'differed': self.differed},
+                                    sort_keys=True) + '\n')
 
 
 def fix_bill_id(bill_id):
@@ -88,43 +151,110 @@ def fix_bill_id(bill_id):
     return _bill_id_re.sub(r'\1 \2', bill_id, 1).strip()
 
 
+def _vote_key(vote):
+    return (fix_bill_id(vote['bill_id']), vote['motion'].strip())
+
+
+def _vote_keys(filename):
+    """ pool worker: [(key, (filename, index of the vote in a bill))] """
+    data = load_json(filename)
+    if data['_type'] != 'bill':
+        return [(_vote_key(data), (filename, None))]
+    return [(_vote_key(dict(v, bill_id=data['bill_id'])), (filename, i))
+            for i, v in enumerate(data.get('votes') or [])]
+
+
 class VoteComparator(Comparator):
-    def load_json(self, dirname):
-        """ dirname => {key: jsonobj} """
+    """ compares votes grouped by bill and motion
+
+    Votes are read from the votes directory, or embedded in the bills if
+    it is empty. Keys can't be known without parsing the files, so they
+    are read in a first pass that keeps only the key of each vote, and the
+    keys whose votes are in the same files are then diffed together so
+    each bill is parsed once however many votes it has.
+    """
+
+    def keys(self, dirname, pool=None):
+        """ dirname => {key: [(filename, index of the vote in a bill)]} """
         files = glob.glob(os.path.join(dirname, self.objtype) + '/*.json')
-        blobs = [json.load(open(f)) for f in files]
-        if not blobs:
+        if not files:
             # no votes, try loading bills
             files = glob.glob(os.path.join(dirname, 'bills') + '/*.json')
-            bills = [json.load(open(f)) for f in files]
-            blobs = []
-            for bill in bills:
-                for v in bill.get('votes'):
-                    v['bill_id'] = fix_bill_id(bill['bill_id'])
-                    blobs.append(v)
-        all_json = defaultdict(list)
-        for d in blobs:
-            key = (fix_bill_id(d['bill_id']), d['motion'].strip())
-            all_json[key].append(d)
-        return all_json
-
-    def compare_json(self, key, val1, val2):
+        keys = defaultdict(list)
+        for file_keys in (pool.imap(_vote_keys, files, 20) if pool
+                          else (_vote_keys(f) for f in files)):
+            for key, source in file_keys:
+                keys[key].append(source)
+        return keys
+
+    def load(self, sources, loaded=None):
+        if loaded is None:
+            loaded = {}
+        votes = []
+        for filename, index in sources:
+            if filename not in loaded:
+                loaded[filename] = load_json(filename)
+            data = loaded[filename]
+            if index is not None:
+                bill = data
+                data = bill['votes'][index]
+                data['bill_id'] = fix_bill_id(bill['bill_id'])
+            votes.append(data)
+        return votes
+
+    def batches(self, keys, keys1, keys2):
+        batches = OrderedDict()
+        for key in keys:
+            files = (frozenset(f for f, _ in keys1[key]),
+                     frozenset(f for f, _ in keys2[key]))
+            batches.setdefault(files, []).append((key, keys1[key],
+                                                  keys2[key]))
+        return batches.values()
+
+    def diff(self, key, val1, val2):
+        diffs = []
         for i, (v1, v2) in enumerate(zip(sorted(val1, key=lambda x: (x['date'], x['yes_count'])),
                                          sorted(val2, key=lambda x: (x['date'], x['yes_count'])))):
-            super(VoteComparator, self).compare_json(key + (i,), v1, v2)
+            diffs.append(super(VoteComparator, self).diff(key + (i,), v1, v2))
+        return diffs
+
+    def report(self, key, diffs, report=None):
+        for i, vote_diffs in enumerate(diffs):
+            super(VoteComparator, self).report(key + (i,), vote_diffs, report)
+
+
+def compare(dir1, dir2, processes=1, report=None):
+    pool = fork_pool(processes) if processes > 1 else None
+    try:
+        for objtype in ('bills', 'legislators', 'committees', 'events'):
+            c = Comparator(objtype)
+            c.compare(dir1, dir2, pool, report)
+
+        vc = VoteComparator('votes')
+        vc.compare(dir1, dir2, pool, report)
+    finally:
+        if pool:
+            pool.terminate()
 
 
-def compare(dir1, dir2):
-    for objtype in ('bills', 'legislators', 'committees', 'events'):
-        c = Comparator(objtype)
-        c.compare(dir1, dir2)
+def main():
+    parser = argparse.ArgumentParser(
+        description='compare two billy data directories')
+    parser.add_argument('dir1')
+    parser.add_argument('dir2')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='diff files in this many processes')
+    parser.add_argument('--report', metavar='FILE',
+                        help='also write the differences to FILE as JSON '
+                        'lines')
+    args = parser.parse_args()
 
-    vc = VoteComparator('votes')
-    vc.compare(dir1, dir2)
+    if args.report:
+        with open(args.report, 'w') as report:
+            compare(args.dir1, args.dir2, args.processes, report)
+    else:
+        compare(args.dir1, args.dir2, args.processes)
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print('./compare.py <dir1> <dir2>')
-        sys.exit(1)
-    compare(sys.argv[1], sys.argv[2])
+    main()
@@ -1,5 +1,5 @@
 import datetime
-from .utils import get_json
+from .manifest import ManifestMixin
 from billy.scrape.events import EventScraper, Event
 
 
@@ -8,14 +8,14 @@ def parse_datetime(timestamp):
     return dt
 
 
-class PupaEventScraper(EventScraper):
+class PupaEventScraper(ManifestMixin, EventScraper):
 
     def __init__(self, *args, **kwargs):
         self.jurisdiction = kwargs.pop('jurisdiction')
         super(PupaEventScraper, self).__init__(*args, **kwargs)
 
     def scrape(self, **kwargs):
-        for event in get_json(self.jurisdiction, 'event'):
+        for event in self.iter_inputs('event'):
             self.process_event(event)
 
     def process_event(self, data):
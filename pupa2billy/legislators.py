@@ -1,32 +1,35 @@
 from collections import defaultdict
 
-from .utils import get_json, parse_psuedo_id
+from .utils import parse_psuedo_id
+from .manifest import ManifestMixin
+from .lookups import Lookups
 from billy.scrape.legislators import LegislatorScraper, Legislator
 
 
-class PupaLegislatorScraper(LegislatorScraper):
+class PupaLegislatorScraper(ManifestMixin, LegislatorScraper):
 
     def __init__(self, *args, **kwargs):
         self.jurisdiction = kwargs.pop('jurisdiction')
+        self.lookups = kwargs.pop('lookups', None)
         super(PupaLegislatorScraper, self).__init__(*args, **kwargs)
 
     def scrape(self, **kwargs):
+        if self.lookups is None:
+            self.lookups = Lookups(self.jurisdiction)
         self._load_orgs()
         self._load_memberships()
-        for person in get_json(self.jurisdiction, 'person'):
+        for person in self.iter_inputs('person'):
             self.process_person(person)
 
     def _load_orgs(self):
         # org_id -> org
-        self.organizations = defaultdict(list)
-        for org in get_json(self.jurisdiction, 'organization'):
-            self.organizations[org['_id']] = org
+        self.organizations = self.lookups.organizations
 
     def _load_memberships(self):
         # person_id -> {org: org, post: post}
         self.memberships = defaultdict(list)
 
-        for membership in get_json(self.jurisdiction, 'membership'):
+        for membership in self.lookups.memberships:
             org = self.organizations.get(membership['organization_id'])
             if not org:
                 org = parse_psuedo_id(membership['organization_id'])
@@ -0,0 +1,34 @@
+from collections import OrderedDict
+
+from .utils import iter_json, parse_psuedo_id
+
+
+class Lookups(object):
+    """ pupa objects converters need besides the ones they convert
+
+    Built once per run and only read afterwards, so forked workers can
+    share a single copy.
+    """
+
+    def __init__(self, jurisdiction):
+        self.jurisdiction = jurisdiction
+
+        # org_id -> org, in file order
+        self.organizations = OrderedDict()
+        for org in iter_json(jurisdiction, 'organization'):
+            self.organizations[org['_id']] = org
+
+        self.memberships = list(iter_json(jurisdiction, 'membership'))
+
+        self._bills = None
+
+    @property
+    def bills(self):
+        """ bill_id -> (chamber, identifier), indexed on first use """
+        if self._bills is None:
+            self._bills = {}
+            for bill in iter_json(self.jurisdiction, 'bill'):
+                chamber = parse_psuedo_id(
+                    bill['from_organization'])['classification']
+                self._bills[bill['_id']] = (chamber, bill['identifier'])
+        return self._bills
@@ -0,0 +1,189 @@
+import os
+import re
+import glob
+import json
+import hashlib
+
+from . import settings
+from .utils import json_filenames, iter_json_files
+
+MANIFEST_FILENAME = 'pupa2billy-manifest.json'
+# bump when a change to the converters changes their output, so that the
+# next incremental run converts everything again
+MANIFEST_VERSION = 1
+# billy names vote files <session>_<chamber>_<bill_id>_seq<n>.json
+VOTE_SEQUENCE_RE = re.compile(r'_seq(\d+)\.json$')
+
+
+def file_hash(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def hash_inputs(jurisdiction):
+    """ file name -> sha1 of every pupa file of a jurisdiction """
+    filenames = glob.glob(os.path.join(settings.PUPA_DATA_DIR, jurisdiction,
+                                       '*.json'))
+    return dict((os.path.basename(filename), file_hash(filename))
+                for filename in filenames)
+
+
+def combined_hash(hashes, names, extra=''):
+    h = hashlib.sha1(extra.encode('utf-8'))
+    for name in sorted(names):
+        h.update(('%s %s\n' % (name, hashes[name])).encode('utf-8'))
+    return h.hexdigest()
+
+
+def next_vote_sequence(filenames):
+    """ the first vote number not used by any of the billy vote files """
+    used = [int(m.group(1)) for m in map(VOTE_SEQUENCE_RE.search, filenames)
+            if m]
+    return max(used) + 1 if used else 0
+
+
+class StageManifest(object):
+    """ the billy files a converter wrote for each pupa file it read
+
+    Each entry of `inputs` holds the hash the pupa file had when it was
+    converted, the billy files written for it and the hashes of other pupa
+    files its conversion read, like the bill of a vote. `depends` is a hash
+    of everything all of the stage's objects were converted with, like the
+    organizations and memberships for legislators.
+
+    `pending` is the set of input names to convert, or None for all of
+    them, and `hashes` the current hash of every pupa file.
+    """
+
+    def __init__(self, depends=None, inputs=None, hashes=None):
+        self.depends = depends
+        self.inputs = inputs if inputs is not None else {}
+        self.hashes = hashes if hashes is not None else {}
+        self.pending = None
+        self._current = None
+
+    @classmethod
+    def from_json(cls, data, hashes=None):
+        return cls(data['depends'], data['inputs'], hashes)
+
+    def to_json(self):
+        return {'depends': self.depends, 'inputs': self.inputs}
+
+    def outputs(self):
+        return set(output for entry in self.inputs.values()
+                   for output in entry['outputs'])
+
+    def plan(self, names, depends, hashes):
+        """ compare with the current pupa files
+
+        Returns the manifest to convert the stage with, where only the
+        changed inputs are pending, and the billy files that were written
+        for changed or removed inputs and have to be deleted first.
+        """
+        stage = StageManifest(depends, hashes=hashes)
+        if depends != self.depends:
+            return stage, self.outputs()
+
+        stage.pending = set()
+        for name in names:
+            entry = self.inputs.get(name)
+            if (entry is None or entry['hash'] != hashes[name] or
+                    any(hashes.get(dep) != dep_hash
+                        for dep, dep_hash in entry['depends'].items())):
+                stage.pending.add(name)
+            else:
+                stage.inputs[name] = entry
+        return stage, self.outputs() - stage.outputs()
+
+    def is_pending(self, name):
+        return self.pending is None or name in self.pending
+
+    def begin(self, name):
+        """ start recording the conversion of an input """
+        self._current = self.inputs[name] = {
+            'hash': self.hashes[name], 'outputs': [], 'depends': {}}
+
+    def add_output(self, filename):
+        if self._current is not None:
+            self._current['outputs'].append(filename)
+
+    def add_depends(self, name):
+        if self._current is not None:
+            self._current['depends'][name] = self.hashes.get(name)
+
+
+class Manifest(object):
+    """ StageManifests of a jurisdiction's last conversion, by stage name """
+
+    def __init__(self, stages=None):
+        self.stages = stages if stages is not None else {}
+
+    @classmethod
+    def load(cls, juris_dir):
+        """ the manifest of the last run, or None if there isn't a usable one """
+        try:
+            with open(os.path.join(juris_dir, MANIFEST_FILENAME)) as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if data.get('version') != MANIFEST_VERSION:
+            return None
+        return cls(dict((name, StageManifest.from_json(stage))
+                        for name, stage in data['stages'].items()))
+
+    def save(self, juris_dir):
+        data = {'version': MANIFEST_VERSION,
+                'stages': dict((name, stage.to_json())
+                               for name, stage in self.stages.items())}
+        filename = os.path.join(juris_dir, MANIFEST_FILENAME)
+        with open(filename + '.tmp', 'w') as f:
+            json.dump(data, f)
+        os.rename(filename + '.tmp', filename)
+
+    def stage(self, name):
+        return self.stages.get(name) or StageManifest()
+
+
+class ManifestMixin(object):
+    """ records which billy files a converter writes for each pupa file
+
+    Converters constructed with a `manifest` only convert its pending
+    inputs; without one they convert everything, as before.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.manifest = kwargs.pop('manifest', None)
+        super(ManifestMixin, self).__init__(*args, **kwargs)
+
+    def is_pending(self, name):
+        return self.manifest is None or self.manifest.is_pending(name)
+
+    def begin_input(self, name):
+        if self.manifest is not None:
+            self.manifest.begin(name)
+
+    def add_depends(self, name):
+        if self.manifest is not None:
+            self.manifest.add_depends(name)
+
+    def iter_inputs(self, dtype):
+        """ like iter_json, skipping the files that don't need converting """
+        filenames = [filename
+                     for filename in json_filenames(self.jurisdiction, dtype)
+                     if self.is_pending(os.path.basename(filename))]
+        for filename, obj in iter_json_files(filenames):
+            self.begin_input(os.path.basename(filename))
+            yield obj
+
+    def save_object(self, obj):
+        if self.manifest is not None:
+            get_filename = obj.get_filename
+
+            # billy generates some file names from a counter or a uuid, so
+            # record the one it actually writes to
+            def recording_get_filename():
+                filename = get_filename()
+                self.manifest.add_output(filename)
+                return filename
+            obj.get_filename = recording_get_filename
+        super(ManifestMixin, self).save_object(obj)
@@ -1,45 +1,185 @@
 from __future__ import print_function
 import os
-import sys
+import time
 import shutil
+import argparse
+import json
 import importlib
+from . import settings
 from .legislators import PupaLegislatorScraper
 from .committees import PupaCommitteeScraper
 from .bills import PupaBillScraper
 from .votes import PupaVoteScraper
 from .events import PupaEventScraper
+from .lookups import Lookups
+from .manifest import (Manifest, MANIFEST_FILENAME, hash_inputs,
+                       combined_hash)
+from .utils import json_filenames, fork_pool
 from .settings import BILLY_DATA_DIR
 
 
-if __name__ == '__main__':
-    jurisdiction = sys.argv[1]
+STAGES = (
+    ('legislators', PupaLegislatorScraper),
+    ('committees', PupaCommitteeScraper),
+    ('bills', PupaBillScraper),
+    ('votes', PupaVoteScraper),
+    ('events', PupaEventScraper),
+)
+# stage -> (pupa type converted, pupa types every object depends on)
+STAGE_INPUTS = {
+    'legislators': ('person', ('organization', 'membership')),
+    'committees': ('organization', ('membership',)),
+    'bills': ('bill', ()),
+    'votes': ('vote_event', ()),
+    'events': ('event', ()),
+}
+# stages that read the shared Lookups
+LOOKUP_STAGES = ('legislators', 'committees', 'votes')
+# the slowest stages, started first when running in parallel
+SLOW_STAGES = ('bills', 'votes')
+
+# filled in before any workers are forked (see fork_pool), so they inherit
+# it instead of having the lookups pickled over to them
+_run = {}
+
+
+def run_stage(name):
+    start = time.time()
+    manifest = _run['stages'][name]
+    kwargs = {'jurisdiction': _run['jurisdiction'], 'manifest': manifest}
+    if name in LOOKUP_STAGES:
+        kwargs['lookups'] = _run['lookups']
+    scraper = dict(STAGES)[name](_run['metadata'], _run['juris_dir'], **kwargs)
+    scraper.scrape()
+    return (name, time.time() - start,
+            manifest.to_json() if manifest is not None else None)
+
+
+def run_parallel_stage(name):
+    # pool workers are daemonic and can't start process pools of their own
+    settings.JSON_POOL = 'thread'
+    return run_stage(name)
+
+
+def plan_stages(jurisdiction, metadata, manifest):
+    """ the StageManifest to run each stage with, and the stale billy files
+    to remove before running it
+    """
+    hashes = hash_inputs(jurisdiction)
+    metadata_json = json.dumps(metadata, sort_keys=True, default=str)
+    stages = {}
+    stale = {}
+    for name, _ in STAGES:
+        dtype, depends_on = STAGE_INPUTS[name]
+        names = [os.path.basename(filename)
+                 for filename in json_filenames(jurisdiction, dtype)]
+        depends = combined_hash(
+            hashes, [os.path.basename(filename) for dep in depends_on
+                     for filename in json_filenames(jurisdiction, dep)],
+            metadata_json)
+        stages[name], stale[name] = manifest.stage(name).plan(names, depends,
+                                                              hashes)
+    return stages, stale
+
+
+def print_timings(timings):
+    print('%-12s %10s' % ('stage', 'seconds'))
+    for name, seconds in timings:
+        print('%-12s %10.2f' % (name, seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='convert pupa scrape output to billy data')
+    parser.add_argument('jurisdiction')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='run up to this many converters at once')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only convert the pupa files that changed since '
+                        'the last --incremental run')
+    args = parser.parse_args()
+
+    jurisdiction = args.jurisdiction
     mod = importlib.import_module(jurisdiction)
     metadata = mod.metadata
 
     juris_dir = os.path.join(BILLY_DATA_DIR, jurisdiction)
 
-    try:
-        shutil.rmtree(juris_dir)
-    except OSError:
-        pass
+    manifest = Manifest.load(juris_dir) if args.incremental else None
+    if manifest is None:
+        try:
+            shutil.rmtree(juris_dir)
+        except OSError:
+            pass
+        if args.incremental:
+            manifest = Manifest()
+    else:
+        # if this run dies halfway the next one has to start from scratch
+        os.remove(os.path.join(juris_dir, MANIFEST_FILENAME))
 
-    os.makedirs(os.path.join(juris_dir, 'legislators'))
-    os.makedirs(os.path.join(juris_dir, 'committees'))
-    os.makedirs(os.path.join(juris_dir, 'bills'))
-    os.makedirs(os.path.join(juris_dir, 'votes'))
-    os.makedirs(os.path.join(juris_dir, 'events'))
+    for name, _ in STAGES:
+        if not os.path.isdir(os.path.join(juris_dir, name)):
+            os.makedirs(os.path.join(juris_dir, name))
 
-    ls = PupaLegislatorScraper(metadata, juris_dir, jurisdiction=jurisdiction)
-    ls.scrape()
+    run_start = time.time()
+    timings = []
 
-    cs = PupaCommitteeScraper(metadata, juris_dir, jurisdiction=jurisdiction)
-    cs.scrape()
+    if args.incremental:
+        start = time.time()
+        stages, stale = plan_stages(jurisdiction, metadata, manifest)
+        names = []
+        for name, _ in STAGES:
+            for filename in stale[name]:
+                try:
+                    os.remove(os.path.join(juris_dir, name, filename))
+                except OSError:
+                    pass
+            pending = stages[name].pending
+            if pending is None or pending:
+                names.append(name)
+            print('%s: %s to convert, %d stale files removed' % (
+                name, 'all' if pending is None else len(pending),
+                len(stale[name])))
+        timings.append(('manifest', time.time() - start))
+    else:
+        # a full run records no manifest, so it doesn't hash the pupa files
+        stages = dict((name, None) for name, _ in STAGES)
+        names = [name for name, _ in STAGES]
 
-    bs = PupaBillScraper(metadata, juris_dir, jurisdiction=jurisdiction)
-    bs.scrape()
+    start = time.time()
+    lookups = None
+    if set(names) & set(LOOKUP_STAGES):
+        lookups = Lookups(jurisdiction)
+        if 'votes' in names:
+            # index the bills now so forked vote workers inherit the index
+            lookups.bills
+    _run.update(jurisdiction=jurisdiction, metadata=metadata,
+                juris_dir=juris_dir, lookups=lookups, stages=stages)
+    timings.append(('lookups', time.time() - start))
 
-    vs = PupaVoteScraper(metadata, juris_dir, jurisdiction=jurisdiction)
-    vs.scrape()
+    if args.processes > 1 and names:
+        names.sort(key=lambda name: name not in SLOW_STAGES)
+        pool = fork_pool(min(args.processes, len(names)))
+        try:
+            results = [pool.apply_async(run_parallel_stage, (name,))
+                       for name in names]
+            results = [result.get() for result in results]
+        finally:
+            pool.terminate()
+    else:
+        results = [run_stage(name) for name in names]
 
-    es = PupaEventScraper(metadata, juris_dir, jurisdiction=jurisdiction)
-    es.scrape()
+    for name, seconds, stage in results:
+        timings.append((name, seconds))
+        if stage is not None:
+            stages[name].inputs = stage['inputs']
+    if args.incremental:
+        manifest.stages = stages
+        manifest.save(juris_dir)
+
+    timings.append(('total', time.time() - run_start))
+    print_timings(timings)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,3 +2,10 @@ import os
 
 PUPA_DATA_DIR = os.environ.get('PUPA_DATA_DIR', '_data')
 BILLY_DATA_DIR = os.environ.get('BILLY_DATA_DIR', 'data')
+
+# workers used to parse pupa JSON files; 0 parses them in this process
+JSON_WORKERS = int(os.environ.get('PUPA2BILLY_JSON_WORKERS', 0))
+# 'process' or 'thread'
+JSON_POOL = os.environ.get('PUPA2BILLY_JSON_POOL', 'process')
+# max number of parsed files waiting to be processed
+JSON_PREFETCH = int(os.environ.get('PUPA2BILLY_JSON_PREFETCH', 64))
@@ -0,0 +1,68 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from pupa2billy.compare import compare
+
+
+def bill(bill_id, title, yes_count):
+    return {'_type': 'bill', 'bill_id': bill_id, 'title': title,
+            'votes': [{'motion': 'Passage ', 'date': 1, 'yes_count': yes_count,
+                       'no_count': 0}]}
+
+
+OLD = {'HB1.json': bill('HB 1', 'An act', 10),
+       'HB2.json': bill('HB2', 'An act', 5),
+       'HB3.json': bill('HB 3', 'An act', 5)}
+NEW = {'HB1.json': bill('HB 1', 'An act', 11),
+       'HB2.json': bill('HB 2', 'Another act', 5)}
+
+
+class TestCompareReport(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dirs = []
+        for name, bills in (('old', OLD), ('new', NEW)):
+            dirname = os.path.join(self.directory, name)
+            os.makedirs(os.path.join(dirname, 'bills'))
+            for filename, data in bills.items():
+                with open(os.path.join(dirname, 'bills', filename), 'w') as f:
+                    json.dump(data, f)
+            self.dirs.append(dirname)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def report(self, processes):
+        report = io.StringIO()
+        with mock.patch('sys.stdout', io.StringIO()):
+            compare(self.dirs[0], self.dirs[1], processes, report)
+        return [json.loads(line) for line in report.getvalue().splitlines()]
+
+    def test_report(self):
+        self.assertEqual(self.report(1), [
+            {'type': 'bills', 'key': 'HB3.json', 'only_in': 'old'},
+            {'type': 'bills', 'key': 'HB2.json', 'field': 'bill_id',
+             'old': 'HB2', 'new': 'HB 2'},
+            {'type': 'bills', 'key': 'HB2.json', 'field': 'title',
+             'old': 'An act', 'new': 'Another act'},
+            {'type': 'bills', 'compared': 2, 'differed': 1},
+            {'type': 'legislators', 'compared': 0, 'differed': 0},
+            {'type': 'committees', 'compared': 0, 'differed': 0},
+            {'type': 'events', 'compared': 0, 'differed': 0},
+            {'type': 'votes', 'key': ['HB 3', 'Passage'], 'only_in': 'old'},
+            {'type': 'votes', 'key': ['HB 1', 'Passage', 0],
+             'field': 'yes_count', 'old': 10, 'new': 11},
+            {'type': 'votes', 'compared': 2, 'differed': 1},
+        ])
+
+    def test_same_report_in_parallel(self):
+        self.assertEqual(self.report(2), self.report(1))
@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from pupa2billy import utils
+
+
+class TestIterJsonFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filenames = []
+        for i in range(20):
+            filename = os.path.join(self.directory, 'bill_%02d.json' % i)
+            with open(filename, 'w') as f:
+                json.dump({'number': i}, f)
+            self.filenames.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def expected(self):
+        return [(filename, {'number': i})
+                for i, filename in enumerate(self.filenames)]
+
+    def test_in_process(self):
+        with mock.patch.object(utils.settings, 'JSON_WORKERS', 0), \
+                mock.patch.object(utils, 'fork_pool') as fork_pool, \
+                mock.patch('multiprocessing.pool.ThreadPool') as thread_pool:
+            self.assertEqual(list(utils.iter_json_files(self.filenames)),
+                             self.expected())
+        self.assertFalse(fork_pool.called)
+        self.assertFalse(thread_pool.called)
+
+    def test_process_pool_keeps_order(self):
+        self.assertEqual(list(utils.iter_json_files(
+            self.filenames, workers=3, pool_type='process', prefetch=4)),
+            self.expected())
+
+    def test_thread_pool_keeps_order(self):
+        self.assertEqual(list(utils.iter_json_files(
+            self.filenames, workers=3, pool_type='thread', prefetch=4)),
+            self.expected())
+
+    def test_prefetch_bounds_parsed_files(self):
+        loaded = []
+        lock = threading.Lock()
+        load_json = utils.load_json
+
+        def recording_load_json(filename):
+            with lock:
+                loaded.append(filename)
+            return load_json(filename)
+
+        with mock.patch.object(utils, 'load_json', recording_load_json):
+            files = utils.iter_json_files(self.filenames, workers=2,
+                                          pool_type='thread', prefetch=5)
+            self.assertEqual(next(files), self.expected()[0])
+            time.sleep(0.2)
+            # the first file was handed over, and one more submitted for it
+            self.assertEqual(sorted(loaded), self.filenames[:6])
+            rest = list(files)
+        self.assertEqual(rest, self.expected()[1:])
@@ -0,0 +1,96 @@
+import unittest
+
+from pupa2billy.manifest import StageManifest, next_vote_sequence
+
+HASHES = {'vote_event_1.json': 'a', 'vote_event_2.json': 'b',
+          'bill_1.json': 'c'}
+
+
+def entry(hash, outputs, depends=None):
+    return {'hash': hash, 'outputs': outputs, 'depends': depends or {}}
+
+
+class TestStageManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.manifest = StageManifest('deps', {
+            'vote_event_1.json': entry('a', ['s1_upper_SB_1_seq0.json'],
+                                       {'bill_1.json': 'c'}),
+            'vote_event_2.json': entry('b', ['s1_upper_SB_2_seq1.json',
+                                             's1_upper_SB_2_seq2.json']),
+        })
+
+    def plan(self, names=None, depends='deps', hashes=None):
+        if names is None:
+            names = ['vote_event_1.json', 'vote_event_2.json']
+        return self.manifest.plan(names, depends, hashes or HASHES)
+
+    def test_outputs(self):
+        self.assertEqual(self.manifest.outputs(), set([
+            's1_upper_SB_1_seq0.json', 's1_upper_SB_2_seq1.json',
+            's1_upper_SB_2_seq2.json']))
+
+    def test_unchanged(self):
+        stage, stale = self.plan()
+        self.assertEqual(stage.pending, set())
+        self.assertEqual(stale, set())
+        self.assertEqual(stage.outputs(), self.manifest.outputs())
+
+    def test_changed_input(self):
+        hashes = dict(HASHES, **{'vote_event_2.json': 'x'})
+        stage, stale = self.plan(hashes=hashes)
+        self.assertEqual(stage.pending, set(['vote_event_2.json']))
+        self.assertEqual(stale, set(['s1_upper_SB_2_seq1.json',
+                                     's1_upper_SB_2_seq2.json']))
+        self.assertFalse(stage.is_pending('vote_event_1.json'))
+
+    def test_changed_dependency(self):
+        hashes = dict(HASHES, **{'bill_1.json': 'x'})
+        stage, stale = self.plan(hashes=hashes)
+        self.assertEqual(stage.pending, set(['vote_event_1.json']))
+        self.assertEqual(stale, set(['s1_upper_SB_1_seq0.json']))
+
+    def test_new_and_removed_inputs(self):
+        hashes = dict(HASHES, **{'vote_event_3.json': 'd'})
+        stage, stale = self.plan(['vote_event_1.json', 'vote_event_3.json'],
+                                 hashes=hashes)
+        self.assertEqual(stage.pending, set(['vote_event_3.json']))
+        self.assertEqual(stale, set(['s1_upper_SB_2_seq1.json',
+                                     's1_upper_SB_2_seq2.json']))
+
+    def test_changed_stage_depends(self):
+        stage, stale = self.plan(depends='other')
+        self.assertIsNone(stage.pending)
+        self.assertTrue(stage.is_pending('vote_event_1.json'))
+        self.assertEqual(stale, self.manifest.outputs())
+
+    def test_records_conversion(self):
+        stage, _ = self.plan(hashes=dict(HASHES, **{'vote_event_2.json': 'x'}))
+        stage.begin('vote_event_2.json')
+        stage.add_output('s1_upper_SB_2_seq3.json')
+        stage.add_depends('bill_1.json')
+        self.assertEqual(stage.to_json()['inputs']['vote_event_2.json'],
+                         entry('x', ['s1_upper_SB_2_seq3.json'],
+                               {'bill_1.json': 'c'}))
+        self.assertEqual(
+            StageManifest.from_json(stage.to_json()).outputs(),
+            stage.outputs())
+
+
+class TestNextVoteSequence(unittest.TestCase):
+
+    def test_after_kept_votes(self):
+        stage, _ = StageManifest('deps', {
+            'vote_event_1.json': entry('a', ['s1_upper_SB_1_seq0.json']),
+            'vote_event_2.json': entry('b', ['s1_upper_SB_2_seq7.json']),
+        }).plan(['vote_event_1.json', 'vote_event_2.json'], 'deps',
+                dict(HASHES, **{'vote_event_1.json': 'x'}))
+        self.assertEqual(next_vote_sequence(stage.outputs()), 8)
+
+    def test_no_kept_votes(self):
+        self.assertEqual(next_vote_sequence([]), 0)
+        self.assertEqual(next_vote_sequence(['bill.json']), 0)
+
+    def test_multi_digit(self):
+        self.assertEqual(next_vote_sequence(['s_upper_HB_9_seq9.json',
+                                             's_upper_HB_10_seq10.json']), 11)
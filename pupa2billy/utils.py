@@ -2,16 +2,93 @@ import glob
 import json
 import os.path
 import datetime
+import multiprocessing
+import multiprocessing.pool
+from collections import deque
 
 import dateutil.parser
 
 from . import settings
 
 
+def json_filenames(state, dtype):
+    return sorted(glob.glob(os.path.join(settings.PUPA_DATA_DIR,
+                                         state, dtype + '*')))
+
+
+def pupa_filename(dtype, _id):
+    """ the name pupa saves an object under """
+    return '{0}_{1}.json'.format(dtype, _id).replace('/', '-')
+
+
+def load_json(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+
+def fork_pool(processes):
+    """ a process pool whose workers are forked, so they inherit this
+    process's state on platforms that default to spawning them """
+    try:
+        context = multiprocessing.get_context('fork')
+    except AttributeError:
+        # python 2 always forks
+        context = multiprocessing
+    return context.Pool(processes)
+
+
+def iter_json_files(filenames, workers=None, pool_type=None, prefetch=None):
+    """ yield (filename, pupa object) for each file, in order
+
+    With workers (settings.JSON_WORKERS by default) files are parsed in a
+    pool of worker processes or threads, with at most `prefetch` parsed
+    files waiting to be consumed so memory use stays flat.
+    """
+    if workers is None:
+        workers = settings.JSON_WORKERS
+    if pool_type is None:
+        pool_type = settings.JSON_POOL
+    if prefetch is None:
+        prefetch = settings.JSON_PREFETCH
+
+    if not workers:
+        for filename in filenames:
+            yield filename, load_json(filename)
+        return
+
+    if pool_type == 'thread':
+        pool = multiprocessing.pool.ThreadPool(workers)
+    else:
+        pool = fork_pool(workers)
+    try:
+        filenames = iter(filenames)
+        pending = deque()
+
+        def submit():
+            filename = next(filenames, None)
+            if filename is not None:
+                pending.append((filename,
+                                pool.apply_async(load_json, (filename,))))
+
+        for _ in range(max(prefetch, workers)):
+            submit()
+        while pending:
+            filename, result = pending.popleft()
+            obj = result.get()
+            submit()
+            yield filename, obj
+    finally:
+        pool.terminate()
+
+
+def iter_json(state, dtype, **kwargs):
+    """ yield the pupa objects of a type one at a time, in filename order """
+    for _, obj in iter_json_files(json_filenames(state, dtype), **kwargs):
+        yield obj
+
+
 def get_json(state, dtype):
-    return [json.load(open(f))
-            for f in glob.glob(os.path.join(settings.PUPA_DATA_DIR,
-                                            state, dtype + '*'))]
+    return list(iter_json(state, dtype))
 
 
 def parse_psuedo_id(pid):
@@ -1,31 +1,37 @@
-import os
-import json
-from .utils import get_json, parse_psuedo_id, parse_date
+import itertools
+from .utils import parse_psuedo_id, parse_date, pupa_filename
+from .manifest import ManifestMixin, next_vote_sequence
+from .lookups import Lookups
 from billy.scrape.votes import VoteScraper, Vote
-from . import settings
 
 
-class PupaVoteScraper(VoteScraper):
+class PupaVoteScraper(ManifestMixin, VoteScraper):
 
     def get_bill_details(self, bill_uuid):
         if bill_uuid.startswith('~'):
             bill = parse_psuedo_id(bill_uuid)
             chamber = bill['from_organization__classification']
+            identifier = bill['identifier']
         else:
-            bill = json.load(open(os.path.join(settings.PUPA_DATA_DIR,
-                                               self.jurisdiction,
-                                               'bill_' + bill_uuid + '.json')))
-            chamber = parse_psuedo_id(bill['from_organization'])['classification']
+            self.add_depends(pupa_filename('bill', bill_uuid))
+            chamber, identifier = self.lookups.bills[bill_uuid]
         if chamber == 'legislature':
             chamber = 'upper'
-        return chamber, bill['identifier']
+        return chamber, identifier
 
     def __init__(self, *args, **kwargs):
         self.jurisdiction = kwargs.pop('jurisdiction')
+        self.lookups = kwargs.pop('lookups', None)
         super(PupaVoteScraper, self).__init__(*args, **kwargs)
 
     def scrape(self, **kwargs):
-        for vote in get_json(self.jurisdiction, 'vote_event'):
+        if self.lookups is None:
+            self.lookups = Lookups(self.jurisdiction)
+        if self.manifest is not None:
+            # number new vote files after the ones kept from the last run
+            Vote.sequence = itertools.count(
+                next_vote_sequence(self.manifest.outputs()))
+        for vote in self.iter_inputs('vote_event'):
             self.process_vote(vote)
 
     def process_vote(self, data):